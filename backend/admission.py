@@ -0,0 +1,213 @@
+"""
+Admission control for the API.
+
+Every request is put in one of four classes, each with its own concurrency limit,
+so a burst of reports or an import cannot take all of the threadpool and the
+database away from interactive traffic:
+
+    interactive  GET lookups and lists (the default)
+    write        POST / PUT / PATCH / DELETE
+    report       aggregates, CSV export and GET /logs without `since` / `agency_id`
+                 or with include_archived (scans of the whole log history)
+    import       production workbook imports
+
+A request over its class limit waits up to that class's queue timeout for a slot,
+then gets 503 with Retry-After. Limits and timeouts come from ADMISSION_<CLASS>_LIMIT
+and ADMISSION_<CLASS>_QUEUE_SECONDS (a limit of 0 disables the class). They are per
+worker process; keep their sum under the threadpool size (40) so queued requests
+wait here rather than holding a thread.
+
+Report endpoints and GET /logs also get a query time budget through `get_report_db`
+(REPORT_STATEMENT_TIMEOUT_SECONDS): `SET LOCAL statement_timeout` on Postgres
+(per statement), a progress handler that interrupts the running statement once the
+request's queries have used the budget on SQLite. Either way the request gets 503.
+The streamed CSV export gets EXPORT_STATEMENT_TIMEOUT_SECONDS, since on SQLite the
+budget also covers the time spent sending rows.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import math
+import os
+import re
+import time
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+
+REPORT_STATEMENT_TIMEOUT_SECONDS = float(os.getenv("REPORT_STATEMENT_TIMEOUT_SECONDS", "15"))
+EXPORT_STATEMENT_TIMEOUT_SECONDS = float(os.getenv("EXPORT_STATEMENT_TIMEOUT_SECONDS", "300"))
+
+# Long-lived or probe endpoints never queue.
+EXEMPT_PATHS = re.compile(r"^/(events|health|livez|readyz)(/|$)|^/$")
+IMPORT_PATHS = re.compile(r"^/admin/production/import(/|$)")
+REPORT_PATHS = re.compile(
+    r"^/production/(leaderboard|cube|trends)(/|$)"
+    r"|^/logs/(activity|export\.csv)$"
+    r"|^/tasks/summary$"
+    r"|^/employees/\d+/metrics$"
+)
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+TRUE_VALUES = {"1", "true", "on", "yes"}
+
+
+def _env(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+class Bucket:
+    def __init__(self, name: str, limit: int, queue_seconds: float):
+        self.name = name
+        self.limit = limit
+        self.queue_seconds = queue_seconds
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting at most `queue_seconds`; False when the wait times out."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_seconds)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "queue_seconds": self.queue_seconds,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+BUCKETS: Dict[str, Bucket] = {
+    name: Bucket(
+        name,
+        int(_env(f"ADMISSION_{name.upper()}_LIMIT", limit)),
+        _env(f"ADMISSION_{name.upper()}_QUEUE_SECONDS", queue_seconds),
+    )
+    for name, limit, queue_seconds in (
+        ("interactive", 24, 2.0),
+        ("write", 8, 5.0),
+        ("report", 4, 10.0),
+        ("import", 1, 30.0),
+    )
+}
+
+
+def route_class(method: str, path: str, query_string: bytes = b"") -> Optional[str]:
+    """Admission class of a request, or None when it is not subject to admission control."""
+    if method == "OPTIONS" or EXEMPT_PATHS.match(path):
+        return None
+    if IMPORT_PATHS.match(path):
+        return "import"
+    if method in WRITE_METHODS:
+        return "write"
+    if REPORT_PATHS.match(path) or (path.rstrip("/") == "/logs" and _is_log_scan(query_string)):
+        return "report"
+    return "interactive"
+
+
+def _is_log_scan(query_string: bytes) -> bool:
+    """True when a GET /logs query is not narrowed to recent or one agency's logs."""
+    params = parse_qs(query_string.decode("latin-1"))
+    if any(value.lower() in TRUE_VALUES for value in params.get("include_archived", [])):
+        return True
+    return not any(v for key in ("since", "agency_id") for v in params.get(key, []))
+
+
+def busy_response(retry_after: float, detail: str = "Server busy, retry shortly") -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware, so streamed responses (CSV export) hold their slot until the last byte."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = route_class(scope["method"], scope["path"], scope.get("query_string", b""))
+        bucket = BUCKETS.get(name) if name else None
+        if bucket is None or bucket.limit <= 0:
+            await self.app(scope, receive, send)
+            return
+        if not await bucket.acquire():
+            await busy_response(bucket.queue_seconds)(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            bucket.release()
+
+
+def stats() -> Dict[str, dict]:
+    return {name: bucket.stats() for name, bucket in BUCKETS.items()}
+
+
+# --- Statement timeouts for report queries ---
+@contextlib.contextmanager
+def statement_timeout(db: Session, seconds: float):
+    """Interrupt queries on this session once they run past `seconds` (per statement on Postgres, in total on SQLite)."""
+    if seconds <= 0:
+        yield
+        return
+    conn = db.connection()
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        # Lasts until the request's transaction ends.
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(seconds * 1000)}")
+        yield
+    elif dialect == "sqlite":
+        raw = conn.connection.driver_connection
+        started = time.monotonic()
+        # Called every N VM instructions; a truthy return interrupts the running statement.
+        raw.set_progress_handler(lambda: time.monotonic() - started > seconds, 10_000)
+        try:
+            yield
+        finally:
+            raw.set_progress_handler(None, 0)
+    else:
+        yield
+
+
+def is_statement_timeout(exc: DBAPIError) -> bool:
+    message = str(exc.orig).lower()
+    return "interrupted" in message or "statement timeout" in message
+
+
+def get_report_db():
+    db = SessionLocal()
+    try:
+        with statement_timeout(db, REPORT_STATEMENT_TIMEOUT_SECONDS):
+            yield db
+    finally:
+        db.close()
@@ -0,0 +1,48 @@
+"""Indexes for hot query shapes
+
+Revision ID: 0002_hot_query_indexes
+Revises: 0001_init
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0002_hot_query_indexes'
+down_revision = '0001_init'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_employees_office_id', 'employees', ['office_id']),
+    ('ix_agencies_office_id', 'agencies', ['office_id']),
+    ('ix_contacts_agency_id', 'contacts', ['agency_id']),
+    ('ix_logs_agency_id_datetime', 'logs', ['agency_id', 'datetime']),
+    ('ix_logs_user_datetime', 'logs', ['user', 'datetime']),
+    ('ix_logs_datetime', 'logs', ['datetime']),
+    ('ix_tasks_agency_id_status', 'tasks', ['agency_id', 'status']),
+    ('ix_tasks_status_due_date', 'tasks', ['status', 'due_date']),
+    ('ix_production_office_month', 'production', ['office', 'month']),
+]
+
+
+def _existing_indexes():
+    """Map table -> index names; databases bootstrapped by create_all may already have some of these."""
+    insp = sa.inspect(op.get_bind())
+    return {table: {ix['name'] for ix in insp.get_indexes(table)} for table in insp.get_table_names()}
+
+
+def upgrade():
+    existing = _existing_indexes()
+    for name, table, columns in INDEXES:
+        if table in existing and name not in existing[table]:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    existing = _existing_indexes()
+    for name, table, _ in reversed(INDEXES):
+        if name in existing.get(table, set()):
+            op.drop_index(name, table_name=table)
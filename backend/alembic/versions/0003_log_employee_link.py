@@ -0,0 +1,45 @@
+"""Link logs to employees
+
+Revision ID: 0003_log_employee_link
+Revises: 0002_hot_query_indexes
+Create Date: 2026-10-19
+
+Existing rows are linked by `python -m backend.backfill_log_employees`.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0003_log_employee_link'
+down_revision = '0002_hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    log_cols = {c['name'] for c in insp.get_columns('logs')}
+    log_indexes = {ix['name'] for ix in insp.get_indexes('logs')}
+    emp_indexes = {ix['name'] for ix in insp.get_indexes('employees')}
+
+    if 'employee_id' not in log_cols:
+        with op.batch_alter_table('logs') as batch_op:
+            batch_op.add_column(sa.Column('employee_id', sa.Integer, nullable=True))
+            batch_op.create_foreign_key(
+                'fk_logs_employee_id', 'employees', ['employee_id'], ['id'], ondelete="SET NULL"
+            )
+    if 'ix_logs_employee_id_datetime' not in log_indexes:
+        op.create_index(
+            'ix_logs_employee_id_datetime', 'logs', ['employee_id', 'datetime', 'action', 'agency_id']
+        )
+    if 'ix_employees_name' not in emp_indexes:
+        op.create_index('ix_employees_name', 'employees', ['name'])
+
+
+def downgrade():
+    op.drop_index('ix_employees_name', table_name='employees')
+    op.drop_index('ix_logs_employee_id_datetime', table_name='logs')
+    with op.batch_alter_table('logs') as batch_op:
+        batch_op.drop_constraint('fk_logs_employee_id', type_='foreignkey')
+        batch_op.drop_column('employee_id')
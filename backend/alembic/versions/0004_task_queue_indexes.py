@@ -0,0 +1,40 @@
+"""Indexes for the task queue
+
+Revision ID: 0004_task_queue_indexes
+Revises: 0003_log_employee_link
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0004_task_queue_indexes'
+down_revision = '0003_log_employee_link'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_tasks_owner_status_due_date', 'tasks', ['owner', 'status', 'due_date', 'agency_id']),
+    ('ix_tasks_due_date', 'tasks', ['due_date']),
+]
+
+
+def _existing_indexes():
+    insp = sa.inspect(op.get_bind())
+    return {table: {ix['name'] for ix in insp.get_indexes(table)} for table in insp.get_table_names()}
+
+
+def upgrade():
+    existing = _existing_indexes()
+    for name, table, columns in INDEXES:
+        if table in existing and name not in existing[table]:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    existing = _existing_indexes()
+    for name, table, _ in reversed(INDEXES):
+        if name in existing.get(table, set()):
+            op.drop_index(name, table_name=table)
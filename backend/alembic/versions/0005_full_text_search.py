@@ -0,0 +1,77 @@
+"""Full-text search tables
+
+Revision ID: 0005_full_text_search
+Revises: 0004_task_queue_indexes
+Create Date: 2026-10-19
+
+SQLite: FTS5 tables + sync triggers. Postgres: generated tsvector columns + GIN indexes.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0005_full_text_search'
+down_revision = '0004_task_queue_indexes'
+branch_labels = None
+depends_on = None
+
+# table -> indexed columns, as of this revision
+SEARCH_COLUMNS = {
+    'agencies': ('name', 'dba', 'code', 'notes'),
+    'contacts': ('name', 'email', 'notes'),
+    'logs': ('notes',),
+    'tasks': ('title', 'notes'),
+}
+
+
+def upgrade():
+    bind = op.get_bind()
+    tables = set(sa.inspect(bind).get_table_names())
+    for table, columns in SEARCH_COLUMNS.items():
+        if table not in tables:
+            continue
+        cols = ", ".join(columns)
+        if bind.dialect.name == 'sqlite':
+            fts = f"{table}_fts"
+            new_vals = ", ".join(f"new.{c}" for c in columns)
+            old_vals = ", ".join(f"old.{c}" for c in columns)
+            existed = fts in tables
+            op.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                f"{cols}, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+            )
+            op.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals}); END"
+            )
+            op.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); END"
+            )
+            op.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); "
+                f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals}); END"
+            )
+            if not existed:
+                op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        elif bind.dialect.name == 'postgresql':
+            doc = " || ' ' || ".join(f"coalesce({c}, '')" for c in columns)
+            op.execute(
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_tsv tsvector "
+                f"GENERATED ALWAYS AS (to_tsvector('simple', {doc})) STORED"
+            )
+            op.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_search_tsv ON {table} USING GIN (search_tsv)")
+
+
+def downgrade():
+    bind = op.get_bind()
+    for table in SEARCH_COLUMNS:
+        if bind.dialect.name == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {table}_fts")
+        elif bind.dialect.name == 'postgresql':
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_tsv")
+            op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_tsv")
@@ -0,0 +1,131 @@
+"""Row versions and tombstones for delta sync
+
+Revision ID: 0006_row_versions
+Revises: 0005_full_text_search
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0006_row_versions'
+down_revision = '0005_full_text_search'
+branch_labels = None
+depends_on = None
+
+SYNC_TABLES = ('agencies', 'contacts', 'logs', 'tasks', 'production')
+
+POSTGRES_FUNCTIONS = [
+    """
+    CREATE OR REPLACE FUNCTION sync_stamp_row() RETURNS trigger AS $$
+    BEGIN
+        UPDATE sync_state SET version = version + 1 WHERE id = 1 RETURNING version INTO NEW.row_version;
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION sync_tombstone_row() RETURNS trigger AS $$
+    DECLARE v integer;
+    BEGIN
+        UPDATE sync_state SET version = version + 1 WHERE id = 1 RETURNING version INTO v;
+        INSERT INTO sync_tombstones (table_name, row_id, version) VALUES (TG_TABLE_NAME, OLD.id, v);
+        RETURN OLD;
+    END $$ LANGUAGE plpgsql
+    """,
+]
+
+
+def _sqlite_triggers(table):
+    bump = "UPDATE sync_state SET version = version + 1 WHERE id = 1;"
+    current = "(SELECT version FROM sync_state WHERE id = 1)"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_sync_ai AFTER INSERT ON {table} BEGIN "
+        f"{bump} UPDATE {table} SET row_version = {current} WHERE id = new.id; END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_sync_au AFTER UPDATE ON {table} "
+        f"WHEN new.row_version IS old.row_version BEGIN "
+        f"{bump} UPDATE {table} SET row_version = {current} WHERE id = new.id; END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_sync_ad AFTER DELETE ON {table} BEGIN "
+        f"{bump} INSERT INTO sync_tombstones (table_name, row_id, version) "
+        f"VALUES ('{table}', old.id, {current}); END",
+    ]
+
+
+def _postgres_triggers(table):
+    return [
+        f"DROP TRIGGER IF EXISTS {table}_sync_stamp ON {table}",
+        f"CREATE TRIGGER {table}_sync_stamp BEFORE INSERT OR UPDATE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION sync_stamp_row()",
+        f"DROP TRIGGER IF EXISTS {table}_sync_tombstone ON {table}",
+        f"CREATE TRIGGER {table}_sync_tombstone AFTER DELETE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION sync_tombstone_row()",
+    ]
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    tables = set(insp.get_table_names())
+    if 'sync_state' not in tables:
+        op.create_table(
+            'sync_state',
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('version', sa.Integer, nullable=False),
+        )
+    if 'sync_tombstones' not in tables:
+        op.create_table(
+            'sync_tombstones',
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('table_name', sa.String(length=50), nullable=False),
+            sa.Column('row_id', sa.Integer, nullable=False),
+            sa.Column('version', sa.Integer, nullable=False),
+        )
+        op.create_index('ix_sync_tombstones_version', 'sync_tombstones', ['version'])
+    synced = [t for t in SYNC_TABLES if t in tables]
+    for table in synced:
+        if 'row_version' not in {c['name'] for c in insp.get_columns(table)}:
+            op.add_column(table, sa.Column('row_version', sa.Integer, nullable=True))
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_row_version ON {table} (row_version)")
+
+    if bind.execute(sa.text("SELECT 1 FROM sync_state WHERE id = 1")).first() is None:
+        op.execute("INSERT INTO sync_state (id, version) VALUES (1, 0)")
+    if bind.dialect.name == 'postgresql':
+        for stmt in POSTGRES_FUNCTIONS:
+            op.execute(stmt)
+    for table in synced:
+        if bind.dialect.name == 'sqlite':
+            stmts = _sqlite_triggers(table)
+        elif bind.dialect.name == 'postgresql':
+            stmts = _postgres_triggers(table)
+        else:
+            stmts = []
+        for stmt in stmts:
+            op.execute(stmt)
+        # Stamp existing rows with distinct versions (base + id) so paging by row_version never splits a tie.
+        max_id = bind.execute(sa.text(f"SELECT MAX(id) FROM {table} WHERE row_version IS NULL")).scalar()
+        if max_id:
+            base = bind.execute(sa.text("SELECT version FROM sync_state WHERE id = 1")).scalar()
+            bind.execute(sa.text("UPDATE sync_state SET version = :v WHERE id = 1"), {"v": base + max_id})
+            # Setting row_version explicitly skips the update trigger (WHEN new.row_version IS old.row_version)
+            bind.execute(
+                sa.text(f"UPDATE {table} SET row_version = :base + id WHERE row_version IS NULL"), {"base": base}
+            )
+
+
+def downgrade():
+    bind = op.get_bind()
+    for table in SYNC_TABLES:
+        if bind.dialect.name == 'sqlite':
+            for suffix in ('ai', 'au', 'ad'):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_sync_{suffix}")
+        elif bind.dialect.name == 'postgresql':
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_sync_stamp ON {table}")
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_sync_tombstone ON {table}")
+        op.drop_index(f'ix_{table}_row_version', table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('row_version')
+    if bind.dialect.name == 'postgresql':
+        op.execute("DROP FUNCTION IF EXISTS sync_stamp_row()")
+        op.execute("DROP FUNCTION IF EXISTS sync_tombstone_row()")
+    op.drop_table('sync_tombstones')
+    op.drop_table('sync_state')
@@ -0,0 +1,25 @@
+"""Index logs by office for filtered listing and CSV export
+
+Revision ID: 0007_log_office_index
+Revises: 0006_row_versions
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0007_log_office_index'
+down_revision = '0006_row_versions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    if 'ix_logs_office_datetime' not in {ix['name'] for ix in insp.get_indexes('logs')}:
+        op.create_index('ix_logs_office_datetime', 'logs', ['office', 'datetime'])
+
+
+def downgrade():
+    op.drop_index('ix_logs_office_datetime', table_name='logs')
@@ -0,0 +1,25 @@
+"""Index production by month for cross-office leaderboards
+
+Revision ID: 0008_production_month_index
+Revises: 0007_log_office_index
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0008_production_month_index'
+down_revision = '0007_log_office_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    if 'ix_production_month_office' not in {ix['name'] for ix in insp.get_indexes('production')}:
+        op.create_index('ix_production_month_office', 'production', ['month', 'office'])
+
+
+def downgrade():
+    op.drop_index('ix_production_month_office', table_name='production')
@@ -0,0 +1,46 @@
+"""Daily log count rollup
+
+Revision ID: 0009_log_daily_rollup
+Revises: 0008_production_month_index
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0009_log_daily_rollup'
+down_revision = '0008_production_month_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    if 'log_daily_rollup' in insp.get_table_names():
+        return
+    op.create_table(
+        'log_daily_rollup',
+        sa.Column('day', sa.Date, primary_key=True),
+        sa.Column('office', sa.String(length=50), primary_key=True),
+        sa.Column('user', sa.String(length=255), primary_key=True),
+        sa.Column('action', sa.String(length=255), primary_key=True),
+        sa.Column('agency_id', sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column('count', sa.Integer, nullable=False),
+    )
+    op.create_index('ix_log_daily_rollup_office_day', 'log_daily_rollup', ['office', 'day'])
+    op.create_index('ix_log_daily_rollup_user_day', 'log_daily_rollup', ['user', 'day'])
+    op.create_index('ix_log_daily_rollup_agency_id_day', 'log_daily_rollup', ['agency_id', 'day'])
+    day = "date(datetime)" if op.get_bind().dialect.name == 'sqlite' else "CAST(datetime AS DATE)"
+    op.execute(
+        f"""
+        INSERT INTO log_daily_rollup (day, office, "user", action, agency_id, count)
+        SELECT {day}, coalesce(office, ''), "user", action, coalesce(agency_id, 0), count(*)
+        FROM logs
+        GROUP BY {day}, coalesce(office, ''), "user", action, coalesce(agency_id, 0)
+        """
+    )
+
+
+def downgrade():
+    op.drop_table('log_daily_rollup')
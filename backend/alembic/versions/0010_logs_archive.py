@@ -0,0 +1,42 @@
+"""Cold archive table for old marketing logs
+
+Revision ID: 0010_logs_archive
+Revises: 0009_log_daily_rollup
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0010_logs_archive'
+down_revision = '0009_log_daily_rollup'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    if 'logs_archive' in insp.get_table_names():
+        return
+    op.create_table(
+        'logs_archive',
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column('user', sa.String(length=255), nullable=False),
+        sa.Column('datetime', sa.DateTime, nullable=False),
+        sa.Column('action', sa.String(length=255), nullable=False),
+        sa.Column('agency_id', sa.Integer, nullable=True),
+        sa.Column('office', sa.String(length=50), nullable=True),
+        sa.Column('notes', sa.Text, nullable=True),
+        sa.Column('contact_id', sa.Integer, nullable=True),
+        sa.Column('contact', sa.String(length=255), nullable=True),
+        sa.Column('employee_id', sa.Integer, nullable=True),
+    )
+    op.create_index('ix_logs_archive_agency_id_datetime', 'logs_archive', ['agency_id', 'datetime'])
+    op.create_index('ix_logs_archive_user_datetime', 'logs_archive', ['user', 'datetime'])
+    op.create_index('ix_logs_archive_office_datetime', 'logs_archive', ['office', 'datetime'])
+    op.create_index('ix_logs_archive_datetime', 'logs_archive', ['datetime'])
+
+
+def downgrade():
+    op.drop_table('logs_archive')
@@ -0,0 +1,32 @@
+"""Index agencies by underwriter and resync stored underwriter names
+
+Revision ID: 0011_agency_underwriter_index
+Revises: 0010_logs_archive
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0011_agency_underwriter_index'
+down_revision = '0010_logs_archive'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    if 'ix_agencies_primary_underwriter_id' not in {ix['name'] for ix in insp.get_indexes('agencies')}:
+        op.create_index('ix_agencies_primary_underwriter_id', 'agencies', ['primary_underwriter_id'])
+    # Reads no longer patch names from the employee row, so fix any drift once here.
+    distinct = "IS NOT" if op.get_bind().dialect.name == 'sqlite' else "IS DISTINCT FROM"
+    name = "(SELECT employees.name FROM employees WHERE employees.id = agencies.primary_underwriter_id)"
+    op.execute(
+        f"UPDATE agencies SET primary_underwriter = {name} "
+        f"WHERE primary_underwriter_id IS NOT NULL AND primary_underwriter {distinct} {name}"
+    )
+
+
+def downgrade():
+    op.drop_index('ix_agencies_primary_underwriter_id', table_name='agencies')
@@ -0,0 +1,44 @@
+"""Production import ledger
+
+Revision ID: 0012_import_batches
+Revises: 0011_agency_underwriter_index
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0012_import_batches'
+down_revision = '0011_agency_underwriter_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    if 'import_batches' in insp.get_table_names():
+        return
+    op.create_table(
+        'import_batches',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('office', sa.String(length=50), nullable=False),
+        sa.Column('month', sa.String(length=7), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('rows_in_file', sa.Integer, nullable=False),
+        sa.Column('rows_imported', sa.Integer, nullable=False),
+        sa.Column('agencies_created', sa.Integer, nullable=False),
+        sa.Column('parse_ms', sa.Integer, nullable=True),
+        sa.Column('write_ms', sa.Integer, nullable=True),
+        sa.Column('created_at', sa.DateTime, nullable=False),
+        sa.Column('summary', sa.Text, nullable=True),
+        sa.Column('error', sa.Text, nullable=True),
+    )
+    op.create_index('ix_import_batches_id', 'import_batches', ['id'])
+    op.create_index('ix_import_batches_office_month', 'import_batches', ['office', 'month'])
+
+
+def downgrade():
+    op.drop_table('import_batches')
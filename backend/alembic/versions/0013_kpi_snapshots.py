@@ -0,0 +1,34 @@
+"""Precomputed dashboard KPI snapshots
+
+Revision ID: 0013_kpi_snapshots
+Revises: 0012_import_batches
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0013_kpi_snapshots'
+down_revision = '0012_import_batches'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    if 'kpi_snapshots' in insp.get_table_names():
+        return
+    op.create_table(
+        'kpi_snapshots',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('computed_at', sa.DateTime, nullable=False),
+        sa.Column('trigger', sa.String(length=20), nullable=False),
+        sa.Column('duration_ms', sa.Integer, nullable=True),
+        sa.Column('payload', sa.Text, nullable=False),
+    )
+    op.create_index('ix_kpi_snapshots_id', 'kpi_snapshots', ['id'])
+
+
+def downgrade():
+    op.drop_table('kpi_snapshots')
@@ -0,0 +1,69 @@
+"""Per-table cache version counters for cross-process invalidation
+
+Revision ID: 0014_cache_versions
+Revises: 0013_kpi_snapshots
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0014_cache_versions'
+down_revision = '0013_kpi_snapshots'
+branch_labels = None
+depends_on = None
+
+CACHED_TABLES = ('offices', 'employees', 'agencies')
+
+POSTGRES_FUNCTION = """
+    CREATE OR REPLACE FUNCTION cache_version_bump() RETURNS trigger AS $$
+    BEGIN
+        UPDATE cache_versions SET version = version + 1 WHERE name = TG_TABLE_NAME;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    if 'cache_versions' not in insp.get_table_names():
+        op.create_table(
+            'cache_versions',
+            sa.Column('name', sa.String(length=50), primary_key=True),
+            sa.Column('version', sa.Integer, nullable=False),
+        )
+    bind = op.get_bind()
+    existing = set(bind.execute(sa.text("SELECT name FROM cache_versions")).scalars())
+    for table in CACHED_TABLES:
+        if table not in existing:
+            bind.execute(sa.text("INSERT INTO cache_versions (name, version) VALUES (:name, 0)"), {"name": table})
+    if bind.dialect.name == 'postgresql':
+        op.execute(POSTGRES_FUNCTION)
+    for table in CACHED_TABLES:
+        if bind.dialect.name == 'sqlite':
+            bump = f"UPDATE cache_versions SET version = version + 1 WHERE name = '{table}';"
+            for suffix, event in (('ai', 'INSERT'), ('au', 'UPDATE'), ('ad', 'DELETE')):
+                op.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {table}_cache_{suffix} AFTER {event} ON {table} BEGIN {bump} END"
+                )
+        elif bind.dialect.name == 'postgresql':
+            # Statement-level: a bulk import bumps the counter once, not once per row.
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_cache_version ON {table}")
+            op.execute(
+                f"CREATE TRIGGER {table}_cache_version AFTER INSERT OR UPDATE OR DELETE ON {table} "
+                f"FOR EACH STATEMENT EXECUTE FUNCTION cache_version_bump()"
+            )
+
+
+def downgrade():
+    bind = op.get_bind()
+    for table in CACHED_TABLES:
+        if bind.dialect.name == 'sqlite':
+            for suffix in ('ai', 'au', 'ad'):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_cache_{suffix}")
+        elif bind.dialect.name == 'postgresql':
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_cache_version ON {table}")
+    if bind.dialect.name == 'postgresql':
+        op.execute("DROP FUNCTION IF EXISTS cache_version_bump()")
+    op.drop_table('cache_versions')
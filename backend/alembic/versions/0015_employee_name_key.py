@@ -0,0 +1,25 @@
+"""Expression index for case-insensitive employee name matching
+
+Revision ID: 0015_employee_name_key
+Revises: 0014_cache_versions
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0015_employee_name_key'
+down_revision = '0014_cache_versions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    if 'ix_employees_name_key' not in {ix['name'] for ix in insp.get_indexes('employees')}:
+        op.execute("CREATE INDEX ix_employees_name_key ON employees (lower(trim(name)))")
+
+
+def downgrade():
+    op.drop_index('ix_employees_name_key', table_name='employees')
@@ -0,0 +1,26 @@
+"""Record the pruned tombstone version for delta sync
+
+Revision ID: 0016_sync_tombstone_pruning
+Revises: 0015_employee_name_key
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0016_sync_tombstone_pruning'
+down_revision = '0015_employee_name_key'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    if 'pruned_version' not in {c['name'] for c in insp.get_columns('sync_state')}:
+        op.add_column('sync_state', sa.Column('pruned_version', sa.Integer, nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('sync_state') as batch_op:
+        batch_op.drop_column('pruned_version')
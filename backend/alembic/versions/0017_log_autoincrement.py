@@ -0,0 +1,85 @@
+"""Never reuse archived log ids (SQLite AUTOINCREMENT on logs)
+
+Revision ID: 0017_log_autoincrement
+Revises: 0016_sync_tombstone_pruning
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateTable
+
+# revision identifiers, used by Alembic.
+revision = '0017_log_autoincrement'
+down_revision = '0016_sync_tombstone_pruning'
+branch_labels = None
+depends_on = None
+
+
+def _restore_triggers(bind):
+    """The rebuild drops the search and sync triggers along with the old table."""
+    if bind.execute(sa.text("SELECT 1 FROM sqlite_master WHERE name = 'logs_fts'")).first() is not None:
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS logs_fts_ai AFTER INSERT ON logs BEGIN "
+            "INSERT INTO logs_fts(rowid, notes) VALUES (new.id, new.notes); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS logs_fts_ad AFTER DELETE ON logs BEGIN "
+            "INSERT INTO logs_fts(logs_fts, rowid, notes) VALUES ('delete', old.id, old.notes); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS logs_fts_au AFTER UPDATE OF notes ON logs BEGIN "
+            "INSERT INTO logs_fts(logs_fts, rowid, notes) VALUES ('delete', old.id, old.notes); "
+            "INSERT INTO logs_fts(rowid, notes) VALUES (new.id, new.notes); END"
+        )
+    bump = "UPDATE sync_state SET version = version + 1 WHERE id = 1;"
+    current = "(SELECT version FROM sync_state WHERE id = 1)"
+    op.execute(
+        f"CREATE TRIGGER IF NOT EXISTS logs_sync_ai AFTER INSERT ON logs BEGIN "
+        f"{bump} UPDATE logs SET row_version = {current} WHERE id = new.id; END"
+    )
+    op.execute(
+        f"CREATE TRIGGER IF NOT EXISTS logs_sync_au AFTER UPDATE ON logs "
+        f"WHEN new.row_version IS old.row_version BEGIN "
+        f"{bump} UPDATE logs SET row_version = {current} WHERE id = new.id; END"
+    )
+    op.execute(
+        f"CREATE TRIGGER IF NOT EXISTS logs_sync_ad AFTER DELETE ON logs BEGIN "
+        f"{bump} INSERT INTO sync_tombstones (table_name, row_id, version) "
+        f"VALUES ('logs', old.id, {current}); END"
+    )
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        # Postgres sequences never hand out an id twice.
+        return
+    ddl = bind.execute(sa.text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'logs'")).scalar()
+    if ddl is not None and 'AUTOINCREMENT' not in ddl.upper():
+        # Rebuild from the table as it exists, not as the models describe it today.
+        meta = sa.MetaData()
+        logs = sa.Table('logs', meta, autoload_with=bind)
+        rebuilt = logs.to_metadata(meta, name='logs_rebuild')
+        rebuilt.dialect_options['sqlite']['autoincrement'] = True
+        columns = ", ".join(f'"{c.name}"' for c in logs.columns)
+        bind.execute(CreateTable(rebuilt))
+        op.execute(f"INSERT INTO logs_rebuild ({columns}) SELECT {columns} FROM logs")
+        op.execute("DROP TABLE logs")
+        op.execute("ALTER TABLE logs_rebuild RENAME TO logs")
+        for index in logs.indexes:
+            index.create(bind)
+        _restore_triggers(bind)
+    # Start the sequence past every archived id.
+    archived = bind.execute(sa.text("SELECT MAX(id) FROM logs_archive")).scalar()
+    if archived is not None:
+        current = bind.execute(sa.text("SELECT seq FROM sqlite_sequence WHERE name = 'logs'")).scalar()
+        if current is None:
+            bind.execute(sa.text("INSERT INTO sqlite_sequence (name, seq) VALUES ('logs', :seq)"), {"seq": archived})
+        elif current < archived:
+            bind.execute(sa.text("UPDATE sqlite_sequence SET seq = :seq WHERE name = 'logs'"), {"seq": archived})
+
+
+def downgrade():
+    # AUTOINCREMENT only constrains id assignment; nothing to undo.
+    pass
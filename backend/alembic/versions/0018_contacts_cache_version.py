@@ -0,0 +1,45 @@
+"""Cache version counter for contacts (autocomplete index invalidation)
+
+Revision ID: 0018_contacts_cache_version
+Revises: 0017_log_autoincrement
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0018_contacts_cache_version'
+down_revision = '0017_log_autoincrement'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    exists = bind.execute(sa.text("SELECT 1 FROM cache_versions WHERE name = 'contacts'")).scalar()
+    if not exists:
+        op.execute("INSERT INTO cache_versions (name, version) VALUES ('contacts', 0)")
+    if bind.dialect.name == 'sqlite':
+        bump = "UPDATE cache_versions SET version = version + 1 WHERE name = 'contacts';"
+        for suffix, event in (('ai', 'INSERT'), ('au', 'UPDATE'), ('ad', 'DELETE')):
+            op.execute(
+                f"CREATE TRIGGER IF NOT EXISTS contacts_cache_{suffix} AFTER {event} ON contacts BEGIN {bump} END"
+            )
+    elif bind.dialect.name == 'postgresql':
+        # cache_version_bump() was created by 0014_cache_versions.
+        op.execute("DROP TRIGGER IF EXISTS contacts_cache_version ON contacts")
+        op.execute(
+            "CREATE TRIGGER contacts_cache_version AFTER INSERT OR UPDATE OR DELETE ON contacts "
+            "FOR EACH STATEMENT EXECUTE FUNCTION cache_version_bump()"
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for suffix in ('ai', 'au', 'ad'):
+            op.execute(f"DROP TRIGGER IF EXISTS contacts_cache_{suffix}")
+    elif bind.dialect.name == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS contacts_cache_version ON contacts")
+    op.execute("DELETE FROM cache_versions WHERE name = 'contacts'")
@@ -0,0 +1,57 @@
+"""
+Move marketing logs older than the archive horizon into logs_archive.
+
+Runs in primary-key batches committed one at a time, so it is safe to interrupt and
+re-run (e.g. nightly from cron). The horizon defaults to LOG_ARCHIVE_AFTER_DAYS (730).
+Every archived log leaves a sync tombstone, so the run ends by pruning tombstones to
+the newest SYNC_TOMBSTONES_KEEP.
+
+Usage:
+    python -m backend.archive_logs
+    python -m backend.archive_logs --days 365 --batch-size 20000 --vacuum
+    python -m backend.archive_logs --before 2024-01-01
+    python -m backend.archive_logs --keep-tombstones 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timedelta
+
+from . import models
+from .database import Base, SessionLocal, engine
+from .log_archive import ARCHIVE_AFTER_DAYS, archive_logs
+from .sync import TOMBSTONES_KEEP, ensure_sync_schema, prune_tombstones
+
+
+def ensure_schema():
+    """Create the archive table (and the sync prune marker) for databases not managed by alembic."""
+    Base.metadata.create_all(bind=engine, tables=[models.LogArchive.__table__])
+    ensure_sync_schema(engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old marketing logs out of the hot logs table.")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="Archive logs older than this many days.")
+    parser.add_argument("--before", type=datetime.fromisoformat, help="Archive logs before this date (overrides --days).")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Logs per committed batch.")
+    parser.add_argument("--keep-tombstones", type=int, default=TOMBSTONES_KEEP, help="Sync tombstones to keep.")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to return space (SQLite).")
+    args = parser.parse_args()
+
+    ensure_schema()
+    cutoff = args.before or datetime.utcnow() - timedelta(days=args.days)
+    session = SessionLocal()
+    try:
+        moved = archive_logs(session, cutoff, batch_size=args.batch_size)
+        print(f"Logs archived (before {cutoff:%Y-%m-%d}): {moved}")
+        print(f"Sync tombstones pruned: {prune_tombstones(session, keep=args.keep_tombstones)}")
+    finally:
+        session.close()
+    if args.vacuum and moved and engine.dialect.name == "sqlite":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("VACUUM")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+In-process prefix index for agency / contact typeahead.
+
+Built from the database at startup and patched by the crud write paths. Each worker
+process holds its own copy, so before answering, `complete` compares the agencies /
+contacts counters in cache_versions (one primary-key read) with the ones the index
+was built at and rebuilds when another worker, an import or raw SQL has written since.
+"""
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, insort
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+from .cache_versions import current_versions
+
+INDEXED_TABLES = ("agencies", "contacts")
+
+
+def _normalize(value: Optional[str]) -> str:
+    return " ".join((value or "").lower().split())
+
+
+def _keys(texts) -> List[str]:
+    """Full normalized text plus every word-start suffix, so 'ins' finds 'Alliant Insurance'."""
+    keys = set()
+    for value in texts:
+        norm = _normalize(value)
+        if not norm:
+            continue
+        words = norm.split(" ")
+        for i in range(len(words)):
+            keys.add(" ".join(words[i:]))
+    return sorted(keys)
+
+
+class PrefixIndex:
+    """Sorted array of (key, doc_id); a lookup is a bisect plus a walk over matching keys."""
+
+    def __init__(self):
+        self._entries: List[Tuple[str, int]] = []
+        self._docs: Dict[int, dict] = {}
+        self._doc_keys: Dict[int, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def load(self, docs: List[Tuple[int, List[Optional[str]], dict]]) -> None:
+        entries, doc_map, doc_keys = [], {}, {}
+        for doc_id, texts, doc in docs:
+            keys = _keys(texts)
+            doc_map[doc_id] = doc
+            doc_keys[doc_id] = keys
+            entries.extend((k, doc_id) for k in keys)
+        entries.sort()
+        with self._lock:
+            self._entries, self._docs, self._doc_keys = entries, doc_map, doc_keys
+
+    def upsert(self, doc_id: int, texts: List[Optional[str]], doc: dict) -> None:
+        with self._lock:
+            self._remove_locked(doc_id)
+            keys = _keys(texts)
+            for k in keys:
+                insort(self._entries, (k, doc_id))
+            self._docs[doc_id] = doc
+            self._doc_keys[doc_id] = keys
+
+    def remove(self, doc_id: int) -> None:
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def remove_many(self, doc_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._remove_many_locked(set(doc_ids))
+
+    def remove_where(self, predicate: Callable[[dict], bool]) -> None:
+        with self._lock:
+            self._remove_many_locked({d for d, doc in self._docs.items() if predicate(doc)})
+
+    def _remove_many_locked(self, doc_ids: Set[int]) -> None:
+        # One filtering pass over the entries instead of a list deletion per key.
+        doc_ids &= self._docs.keys()
+        if not doc_ids:
+            return
+        self._entries = [entry for entry in self._entries if entry[1] not in doc_ids]
+        for doc_id in doc_ids:
+            self._docs.pop(doc_id, None)
+            self._doc_keys.pop(doc_id, None)
+
+    def _remove_locked(self, doc_id: int) -> None:
+        for k in self._doc_keys.pop(doc_id, []):
+            pos = bisect_left(self._entries, (k, doc_id))
+            if pos < len(self._entries) and self._entries[pos] == (k, doc_id):
+                del self._entries[pos]
+        self._docs.pop(doc_id, None)
+
+    def search(self, prefix: str, limit: int = 10, predicate: Optional[Callable[[dict], bool]] = None) -> List[dict]:
+        prefix = _normalize(prefix)
+        results, seen = [], set()
+        with self._lock:
+            pos = bisect_left(self._entries, (prefix, -1))
+            while pos < len(self._entries) and len(results) < limit:
+                key, doc_id = self._entries[pos]
+                if not key.startswith(prefix):
+                    break
+                pos += 1
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                doc = self._docs[doc_id]
+                if predicate is None or predicate(doc):
+                    results.append(doc)
+        return results
+
+
+agency_index = PrefixIndex()
+contact_index = PrefixIndex()
+_built_versions: Tuple[int, ...] = ()
+_build_lock = threading.Lock()
+
+
+def _agency_doc(ag) -> Tuple[int, List[Optional[str]], dict]:
+    return (
+        ag.id,
+        [ag.name, ag.code, ag.dba],
+        {"kind": "agency", "id": ag.id, "label": ag.name, "code": ag.code, "dba": ag.dba, "agency_id": ag.id},
+    )
+
+
+def _contact_doc(ct) -> Tuple[int, List[Optional[str]], dict]:
+    return (
+        ct.id,
+        [ct.name],
+        {"kind": "contact", "id": ct.id, "label": ct.name, "code": None, "dba": None, "agency_id": ct.agency_id},
+    )
+
+
+def build(db: Session) -> None:
+    """(Re)load both indexes from the database; only the columns we index are read."""
+    global _built_versions
+    # Read before loading: a write racing with the load only causes another rebuild.
+    versions = current_versions(db, INDEXED_TABLES)
+    agencies = db.execute(
+        select(models.Agency.id, models.Agency.name, models.Agency.code, models.Agency.dba)
+    ).all()
+    contacts = db.execute(select(models.Contact.id, models.Contact.name, models.Contact.agency_id)).all()
+    agency_index.load([_agency_doc(a) for a in agencies])
+    contact_index.load([_contact_doc(c) for c in contacts])
+    _built_versions = versions
+
+
+def ensure_current(db: Session) -> None:
+    """Rebuild when agencies or contacts changed since the last build (one rebuild per change, not per caller)."""
+    if current_versions(db, INDEXED_TABLES) == _built_versions:
+        return
+    with _build_lock:
+        if current_versions(db, INDEXED_TABLES) != _built_versions:
+            build(db)
+
+
+def index_agency(ag: models.Agency) -> None:
+    agency_index.upsert(*_agency_doc(ag))
+
+
+def remove_agency(agency_id: int) -> None:
+    remove_agencies([agency_id])
+
+
+def remove_agencies(agency_ids: Iterable[int]) -> None:
+    """Drop agencies and their contacts with one pass over each index."""
+    ids = set(agency_ids)
+    agency_index.remove_many(ids)
+    contact_index.remove_where(lambda doc: doc["agency_id"] in ids)
+
+
+def index_contact(ct: models.Contact) -> None:
+    contact_index.upsert(*_contact_doc(ct))
+
+
+def remove_contact(contact_id: int) -> None:
+    contact_index.remove(contact_id)
+
+
+def complete(db: Session, kind: str, prefix: str, limit: int = 10, agency_id: Optional[int] = None) -> List[dict]:
+    ensure_current(db)
+    if kind == "agency":
+        return agency_index.search(prefix, limit)
+    predicate = (lambda doc: doc["agency_id"] == agency_id) if agency_id else None
+    return contact_index.search(prefix, limit, predicate)
@@ -0,0 +1,51 @@
+"""
+Backfill logs.employee_id by matching the free-text `logs.user` to employee names.
+
+Safe to re-run: only logs without an employee_id are touched, in primary-key batches
+committed one at a time, so an interrupted run resumes where it stopped.
+
+Usage:
+    python -m backend.backfill_log_employees
+    python -m backend.backfill_log_employees --batch-size 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from sqlalchemy import inspect
+
+from . import crud
+from .database import SessionLocal, engine
+
+
+def ensure_schema():
+    """Add the employee_id column and its index for databases not managed by alembic."""
+    insp = inspect(engine)
+    cols = {c["name"] for c in insp.get_columns("logs")}
+    indexes = {ix["name"] for ix in insp.get_indexes("logs")}
+    with engine.begin() as conn:
+        if "employee_id" not in cols:
+            conn.exec_driver_sql("ALTER TABLE logs ADD COLUMN employee_id INTEGER REFERENCES employees(id) ON DELETE SET NULL")
+        if "ix_logs_employee_id_datetime" not in indexes:
+            conn.exec_driver_sql(
+                "CREATE INDEX ix_logs_employee_id_datetime ON logs (employee_id, datetime, action, agency_id)"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Link marketing logs to employees by name.")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Logs per committed batch.")
+    args = parser.parse_args()
+
+    ensure_schema()
+    session = SessionLocal()
+    try:
+        linked = crud.backfill_log_employee_ids(session, batch_size=args.batch_size)
+        print(f"Logs linked to employees: {linked}")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Cross-process cache invalidation.
+
+`cache_versions` holds one write counter per cached table, bumped by database
+triggers on every insert/update/delete (ORM writes, bulk statements, imports and
+raw SQL alike), so any worker process can tell with one primary-key read whether
+its in-memory copy is still current. `VersionedCache` builds on that: it reads the
+version *before* loading, so a write racing with a load only causes an extra
+reload, never a stale hit.
+
+The autocomplete index checks the agencies and contacts counters the same way
+(autocomplete.ensure_current) and rebuilds when they move.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, Hashable, List, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from . import models
+
+CACHED_TABLES = ("offices", "employees", "agencies", "contacts")
+
+
+def _sqlite_ddl(table: str) -> List[str]:
+    bump = f"UPDATE cache_versions SET version = version + 1 WHERE name = '{table}';"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_cache_{suffix} AFTER {op} ON {table} BEGIN {bump} END"
+        for suffix, op in (("ai", "INSERT"), ("au", "UPDATE"), ("ad", "DELETE"))
+    ]
+
+
+_POSTGRES_FUNCTION = """
+    CREATE OR REPLACE FUNCTION cache_version_bump() RETURNS trigger AS $$
+    BEGIN
+        UPDATE cache_versions SET version = version + 1 WHERE name = TG_TABLE_NAME;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql
+"""
+
+
+def _postgres_ddl(table: str) -> List[str]:
+    # Statement-level: a bulk import bumps the counter once, not once per row.
+    return [
+        f"DROP TRIGGER IF EXISTS {table}_cache_version ON {table}",
+        f"CREATE TRIGGER {table}_cache_version AFTER INSERT OR UPDATE OR DELETE ON {table} "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION cache_version_bump()",
+    ]
+
+
+def ensure_cache_versions(bind) -> None:
+    """Seed one counter row per cached table and install the bump triggers. Idempotent."""
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            ensure_cache_versions(conn)
+        return
+    conn: Connection = bind
+    existing = set(conn.execute(select(models.CacheVersion.name)).scalars())
+    for table in CACHED_TABLES:
+        if table not in existing:
+            conn.execute(text("INSERT INTO cache_versions (name, version) VALUES (:name, 0)"), {"name": table})
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        conn.exec_driver_sql(_POSTGRES_FUNCTION)
+    for table in CACHED_TABLES:
+        if dialect == "sqlite":
+            stmts = _sqlite_ddl(table)
+        elif dialect == "postgresql":
+            stmts = _postgres_ddl(table)
+        else:
+            stmts = []
+        for stmt in stmts:
+            conn.exec_driver_sql(stmt)
+
+
+def current_version(db: Session, table: str) -> int:
+    version = db.execute(select(models.CacheVersion.version).where(models.CacheVersion.name == table)).scalar()
+    return version or 0
+
+
+def current_versions(db: Session, tables: Tuple[str, ...]) -> Tuple[int, ...]:
+    """Counters for several tables in one query, in the order given."""
+    rows = dict(
+        db.execute(
+            select(models.CacheVersion.name, models.CacheVersion.version).where(models.CacheVersion.name.in_(tables))
+        ).all()
+    )
+    return tuple(rows.get(table, 0) for table in tables)
+
+
+class VersionedCache:
+    """Results derived from one table, keyed by request parameters and dropped when the table's version moves."""
+
+    def __init__(self, table: str):
+        self.table = table
+        self._lock = threading.Lock()
+        self._version = -1
+        self._entries: Dict[Hashable, object] = {}
+
+    def get(self, db: Session, key: Hashable, load: Callable[[], object]):
+        version = current_version(db, self.table)
+        with self._lock:
+            if version == self._version and key in self._entries:
+                return self._entries[key]
+        value = load()
+        with self._lock:
+            if version > self._version:
+                self._version = version
+                self._entries = {}
+            if version == self._version:
+                self._entries[key] = value
+        return value
+
+    def stats(self) -> Tuple[int, int]:
+        """(version, cached entries)"""
+        with self._lock:
+            return self._version, len(self._entries)
+
+
+offices = VersionedCache("offices")
+employees = VersionedCache("employees")
+agencies = VersionedCache("agencies")
@@ -0,0 +1,211 @@
+"""
+Query-plan regression check for the crud layer.
+
+Runs every filtered crud query against an empty in-memory SQLite schema built from
+models.py, captures the SQL it emits, and runs EXPLAIN QUERY PLAN on each statement.
+Exits non-zero if any statement falls back to a full table scan.
+
+Usage:
+    python -m backend.check_query_plans
+    python -m backend.check_query_plans --verbose
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+from datetime import date, datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import create_engine, delete, event, select
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from . import (
+    cache_versions, crud, events, health, kpi_snapshots, log_archive, log_rollup, models, production_cube,
+    production_import, schemas, sync,
+)
+from .database import Base
+
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+# (name, callable issuing the query). Only filtered shapes belong here; unfiltered
+# list endpoints are full scans by definition.
+CHECKS: List[Tuple[str, Callable[[Session], object]]] = [
+    ("get_employees(office)", lambda db: crud.get_employees(db, office="PAS")),
+    ("update_employee", lambda db: crud.update_employee(db, 1, schemas.EmployeeUpdate(name="x"))),
+    ("resolve_employee_id", lambda db: crud.resolve_employee_id(db, "Jane Doe", "PAS")),
+    ("get_employee_metrics", lambda db: crud.get_employee_metrics(db, 1)),
+    ("get_agencies(office)", lambda db: crud.get_agencies(db, office="PAS")),
+    ("update_agency", lambda db: crud.update_agency(db, 1, schemas.AgencyUpdate(name="x"))),
+    ("get_contacts(agency_id)", lambda db: crud.get_contacts(db, agency_id=1)),
+    ("get_contact", lambda db: crud.get_contact(db, 1)),
+    ("update_contact", lambda db: crud.update_contact(db, 1, schemas.ContactUpdate(name="x"))),
+    ("delete_contact", lambda db: crud.delete_contact(db, 1)),
+    ("get_logs(agency_id)", lambda db: crud.get_logs(db, agency_id=1)),
+    ("get_logs(office)", lambda db: crud.get_logs(db, office="PAS")),
+    ("get_logs(office, since)", lambda db: crud.get_logs(db, office="PAS", since=datetime(2025, 1, 1))),
+    ("get_logs(user, action)", lambda db: crud.get_logs(db, user="Jane Doe", action="Phone")),
+    ("iter_log_export_rows(agency_id)", lambda db: list(crud.iter_log_export_rows(db, agency_id=1))),
+    ("update_log", lambda db: crud.update_log(db, 1, schemas.LogUpdate(notes="x"))),
+    ("delete_log", lambda db: crud.delete_log(db, 1)),
+    ("get_tasks(agency_id)", lambda db: crud.get_tasks(db, agency_id=1)),
+    ("get_tasks(owner, status)", lambda db: crud.get_tasks(db, owner="Jane Doe", status=["Open"], sort="due_date")),
+    ("get_tasks(overdue)", lambda db: crud.get_tasks(db, overdue=True, sort="due_date", limit=50)),
+    ("get_tasks(due range)", lambda db: crud.get_tasks(db, due_after=datetime(2025, 1, 1), due_before=datetime(2025, 2, 1))),
+    ("get_task_summary", lambda db: crud.get_task_summary(db)),
+    ("update_task", lambda db: crud.update_task(db, 1, schemas.TaskUpdate(status="Done"))),
+    ("delete_task", lambda db: crud.delete_task(db, 1)),
+    ("reassign_agencies", lambda db: crud.reassign_agencies(db, 1, 2, office="PAS")),
+    ("update_employee(rename)", lambda db: crud.update_employee(db, 1, schemas.EmployeeUpdate(name="Renamed"))),
+    ("delete_agencies", lambda db: crud.delete_agencies(db, [1, 2, 3])),
+    ("get_production(office)", lambda db: crud.get_production(db, office="PAS")),
+    ("get_production(agency_code)", lambda db: crud.get_production(db, agency_code="PAS001")),
+    ("get_production_leaderboard(office)", lambda db: crud.get_production_leaderboard(db, office="PAS")),
+    ("get_production_leaderboard(month)", lambda db: crud.get_production_leaderboard(db, month="2025-01")),
+    ("get_production_leaderboard(latest)", lambda db: crud.get_production_leaderboard(db, metric="wp_growth")),
+    (
+        "bulk_upsert_production",
+        lambda db: crud.bulk_upsert_production(
+            db, [schemas.ProductionCreate(office="PAS", agency_code="PAS001", agency_name="x", month="2025-01")]
+        ),
+    ),
+    (
+        "get_logs(agency, since, archived)",
+        lambda db: crud.get_logs(db, agency_id=1, since=datetime(2020, 1, 1), include_archived=True),
+    ),
+    ("log_archive.archive_logs", lambda db: log_archive.archive_logs(db, datetime(2020, 1, 1), batch_size=10)),
+    ("log_rollup.get_activity(office)", lambda db: log_rollup.get_activity(db, since=date(2025, 1, 1), office="PAS")),
+    ("log_rollup.get_activity(user)", lambda db: log_rollup.get_activity(db, since=date(2025, 1, 1), user="Jane Doe")),
+    (
+        "log_rollup.get_activity(agency, by day)",
+        lambda db: log_rollup.get_activity(db, since=date(2025, 1, 1), agency_id=1, group_by="day"),
+    ),
+    ("cache_versions.current_version", lambda db: cache_versions.current_version(db, "agencies")),
+    ("cache_versions.current_versions", lambda db: cache_versions.current_versions(db, ("agencies", "contacts"))),
+    ("events.changes_between", lambda db: events.changes_between(db, 100, 200)),
+    ("health.last_import", lambda db: health.last_import(db)),
+    ("kpi_snapshots.latest", lambda db: kpi_snapshots.latest(db)),
+    ("production_import.find_duplicate", lambda db: production_import.find_duplicate(db, "PAS", "2025-01", "0" * 64)),
+    ("production_cube._source_key", lambda db: production_cube._source_key(db)),
+    ("sync.get_changes(since)", lambda db: sync.get_changes(db, since=1, limit=100)),
+    (
+        "sync.prune_tombstones",
+        lambda db: (
+            db.add(models.SyncTombstone(table_name="logs", row_id=1, version=1)),
+            db.flush(),
+            sync.prune_tombstones(db, keep=0),
+        ),
+    ),
+    # Statement shapes issued directly by routers/admin.py
+    (
+        "admin: production office+month replace",
+        lambda db: db.execute(
+            delete(models.Production).where(
+                (models.Production.office == "PAS") & (models.Production.month == "2025-01")
+            )
+        ),
+    ),
+    (
+        "admin: agencies in office",
+        lambda db: db.execute(
+            select(models.Agency).where(
+                models.Agency.office_id.in_(select(models.Office.id).where(models.Office.code == "PAS"))
+            )
+        ),
+    ),
+    ("admin: cascade contacts", lambda db: db.execute(delete(models.Contact).where(models.Contact.agency_id == 1))),
+    ("admin: cascade logs", lambda db: db.execute(delete(models.Log).where(models.Log.agency_id == 1))),
+    ("admin: cascade tasks", lambda db: db.execute(delete(models.Task).where(models.Task.agency_id == 1))),
+    (
+        "logs by user and date range",
+        lambda db: db.execute(
+            select(models.Log)
+            .where(models.Log.user == "Jane Doe")
+            .where(models.Log.datetime >= datetime(2025, 1, 1))
+        ),
+    ),
+    (
+        "logs by date range",
+        lambda db: db.execute(select(models.Log).where(models.Log.datetime >= datetime(2025, 1, 1))),
+    ),
+    (
+        "open tasks due before",
+        lambda db: db.execute(
+            select(models.Task).where(models.Task.status == "Open").where(models.Task.due_date < datetime(2025, 1, 1))
+        ),
+    ),
+]
+
+
+def _make_session() -> Session:
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        future=True,
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine, autoflush=False, future=True)()
+
+
+def explain(db: Session, fn: Callable[[Session], object]) -> List[Tuple[str, List[str]]]:
+    """Run `fn`, returning (sql, plan lines) for every non-INSERT statement it issued."""
+    captured: List[Tuple[str, object]] = []
+    engine = db.get_bind()
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(("INSERT", "EXPLAIN")):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        fn(db)
+        db.rollback()
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+
+    results = []
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for statement, parameters in captured:
+            rows = cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            results.append((statement, [row[-1] for row in rows]))
+    finally:
+        raw.close()
+    return results
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    tables = set(Base.metadata.tables)
+    return [line for line in plan if (m := FULL_SCAN.match(line.strip())) and m.group(1) in tables]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if any crud query plan falls back to a full table scan.")
+    parser.add_argument("--verbose", action="store_true", help="Print every statement and its plan.")
+    args = parser.parse_args()
+
+    db = _make_session()
+    failures = 0
+    try:
+        for name, fn in CHECKS:
+            for statement, plan in explain(db, fn):
+                scans = full_scans(plan)
+                if scans or args.verbose:
+                    print(f"[{'FAIL' if scans else 'ok'}] {name}")
+                    print("    " + " ".join(statement.split()))
+                    for line in plan:
+                        print(f"      {line}")
+                failures += bool(scans)
+    finally:
+        db.close()
+
+    if failures:
+        raise SystemExit(f"{failures} statement(s) fall back to a full table scan.")
+    print(f"All {len(CHECKS)} query shapes are index-backed.")
+
+
+if __name__ == "__main__":
+    main()
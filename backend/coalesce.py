@@ -0,0 +1,116 @@
+"""
+Single-flight coalescing for aggregate endpoints.
+
+Identical requests that arrive while the same computation is already running wait
+for it and share its result instead of issuing the same heavy query again; the
+result is then served for `COALESCE_TTL_SECONDS` more. The key is the route, its
+normalized parameters and the current sync version (bumped by triggers on every
+write to a synced table), so a committed write starts a new key instead of waiting
+out the TTL. Errors are shared with the waiters of that flight but never cached.
+
+Aggregate endpoints are sync functions run in the threadpool, so waiters block on
+a threading.Event. Results are shared objects: callers must not mutate them.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from sqlalchemy.orm import Session
+
+from . import sync
+
+T = TypeVar("T")
+
+TTL_SECONDS = float(os.getenv("COALESCE_TTL_SECONDS", "5"))
+MAX_ENTRIES = 1024
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    def __init__(self, ttl: float = TTL_SECONDS, max_entries: int = MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._results: Dict[Hashable, Tuple[float, Any]] = {}
+        self.stats = {"executed": 0, "coalesced": 0, "cached": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Run `fn` once per key: concurrent callers wait for the leader, later ones get the cached result."""
+        with self._lock:
+            hit = self._results.get(key)
+            if hit is not None and hit[0] > time.monotonic():
+                self.stats["cached"] += 1
+                return hit[1]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                self.stats["executed"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if flight.error is None and self.ttl > 0:
+                    self._store(key, flight.result)
+            flight.done.set()
+        return flight.result
+
+    def _store(self, key: Hashable, result: Any) -> None:
+        now = time.monotonic()
+        if len(self._results) >= self.max_entries:
+            self._results = {k: v for k, v in self._results.items() if v[0] > now}
+            if len(self._results) >= self.max_entries:
+                self._results.clear()
+        self._results[key] = (now + self.ttl, result)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+
+
+flights = SingleFlight()
+
+
+def _normalize(value: Any) -> Hashable:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted(_normalize(v) for v in value))
+    return value
+
+
+def request_key(route: str, params: Dict[str, Any], version: int) -> Tuple:
+    """Route + sorted non-empty params + data version; param order and None defaults do not split keys."""
+    normalized = tuple(sorted((name, _normalize(v)) for name, v in params.items() if v is not None))
+    return (route, normalized, version)
+
+
+def coalesced(db: Session, route: str, params: Dict[str, Any], fn: Callable[[], T]) -> T:
+    return flights.do(request_key(route, params, sync.current_version(db)), fn)
@@ -1,8 +1,11 @@
+import base64
+import json
+from datetime import datetime
 from typing import List, Optional
-from sqlalchemy.orm import Session, selectinload
-from sqlalchemy import select, update, delete
+from sqlalchemy.orm import Session
+from sqlalchemy import select, update, delete, func, and_, or_, case, cast, Integer
 
-from . import models, schemas
+from . import autocomplete, events, log_archive, log_rollup, models, production_cube, schemas
 
 
 # Offices
@@ -15,6 +18,7 @@ def create_office(db: Session, office: schemas.OfficeCreate) -> models.Office:
     db.add(db_office)
     db.commit()
     db.refresh(db_office)
+    events.notify()
     return db_office
 
 
@@ -24,6 +28,7 @@ def create_employee(db: Session, emp: schemas.EmployeeCreate) -> models.Employee
     db.add(db_emp)
     db.commit()
     db.refresh(db_emp)
+    events.notify()
     return db_emp
 
 
@@ -38,24 +43,111 @@ def update_employee(db: Session, emp_id: int, payload: schemas.EmployeeUpdate) -
     db_emp = db.get(models.Employee, emp_id)
     if not db_emp:
         return None
-    for field, value in payload.model_dump(exclude_unset=True).items():
+    data = payload.model_dump(exclude_unset=True)
+    if "name" in data and data["name"] != db_emp.name:
+        # Keep the denormalized agencies.primary_underwriter in step, in one statement.
+        db.execute(
+            update(models.Agency)
+            .where(models.Agency.primary_underwriter_id == emp_id)
+            .values(primary_underwriter=data["name"])
+            .execution_options(synchronize_session=False)
+        )
+    for field, value in data.items():
         setattr(db_emp, field, value)
     db.commit()
     db.refresh(db_emp)
+    events.notify()
     return db_emp
 
 
+def employee_name_key(name: Optional[str]) -> str:
+    """Normalized form used to match free-text log users to employee names."""
+    return (name or "").strip().lower()
+
+
+def resolve_employee_id(db: Session, user: Optional[str], office: Optional[str] = None) -> Optional[int]:
+    """Match a free-text log user to an employee; same-named employees are disambiguated by office code."""
+    key = employee_name_key(user)
+    if not key:
+        return None
+    stmt = (
+        select(models.Employee.id, models.Office.code)
+        .outerjoin(models.Office, models.Employee.office_id == models.Office.id)
+        .where(func.lower(func.trim(models.Employee.name)) == key)
+        .order_by(models.Employee.id)
+    )
+    rows = db.execute(stmt).all()
+    for emp_id, office_code in rows:
+        if office and office_code == office:
+            return emp_id
+    return rows[0][0] if rows else None
+
+
+def _period_bucket(db: Session, column, period: str):
+    """SQL expression bucketing a datetime column into 'day', 'week' (ISO 8601, e.g. 2025-W01) or 'month' labels."""
+    if db.get_bind().dialect.name == "sqlite":
+        if period == "week":
+            # SQLite before 3.46 has no %G/%V: an ISO week belongs to the year of its Thursday.
+            thursday = func.date(column, "-3 days", "weekday 4")
+            week = (cast(func.strftime("%j", thursday), Integer) + 6) // 7
+            return func.printf("%s-W%02d", func.strftime("%Y", thursday), week)
+        fmt = {"day": "%Y-%m-%d", "month": "%Y-%m"}[period]
+        return func.strftime(fmt, column)
+    fmt = {"day": "YYYY-MM-DD", "week": 'IYYY-"W"IW', "month": "YYYY-MM"}[period]
+    return func.to_char(column, fmt)
+
+
+def get_employee_metrics(
+    db: Session,
+    emp_id: int,
+    period: str = "month",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Optional[dict]:
+    """Call activity for one employee; every query is a range scan on ix_logs_employee_id_datetime."""
+    db_emp = db.get(models.Employee, emp_id)
+    if not db_emp:
+        return None
+
+    filters = [models.Log.employee_id == emp_id]
+    if since:
+        filters.append(models.Log.datetime >= since)
+    if until:
+        filters.append(models.Log.datetime < until)
+
+    total, agencies_touched, last_activity = db.execute(
+        select(
+            func.count(models.Log.id),
+            func.count(func.distinct(models.Log.agency_id)),
+            func.max(models.Log.datetime),
+        ).where(*filters)
+    ).one()
+    by_action = db.execute(
+        select(models.Log.action, func.count(models.Log.id)).where(*filters).group_by(models.Log.action)
+    ).all()
+    bucket = _period_bucket(db, models.Log.datetime, period).label("period")
+    by_period = db.execute(
+        select(bucket, func.count(models.Log.id)).where(*filters).group_by(bucket).order_by(bucket)
+    ).all()
+
+    return {
+        "employee_id": db_emp.id,
+        "name": db_emp.name,
+        "total_calls": total,
+        "calls_by_action": {action: count for action, count in by_action},
+        "calls_by_period": [{"period": p, "count": c} for p, c in by_period],
+        "agencies_touched": agencies_touched,
+        "last_activity": last_activity,
+    }
+
+
 # Agencies
 def get_agencies(db: Session, office: Optional[str] = None) -> List[models.Agency]:
-    stmt = select(models.Agency).options(selectinload(models.Agency.underwriter_rel))
+    # primary_underwriter is kept in sync by update_employee / reassign_agencies, so it is read as stored.
+    stmt = select(models.Agency)
     if office:
         stmt = stmt.join(models.Office).where(models.Office.code == office)
-    agencies = db.execute(stmt).scalars().all()
-    # Attach friendly underwriter name for schema serialization; prefer linked employee, otherwise keep stored value
-    for ag in agencies:
-        if ag.underwriter_rel and ag.underwriter_rel.name:
-            ag.primary_underwriter = ag.underwriter_rel.name
-    return agencies
+    return db.execute(stmt).scalars().all()
 
 
 def create_agency(db: Session, ag: schemas.AgencyCreate) -> models.Agency:
@@ -66,14 +158,14 @@ def create_agency(db: Session, ag: schemas.AgencyCreate) -> models.Agency:
     if not underwriter_name:
         underwriter_name = ag.primary_underwriter
 
-    db_ag = models.Agency(**ag.model_dump(), primary_underwriter=underwriter_name)
+    data = ag.model_dump()
+    data["primary_underwriter"] = underwriter_name
+    db_ag = models.Agency(**data)
     db.add(db_ag)
     db.commit()
     db.refresh(db_ag)
-    if db_ag.underwriter_rel and db_ag.underwriter_rel.name:
-        db_ag.primary_underwriter = db_ag.underwriter_rel.name
-        db.commit()
-        db.refresh(db_ag)
+    autocomplete.index_agency(db_ag)
+    events.notify()
     return db_ag
 
 
@@ -93,9 +185,90 @@ def update_agency(db: Session, agency_id: int, payload: schemas.AgencyUpdate) ->
         setattr(db_ag, field, value)
     db.commit()
     db.refresh(db_ag)
+    autocomplete.index_agency(db_ag)
+    events.notify()
     return db_ag
 
 
+def reassign_agencies(db: Session, from_id: int, to_id: int, office: Optional[str] = None) -> List[int]:
+    """
+    Move every agency of underwriter `from_id` (optionally only in `office`) to `to_id`
+    with one UPDATE, carrying the new display name. Returns the ids of the agencies moved.
+    """
+    to_name = select(models.Employee.name).where(models.Employee.id == to_id).scalar_subquery()
+    stmt = (
+        update(models.Agency)
+        .where(models.Agency.primary_underwriter_id == from_id)
+        .values(primary_underwriter_id=to_id, primary_underwriter=to_name)
+        .returning(models.Agency.id)
+        .execution_options(synchronize_session=False)
+    )
+    if office:
+        stmt = stmt.where(models.Agency.office_id.in_(select(models.Office.id).where(models.Office.code == office)))
+    moved = db.execute(stmt).scalars().all()
+    db.commit()
+    events.notify()
+    return moved
+
+
+def sync_underwriter_names(bind) -> None:
+    """One-off repair: copy employees.name onto agencies whose stored underwriter name has drifted."""
+    name = select(models.Employee.name).where(models.Employee.id == models.Agency.primary_underwriter_id).scalar_subquery()
+    bind.execute(
+        update(models.Agency)
+        .where(models.Agency.primary_underwriter_id.is_not(None), models.Agency.primary_underwriter.is_distinct_from(name))
+        .values(primary_underwriter=name)
+    )
+
+
+# Child rows removed with their agency: (event table, model)
+AGENCY_CHILD_TABLES = (
+    ("contacts", models.Contact),
+    ("logs", models.Log),
+    ("logs", models.LogArchive),
+    ("tasks", models.Task),
+)
+
+
+def delete_agencies(db: Session, agency_ids: List[int], chunk_size: int = 500) -> dict:
+    """
+    Delete agencies and their contacts, logs (hot and archived) and tasks with set-based
+    DELETE ... WHERE agency_id IN (...) statements, `chunk_size` ids at a time, in one
+    transaction. Nothing is loaded into the session. Returns per-table counts and the ids not found.
+    """
+    requested = list(dict.fromkeys(agency_ids))
+    found: List[int] = []
+    counts = {"agencies": 0, "contacts": 0, "logs": 0, "tasks": 0}
+    for start in range(0, len(requested), chunk_size):
+        chunk = db.execute(
+            select(models.Agency.id).where(models.Agency.id.in_(requested[start:start + chunk_size]))
+        ).scalars().all()
+        if not chunk:
+            continue
+        for table, model in AGENCY_CHILD_TABLES:
+            result = db.execute(
+                delete(model).where(model.agency_id.in_(chunk)).execution_options(synchronize_session=False)
+            )
+            counts[table] += result.rowcount
+        log_rollup.forget_agencies(db, chunk)
+        result = db.execute(
+            delete(models.Agency).where(models.Agency.id.in_(chunk)).execution_options(synchronize_session=False)
+        )
+        counts["agencies"] += result.rowcount
+        found.extend(chunk)
+    db.commit()
+    db.expire_all()
+
+    autocomplete.remove_agencies(found)
+    events.notify()
+    found_set = set(found)
+    return {**counts, "missing": [i for i in requested if i not in found_set]}
+
+
+def delete_agency(db: Session, agency_id: int) -> bool:
+    return delete_agencies(db, [agency_id])["agencies"] > 0
+
+
 # Contacts
 def get_contacts(db: Session, agency_id: Optional[int] = None) -> List[models.Contact]:
     stmt = select(models.Contact)
@@ -113,6 +286,8 @@ def create_contact(db: Session, contact: schemas.ContactCreate) -> models.Contac
     db.add(db_contact)
     db.commit()
     db.refresh(db_contact)
+    autocomplete.index_contact(db_contact)
+    events.notify()
     return db_contact
 
 
@@ -124,6 +299,8 @@ def update_contact(db: Session, contact_id: int, payload: schemas.ContactUpdate)
         setattr(db_ct, field, value)
     db.commit()
     db.refresh(db_ct)
+    autocomplete.index_contact(db_ct)
+    events.notify()
     return db_ct
 
 
@@ -133,22 +310,114 @@ def delete_contact(db: Session, contact_id: int) -> bool:
         return False
     db.delete(db_ct)
     db.commit()
+    autocomplete.remove_contact(contact_id)
+    events.notify()
     return True
 
 
 # Logs
-def get_logs(db: Session, agency_id: Optional[int] = None) -> List[models.Log]:
-    stmt = select(models.Log)
+def _log_filters(
+    agency_id: Optional[int] = None,
+    office: Optional[str] = None,
+    user: Optional[str] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    model=models.Log,
+) -> list:
+    filters = []
     if agency_id:
-        stmt = stmt.where(models.Log.agency_id == agency_id)
-    return db.execute(stmt).scalars().all()
+        filters.append(model.agency_id == agency_id)
+    if office:
+        filters.append(model.office == office)
+    if user:
+        filters.append(model.user == user)
+    if action:
+        filters.append(model.action == action)
+    if since:
+        filters.append(model.datetime >= since)
+    if until:
+        filters.append(model.datetime < until)
+    return filters
+
+
+def get_logs(
+    db: Session,
+    agency_id: Optional[int] = None,
+    office: Optional[str] = None,
+    user: Optional[str] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_archived: bool = False,
+) -> List[models.Log]:
+    """Hot logs matching the filters, plus archived ones when asked to or when `since` / `until` reaches into the archive."""
+    stmt = select(models.Log).where(*_log_filters(agency_id, office, user, action, since, until))
+    logs = db.execute(stmt).scalars().all()
+    if log_archive.needs_archive(db, since, until, include_archived):
+        archived = select(models.LogArchive).where(
+            *_log_filters(agency_id, office, user, action, since, until, model=models.LogArchive)
+        )
+        logs = db.execute(archived).scalars().all() + logs
+    return logs
+
+
+LOG_EXPORT_COLUMNS = ["ID", "Datetime", "User", "Office", "Action", "Agency ID", "Agency Code", "Agency Name", "Contact", "Notes"]
+
+
+def _log_export_select(model, filters: dict):
+    return (
+        select(
+            model.id,
+            model.datetime,
+            model.user,
+            model.office,
+            model.action,
+            model.agency_id,
+            models.Agency.code,
+            models.Agency.name,
+            model.contact,
+            model.notes,
+        )
+        .outerjoin(models.Agency, model.agency_id == models.Agency.id)
+        .where(*_log_filters(**filters, model=model))
+    )
+
+
+def iter_log_export_rows(
+    db: Session,
+    agency_id: Optional[int] = None,
+    office: Optional[str] = None,
+    user: Optional[str] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_archived: bool = False,
+    batch_size: int = 1000,
+):
+    """Yield export tuples (see LOG_EXPORT_COLUMNS) from a server-side cursor, `batch_size` rows at a time."""
+    filters = dict(agency_id=agency_id, office=office, user=user, action=action, since=since, until=until)
+    stmt = _log_export_select(models.Log, filters)
+    if log_archive.needs_archive(db, since, until, include_archived):
+        combined = stmt.union_all(_log_export_select(models.LogArchive, filters)).subquery()
+        stmt = select(combined).order_by(combined.c.datetime, combined.c.id)
+    else:
+        stmt = stmt.order_by(models.Log.datetime, models.Log.id)
+    stmt = stmt.execution_options(stream_results=True, yield_per=batch_size)
+    for partition in db.execute(stmt).partitions():
+        yield from partition
 
 
 def create_log(db: Session, log: schemas.LogCreate) -> models.Log:
-    db_log = models.Log(**log.model_dump())
+    data = log.model_dump()
+    if data.get("employee_id") is None:
+        data["employee_id"] = resolve_employee_id(db, data["user"], data.get("office"))
+    db_log = models.Log(**data)
     db.add(db_log)
+    log_rollup.bump(db, log_rollup.rollup_key(db_log), 1)
     db.commit()
     db.refresh(db_log)
+    events.notify()
     return db_log
 
 
@@ -156,10 +425,16 @@ def update_log(db: Session, log_id: int, payload: schemas.LogUpdate) -> Optional
     db_log = db.get(models.Log, log_id)
     if not db_log:
         return None
-    for field, value in payload.model_dump(exclude_unset=True).items():
+    data = payload.model_dump(exclude_unset=True)
+    if "user" in data and "employee_id" not in data:
+        data["employee_id"] = resolve_employee_id(db, data["user"], data.get("office", db_log.office))
+    old_key = log_rollup.rollup_key(db_log)
+    for field, value in data.items():
         setattr(db_log, field, value)
+    log_rollup.move(db, old_key, log_rollup.rollup_key(db_log))
     db.commit()
     db.refresh(db_log)
+    events.notify()
     return db_log
 
 
@@ -167,24 +442,180 @@ def delete_log(db: Session, log_id: int) -> bool:
     db_log = db.get(models.Log, log_id)
     if not db_log:
         return False
+    log_rollup.bump(db, log_rollup.rollup_key(db_log), -1)
     db.delete(db_log)
     db.commit()
+    events.notify()
     return True
 
 
+def backfill_log_employee_ids(db: Session, batch_size: int = 5000) -> int:
+    """
+    Link existing logs to employees by matching `log.user` against employee names.
+    Walks unlinked logs in primary-key batches and commits per batch, so it can be re-run to resume.
+    Returns number of logs linked.
+    """
+    by_name = {}
+    by_name_office = {}
+    stmt = (
+        select(models.Employee.id, models.Employee.name, models.Office.code)
+        .outerjoin(models.Office, models.Employee.office_id == models.Office.id)
+        .order_by(models.Employee.id)
+    )
+    for emp_id, name, office_code in db.execute(stmt):
+        key = employee_name_key(name)
+        by_name.setdefault(key, emp_id)
+        by_name_office.setdefault((key, office_code), emp_id)
+
+    linked = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(models.Log.id, models.Log.user, models.Log.office)
+            .where(models.Log.employee_id.is_(None), models.Log.id > last_id)
+            .order_by(models.Log.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        updates = []
+        for log_id, user, office in rows:
+            key = employee_name_key(user)
+            emp_id = by_name_office.get((key, office)) or by_name.get(key)
+            if emp_id:
+                updates.append({"id": log_id, "employee_id": emp_id})
+        if updates:
+            db.execute(update(models.Log), updates)
+        db.commit()
+        linked += len(updates)
+    return linked
+
+
 # Tasks
-def get_tasks(db: Session, agency_id: Optional[int] = None) -> List[models.Task]:
+TASK_COMPLETED_STATUSES = ("Completed", "Done", "Closed")
+TASK_SORTS = ("id", "-id", "due_date", "-due_date")
+
+
+def _task_is_open():
+    return or_(models.Task.status.is_(None), models.Task.status.notin_(TASK_COMPLETED_STATUSES))
+
+
+def encode_task_cursor(task: models.Task, sort: str = "id") -> str:
+    """Opaque keyset cursor pointing just past `task` in the given sort order."""
+    value = getattr(task, sort.lstrip("-"))
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps({"v": value, "id": task.id}).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _decode_task_cursor(cursor: str, sort: str):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value, last_id = data["v"], int(data["id"])
+        if sort.lstrip("-") == "due_date" and value is not None:
+            value = datetime.fromisoformat(value)
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    return value, last_id
+
+
+def _task_keyset(sort: str, value, last_id: int):
+    """WHERE clause for rows after (value, last_id); due_date NULLs sort first ascending, last descending."""
+    if sort == "id":
+        return models.Task.id > last_id
+    if sort == "-id":
+        return models.Task.id < last_id
+    col = models.Task.due_date
+    if sort == "due_date":
+        if value is None:
+            return or_(and_(col.is_(None), models.Task.id > last_id), col.is_not(None))
+        return or_(col > value, and_(col == value, models.Task.id > last_id))
+    if value is None:
+        return and_(col.is_(None), models.Task.id < last_id)
+    return or_(col < value, and_(col == value, models.Task.id < last_id), col.is_(None))
+
+
+def get_tasks(
+    db: Session,
+    agency_id: Optional[int] = None,
+    owner: Optional[str] = None,
+    status: Optional[List[str]] = None,
+    due_before: Optional[datetime] = None,
+    due_after: Optional[datetime] = None,
+    overdue: bool = False,
+    sort: str = "id",
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> List[models.Task]:
+    """
+    Filtered task queue with keyset paging.
+    Pass `encode_task_cursor(last_row, sort)` back as `cursor` to fetch the next page.
+    Raises ValueError for an unknown sort or a malformed cursor.
+    """
+    if sort not in TASK_SORTS:
+        raise ValueError(f"sort must be one of {', '.join(TASK_SORTS)}")
     stmt = select(models.Task)
     if agency_id:
         stmt = stmt.where(models.Task.agency_id == agency_id)
+    if owner:
+        stmt = stmt.where(models.Task.owner == owner)
+    if status:
+        stmt = stmt.where(models.Task.status.in_(status))
+    if due_before:
+        stmt = stmt.where(models.Task.due_date < due_before)
+    if due_after:
+        stmt = stmt.where(models.Task.due_date >= due_after)
+    if overdue:
+        stmt = stmt.where(models.Task.due_date < datetime.now()).where(_task_is_open())
+    if cursor:
+        stmt = stmt.where(_task_keyset(sort, *_decode_task_cursor(cursor, sort)))
+
+    if sort == "id":
+        stmt = stmt.order_by(models.Task.id.asc())
+    elif sort == "-id":
+        stmt = stmt.order_by(models.Task.id.desc())
+    elif sort == "due_date":
+        stmt = stmt.order_by(models.Task.due_date.asc().nulls_first(), models.Task.id.asc())
+    else:
+        stmt = stmt.order_by(models.Task.due_date.desc().nulls_last(), models.Task.id.desc())
+    if limit:
+        stmt = stmt.limit(limit)
     return db.execute(stmt).scalars().all()
 
 
+def get_task_summary(db: Session, office: Optional[str] = None) -> List[dict]:
+    """Open/overdue/completed counts per (owner, office) from one grouped query."""
+    is_open = _task_is_open()
+    is_overdue = and_(is_open, models.Task.due_date < datetime.now())
+    stmt = (
+        select(
+            models.Task.owner,
+            models.Office.code,
+            func.sum(case((is_open, 1), else_=0)),
+            func.sum(case((is_overdue, 1), else_=0)),
+            func.sum(case((is_open, 0), else_=1)),
+        )
+        .outerjoin(models.Agency, models.Task.agency_id == models.Agency.id)
+        .outerjoin(models.Office, models.Agency.office_id == models.Office.id)
+        .group_by(models.Task.owner, models.Office.code)
+        .order_by(models.Task.owner, models.Office.code)
+    )
+    if office:
+        stmt = stmt.where(models.Office.code == office)
+    return [
+        {"owner": owner, "office": office_code, "open": n_open, "overdue": n_overdue, "completed": n_done}
+        for owner, office_code, n_open, n_overdue, n_done in db.execute(stmt)
+    ]
+
+
 def create_task(db: Session, task: schemas.TaskCreate) -> models.Task:
     db_task = models.Task(**task.model_dump())
     db.add(db_task)
     db.commit()
     db.refresh(db_task)
+    events.notify()
     return db_task
 
 
@@ -196,6 +627,7 @@ def update_task(db: Session, task_id: int, payload: schemas.TaskUpdate) -> Optio
         setattr(db_task, field, value)
     db.commit()
     db.refresh(db_task)
+    events.notify()
     return db_task
 
 
@@ -205,6 +637,7 @@ def delete_task(db: Session, task_id: int) -> bool:
         return False
     db.delete(db_task)
     db.commit()
+    events.notify()
     return True
 
 
@@ -218,11 +651,61 @@ def get_production(db: Session, office: Optional[str] = None, agency_code: Optio
     return db.execute(stmt).scalars().all()
 
 
+LEADERBOARD_METRICS = {
+    "all_ytd_wp": func.coalesce(models.Production.all_ytd_wp, 0),
+    "all_ytd_nb": func.coalesce(models.Production.all_ytd_nb, 0),
+    "wp_growth": func.coalesce(models.Production.all_ytd_wp, 0) - func.coalesce(models.Production.pytd_wp, 0),
+    "nb_growth": func.coalesce(models.Production.all_ytd_nb, 0) - func.coalesce(models.Production.pytd_nb, 0),
+}
+
+
+def get_production_leaderboard(
+    db: Session,
+    office: Optional[str] = None,
+    month: Optional[str] = None,
+    metric: str = "all_ytd_wp",
+    limit: int = 25,
+) -> List[dict]:
+    """
+    Top `limit` agencies per office for one month, ranked with RANK() OVER (PARTITION BY office).
+    Only that month's rows are read (via the office/month indexes), so cost does not grow with history.
+    """
+    if month is None:
+        latest = select(func.max(models.Production.month))
+        if office:
+            latest = latest.where(models.Production.office == office)
+        month = db.execute(latest).scalar()
+        if month is None:
+            return []
+
+    value = LEADERBOARD_METRICS[metric].label("value")
+    ranked = select(
+        models.Production.office,
+        models.Production.month,
+        models.Production.agency_code,
+        models.Production.agency_name,
+        models.Production.all_ytd_wp,
+        models.Production.all_ytd_nb,
+        models.Production.pytd_wp,
+        models.Production.pytd_nb,
+        value,
+        func.rank().over(partition_by=models.Production.office, order_by=value.desc()).label("rank"),
+    ).where(models.Production.month == month)
+    if office:
+        ranked = ranked.where(models.Production.office == office)
+    ranked = ranked.subquery()
+
+    stmt = select(ranked).where(ranked.c.rank <= limit).order_by(ranked.c.office, ranked.c.rank, ranked.c.agency_code)
+    return [dict(row._mapping) for row in db.execute(stmt)]
+
+
 def create_production(db: Session, payload: schemas.ProductionCreate) -> models.Production:
     db_prod = models.Production(**payload.model_dump())
     db.add(db_prod)
     db.commit()
     db.refresh(db_prod)
+    production_cube.patch(db, cells=[(db_prod.agency_code, db_prod.month)])
+    events.notify()
     return db_prod
 
 
@@ -252,4 +735,6 @@ def bulk_upsert_production(db: Session, rows: List[schemas.ProductionCreate]) ->
             db.add(models.Production(**payload.model_dump()))
         count += 1
     db.commit()
+    production_cube.patch(db, cells=[(r.agency_code, r.month) for r in rows])
+    events.notify()
     return count
@@ -0,0 +1,262 @@
+"""
+Change feed for `GET /events` (server-sent events), shared by every worker.
+
+Events are derived from the row-version sync state (sync.py), not published in
+memory, so a client connected to any worker sees writes made through every worker,
+production imports and raw SQL alike. While a process has subscribers, one poller
+thread reads the `sync_state` counter every POLL_SECONDS (a primary-key read) and,
+when it has moved, turns the changed rows and tombstones into events. Write paths
+call `notify()` after they commit so their own changes go out without waiting for
+the next poll.
+
+Event ids are sync versions, which mean the same thing in every worker, so a client
+can reconnect to any of them with Last-Event-ID. Recent events are replayed from a
+ring buffer, older ones from the database; an id older than the pruned tombstones
+(or from a different database) gets a reset instead. A table with more than
+BULK_THRESHOLD changes in one batch gets a single `bulk` event. Offices and employees
+are not row-versioned: their cache_versions counters produce live `bulk` notices only.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from . import cache_versions, models, sync
+from .database import SessionLocal
+
+logger = logging.getLogger("uvicorn.error")
+
+HISTORY_SIZE = 2000
+HEARTBEAT_SECONDS = 15.0
+POLL_SECONDS = float(os.getenv("EVENTS_POLL_SECONDS", "1"))
+BULK_THRESHOLD = 200
+UNVERSIONED_TABLES = ("offices", "employees")
+
+
+def _bulk(table: str, version: int) -> dict:
+    return {"table": table, "id": None, "op": "bulk", "version": version, "ts": time.time()}
+
+
+def changes_between(db: Session, after: int, upto: int) -> List[dict]:
+    """Events for sync versions in (after, upto], oldest first."""
+    now = time.time()
+    events: List[dict] = []
+    for table, (model, _) in sync.SYNC_TABLES.items():
+        agency_col = model.id if model is models.Agency else getattr(model, "agency_id", None)
+        cols = [model.id, model.row_version] + ([agency_col] if agency_col is not None else [])
+        rows = db.execute(
+            select(*cols)
+            .where(model.row_version > after, model.row_version <= upto)
+            .order_by(model.row_version)
+            .limit(BULK_THRESHOLD + 1)
+        ).all()
+        if len(rows) > BULK_THRESHOLD:
+            events.append(_bulk(table, upto))
+            continue
+        for row in rows:
+            event = {"table": table, "id": row[0], "op": "upsert", "version": row[1], "ts": now}
+            if agency_col is not None and row[2] is not None:
+                event["agency_id"] = row[2]
+            events.append(event)
+
+    tombstones = db.execute(
+        select(models.SyncTombstone.table_name, models.SyncTombstone.row_id, models.SyncTombstone.version)
+        .where(models.SyncTombstone.version > after, models.SyncTombstone.version <= upto)
+        .order_by(models.SyncTombstone.version)
+        .limit(BULK_THRESHOLD + 1)
+    ).all()
+    if len(tombstones) > BULK_THRESHOLD:
+        tables = db.execute(
+            select(models.SyncTombstone.table_name)
+            .where(models.SyncTombstone.version > after, models.SyncTombstone.version <= upto)
+            .distinct()
+        ).scalars()
+        events.extend(_bulk(table, upto) for table in tables)
+    else:
+        events.extend(
+            {"table": table, "id": row_id, "op": "delete", "version": version, "ts": now}
+            for table, row_id, version in tombstones
+        )
+    events.sort(key=lambda e: e["version"])
+    return events
+
+
+class ChangeBus:
+    def __init__(self, history_size: int = HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._version = 0
+        self._counters: Tuple[int, ...] = ()
+        self._history_size = history_size
+        # `_history` holds every event after `_history_from`.
+        self._history: Deque[dict] = deque()
+        self._history_from = 0
+        self._subscribers: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = set()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def notify(self) -> None:
+        """Poll now rather than at the next interval; called after a local commit."""
+        self._wake.set()
+
+    def _seed(self) -> None:
+        with SessionLocal() as db:
+            version = sync.current_version(db)
+            counters = cache_versions.current_versions(db, UNVERSIONED_TABLES)
+        with self._lock:
+            self._version, self._counters = version, counters
+            self._history.clear()
+            self._history_from = version
+
+    def poll(self) -> None:
+        """Turn changes since the last poll into events for the subscribers."""
+        with self._poll_lock:
+            with SessionLocal() as db:
+                version = sync.current_version(db)
+                counters = cache_versions.current_versions(db, UNVERSIONED_TABLES)
+                events = changes_between(db, self._version, version) if version > self._version else []
+            events.extend(
+                _bulk(table, version)
+                for table, old, new in zip(UNVERSIONED_TABLES, self._counters, counters)
+                if new != old
+            )
+            with self._lock:
+                self._version, self._counters = version, counters
+                for event in events:
+                    if len(self._history) >= self._history_size:
+                        self._history_from = self._history.popleft()["version"]
+                    self._history.append(event)
+                subscribers = list(self._subscribers)
+        for event in events:
+            for loop, queue in subscribers:
+                try:
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+                except RuntimeError:
+                    # Loop already closed; the subscriber is going away.
+                    pass
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(POLL_SECONDS)
+            self._wake.clear()
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            try:
+                self.poll()
+            except SQLAlchemyError:
+                logger.exception("Change feed poll failed")
+
+    def since(self, version: int) -> Optional[List[dict]]:
+        """
+        Events after `version`, or None if they cannot be replayed: tombstones that old are
+        pruned, or the version is ahead of this database (restored or a different one).
+        """
+        with self._lock:
+            if version > self._version:
+                return None
+            if version >= self._history_from:
+                return [e for e in self._history if e["version"] > version]
+            upto = self._version
+        with SessionLocal() as db:
+            if version < sync.pruned_version(db):
+                return None
+            return changes_between(db, version, upto)
+
+    def subscribe(self, token: Tuple[asyncio.AbstractEventLoop, asyncio.Queue]) -> int:
+        """Register a queue for live events, starting the poller if needed; returns the current version."""
+        with self._lock:
+            self._subscribers.add(token)
+            thread = None
+            if self._thread is None:
+                thread = self._thread = threading.Thread(target=self._run, name="events-poller", daemon=True)
+        with self._poll_lock:
+            if thread is not None:
+                self._seed()
+                thread.start()
+            return self._version
+
+    def unsubscribe(self, token) -> None:
+        with self._lock:
+            self._subscribers.discard(token)
+
+
+bus = ChangeBus()
+
+
+def notify() -> None:
+    bus.notify()
+
+
+def parse_event_id(value: Optional[str]) -> Optional[int]:
+    """Sync version from a Last-Event-ID; anything else (e.g. a pre-upgrade `<epoch>-<n>` id) forces a reset."""
+    if value is None:
+        return None
+    try:
+        return int(value.strip())
+    except ValueError:
+        return -1
+
+
+def format_sse(event: dict) -> str:
+    return f"id: {event['version']}\nevent: change\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+async def stream(last_event_id: Optional[str] = None, tables: Optional[Set[str]] = None):
+    """Async generator of SSE frames: replay after `last_event_id`, then live events with heartbeats."""
+    token = (asyncio.get_running_loop(), asyncio.Queue())
+    try:
+        current = await run_in_threadpool(bus.subscribe, token)
+        _, queue = token
+        resume = parse_event_id(last_event_id)
+        sent = current
+        if resume is not None:
+            backlog = await run_in_threadpool(bus.since, resume) if resume >= 0 else None
+            if backlog is None:
+                # Too far behind to replay, or an id from elsewhere: tell the client to do one full reload.
+                yield f"id: {current}\nevent: reset\ndata: {json.dumps({'version': current})}\n\n"
+                backlog = []
+            else:
+                sent = resume
+            for event in backlog:
+                if not tables or event["table"] in tables:
+                    yield format_sse(event)
+                sent = max(sent, event["version"])
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event["table"] in sync.SYNC_TABLES:
+                # Already replayed; offices / employees notices carry the current version and are never replayed.
+                if event["version"] <= sent:
+                    continue
+                sent = event["version"]
+            if not tables or event["table"] in tables:
+                yield format_sse(event)
+    finally:
+        bus.unsubscribe(token)
+
+
+def table_filter(tables: Optional[List[str]]) -> Optional[Set[str]]:
+    if not tables:
+        return None
+    return {t.strip() for item in tables for t in item.split(",") if t.strip()}
@@ -0,0 +1,180 @@
+"""
+Liveness / readiness probes and operator diagnostics.
+
+`/livez` answers from the event loop without touching the database. `/readyz`
+(and the legacy `/health`) serve the last `SELECT 1` probe, re-running it at most
+every READY_CACHE_SECONDS, so load balancers probing every second cost nothing.
+They also report not-ready while the schema is known to be incomplete (setup failed,
+or SCHEMA_SETUP=skip against an un-migrated database); each probe re-checks it until
+it is fixed. `/admin/health/details` adds connection-pool counters, recent statement
+and probe latencies, SQLite WAL size, the last production import and admission queues.
+
+Statement timings come from engine cursor events (two clock reads and a deque
+append per statement), kept for the last LATENCY_SAMPLES statements.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Optional
+
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from . import admission, coalesce, kpi_snapshots, models, production_cube
+from .database import engine
+from .migrate import missing_schema
+
+READY_CACHE_SECONDS = float(os.getenv("READY_CACHE_SECONDS", "5"))
+LATENCY_SAMPLES = 500
+
+STARTED_AT = time.time()
+
+_statement_ms: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+_probe_ms: Deque[float] = deque(maxlen=50)
+_probe_lock = threading.Lock()
+_last_probe: Optional[dict] = None
+_schema_error: Optional[str] = None
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info["health_started"] = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("health_started", None)
+    if started is not None:
+        _statement_ms.append((time.perf_counter() - started) * 1000)
+
+
+def schema_failed(error: str) -> None:
+    """Record that the schema is incomplete; readiness fails until `check_schema` finds it fixed."""
+    global _schema_error
+    _schema_error = error
+
+
+def check_schema(bind: Engine = engine) -> Optional[str]:
+    """Compare the database with models.py, recording (and returning) what is missing."""
+    global _schema_error
+    missing = missing_schema(bind)
+    _schema_error = f"schema incomplete, missing: {', '.join(missing[:10])}" if missing else None
+    return _schema_error
+
+
+def probe(bind: Engine = engine) -> dict:
+    """One `SELECT 1` round-trip on a pooled connection (plus a schema re-check while it is incomplete)."""
+    global _last_probe
+    started = time.perf_counter()
+    try:
+        with bind.connect() as conn:
+            conn.exec_driver_sql("SELECT 1")
+        latency = (time.perf_counter() - started) * 1000
+        _probe_ms.append(latency)
+        if _schema_error is not None and check_schema(bind) is not None:
+            result = {"status": "error", "db": "reachable", "latency_ms": round(latency, 2), "error": _schema_error}
+        else:
+            result = {"status": "ok", "db": "reachable", "latency_ms": round(latency, 2), "error": None}
+    except Exception as exc:  # noqa: BLE001
+        result = {"status": "error", "db": "unreachable", "latency_ms": None, "error": str(exc)}
+    result["checked_at"] = time.time()
+    _last_probe = result
+    return result
+
+
+def cached_probe() -> Optional[dict]:
+    """Last probe result if it is still fresh, else None."""
+    result = _last_probe
+    if result is not None and time.time() - result["checked_at"] < READY_CACHE_SECONDS:
+        return result
+    return None
+
+
+def readiness() -> dict:
+    """Fresh-enough probe result; concurrent callers while a probe runs get the previous one."""
+    result = cached_probe()
+    if result is not None:
+        return result
+    if not _probe_lock.acquire(blocking=_last_probe is None):
+        return _last_probe
+    try:
+        return cached_probe() or probe()
+    finally:
+        _probe_lock.release()
+
+
+def _percentiles(samples) -> dict:
+    values = sorted(samples)
+    if not values:
+        return {"samples": 0, "p50_ms": None, "p95_ms": None, "max_ms": None}
+
+    def pick(q: float) -> float:
+        return round(values[min(len(values) - 1, int(q * len(values)))], 2)
+
+    return {"samples": len(values), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "max_ms": round(values[-1], 2)}
+
+
+def pool_stats(bind: Engine = engine) -> dict:
+    pool = bind.pool
+    stats = {"class": type(pool).__name__, "status": pool.status()}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            stats[name] = fn()
+    return stats
+
+
+def sqlite_files(bind: Engine = engine) -> Optional[dict]:
+    database = bind.url.database
+    if bind.dialect.name != "sqlite" or not database or database == ":memory:":
+        return None
+
+    def size(path: str) -> Optional[int]:
+        return os.path.getsize(path) if os.path.exists(path) else None
+
+    return {"db_bytes": size(database), "wal_bytes": size(database + "-wal") or 0}
+
+
+def last_import(db: Session) -> Optional[dict]:
+    latest = select(func.max(models.ImportBatch.id)).scalar_subquery()
+    batch = db.execute(select(models.ImportBatch).where(models.ImportBatch.id == latest)).scalar_one_or_none()
+    if batch is None:
+        return None
+    return {
+        "batch_id": batch.id,
+        "office": batch.office,
+        "month": batch.month,
+        "status": batch.status,
+        "created_at": batch.created_at.isoformat(),
+    }
+
+
+def details(db: Session) -> dict:
+    # Skip table reads while the schema is incomplete; the tables may not exist yet.
+    schema_ok = _schema_error is None
+    snapshot = kpi_snapshots.latest(db) if schema_ok else None
+    cube = production_cube.current()
+    return {
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.time() - STARTED_AT, 1),
+        "schema_error": _schema_error,
+        "db": {
+            "dialect": engine.dialect.name,
+            "probe": readiness(),
+            "probe_latency": _percentiles(_probe_ms),
+            "statement_latency": _percentiles(_statement_ms),
+            "pool": pool_stats(),
+            "sqlite": sqlite_files(),
+        },
+        "last_import": last_import(db) if schema_ok else None,
+        "kpi_snapshot_at": snapshot.computed_at.isoformat() if snapshot else None,
+        "production_cube_built_at": datetime.utcfromtimestamp(cube.built_at).isoformat() if cube else None,
+        "admission": admission.stats(),
+        "coalesce": dict(coalesce.flights.stats),
+    }
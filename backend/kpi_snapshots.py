@@ -0,0 +1,236 @@
+"""
+Precomputed KPI snapshots for the home dashboards.
+
+`compute` gathers every KPI card in one pass: calls per office and user from
+log_daily_rollup, production totals from the production cube, and open/overdue
+task counts. `refresh` stores the result as a `kpi_snapshots` row, so
+`GET /dashboard/snapshot` is a single primary-key read no matter how many logs or
+production rows exist.
+
+Snapshots are refreshed by a daemon thread in the API process every
+KPI_SNAPSHOT_MINUTES (0 disables it), right after each production import, or by
+`python -m backend.refresh_kpi_snapshot` from cron. Every uvicorn worker runs the
+thread, so refreshes hold a cross-process lock: a scheduled tick skips while another
+worker is refreshing, and rechecks freshness once it has the lock.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import and_, case, delete, func, select
+from sqlalchemy.orm import Session
+
+from . import crud, models, production_cube
+from .database import SessionLocal
+from .locks import process_lock
+
+logger = logging.getLogger("uvicorn.error")
+
+REFRESH_MINUTES = float(os.getenv("KPI_SNAPSHOT_MINUTES", "10"))
+KEEP_SNAPSHOTS = int(os.getenv("KPI_SNAPSHOT_KEEP", "48"))
+LOCK_WAIT_SECONDS = 60.0
+_PG_LOCK_KEY = 0x5757_0002  # next to migrate's schema lock key
+
+
+def _calls(db: Session, today: date) -> dict:
+    """Calls YTD / last 30 days and in-person visits over the last 90 days, per user and per office."""
+    rollup = models.LogDailyRollup
+    year_start = date(today.year, 1, 1)
+    last_30 = today - timedelta(days=30)
+    last_90 = today - timedelta(days=90)
+    in_person = func.lower(rollup.action).like("%in person%")
+
+    def window(condition):
+        return func.sum(case((condition, rollup.count), else_=0))
+
+    stmt = (
+        select(
+            rollup.user,
+            rollup.office,
+            window(rollup.day >= year_start),
+            window(rollup.day >= last_30),
+            window(and_(in_person, rollup.day >= last_90)),
+        )
+        .where(rollup.day >= min(year_start, last_90))
+        .group_by(rollup.user, rollup.office)
+    )
+    employee_office = dict(
+        db.execute(
+            select(models.Employee.name, models.Office.code).outerjoin(
+                models.Office, models.Employee.office_id == models.Office.id
+            )
+        ).all()
+    )
+
+    by_user: Dict[str, dict] = {}
+    by_office: Dict[str, dict] = {}
+    for user, office, ytd, recent, in_person_90 in db.execute(stmt):
+        user = (user or "").strip()
+        if user:
+            entry = by_user.setdefault(
+                user,
+                {"user": user, "office": employee_office.get(user), "calls_ytd": 0, "calls_last_30": 0, "in_person_last_90": 0},
+            )
+            entry["calls_ytd"] += ytd
+            entry["calls_last_30"] += recent
+            entry["in_person_last_90"] += in_person_90
+        entry = by_office.setdefault(office, {"office": office, "calls_ytd": 0, "calls_last_30": 0, "in_person_last_90": 0})
+        entry["calls_ytd"] += ytd
+        entry["calls_last_30"] += recent
+        entry["in_person_last_90"] += in_person_90
+
+    users = sorted(by_user.values(), key=lambda u: (-u["in_person_last_90"], -u["calls_ytd"], u["user"]))
+    return {
+        "calls_ytd": sum(o["calls_ytd"] for o in by_office.values()),
+        "calls_last_30": sum(o["calls_last_30"] for o in by_office.values()),
+        "by_office": sorted(by_office.values(), key=lambda o: o["office"]),
+        "by_user": users,
+    }
+
+
+def _production(db: Session) -> dict:
+    """DashboardPage cards: each agency's latest YTD new business vs prior year, plus the monthly series."""
+    cube = production_cube.get_cube(db)
+    offices = cube.latest_totals()
+    current = sum(o["all_ytd_nb"] for o in offices)
+    prior = sum(o["pytd_nb"] for o in offices)
+    return {
+        "latest_month": cube.months[-1] if cube.months else None,
+        "current_year_nb": current,
+        "prior_year_nb": prior,
+        "percent_change": (current - prior) / prior * 100 if prior else 0.0,
+        "current_year_wp": sum(o["all_ytd_wp"] for o in offices),
+        "prior_year_wp": sum(o["pytd_wp"] for o in offices),
+        "agencies_with_nb": sum(o["agencies_with_nb"] for o in offices),
+        "by_office": offices,
+        "monthly": [
+            {"month": m["month"], "current_year_nb": m["all_ytd_nb"], "prior_year_nb": m["pytd_nb"]}
+            for m in cube.month_totals()
+        ],
+    }
+
+
+def _tasks(db: Session) -> dict:
+    by_office: Dict[Optional[str], dict] = {}
+    for row in crud.get_task_summary(db):
+        entry = by_office.setdefault(row["office"], {"office": row["office"], "open": 0, "overdue": 0})
+        entry["open"] += row["open"] or 0
+        entry["overdue"] += row["overdue"] or 0
+    offices = sorted(by_office.values(), key=lambda o: o["office"] or "")
+    return {
+        "open": sum(o["open"] for o in offices),
+        "overdue": sum(o["overdue"] for o in offices),
+        "by_office": offices,
+    }
+
+
+def compute(db: Session, today: Optional[date] = None) -> dict:
+    return {
+        "calls": _calls(db, today or date.today()),
+        "production": _production(db),
+        "tasks": _tasks(db),
+    }
+
+
+def refresh(db: Session, trigger: str = "cli") -> models.KpiSnapshot:
+    """Compute and store a new snapshot, keeping the newest KPI_SNAPSHOT_KEEP rows."""
+    started = time.perf_counter()
+    payload = compute(db)
+    snapshot = models.KpiSnapshot(
+        computed_at=datetime.utcnow(),
+        trigger=trigger,
+        duration_ms=int((time.perf_counter() - started) * 1000),
+        payload=json.dumps(payload, separators=(",", ":")),
+    )
+    db.add(snapshot)
+    db.flush()
+    db.execute(delete(models.KpiSnapshot).where(models.KpiSnapshot.id <= snapshot.id - KEEP_SNAPSHOTS))
+    db.commit()
+    db.refresh(snapshot)
+    return snapshot
+
+
+@contextlib.contextmanager
+def refresh_lock(db: Session, wait: float = LOCK_WAIT_SECONDS):
+    """Serialize refreshes across worker processes; TimeoutError if another holds it past `wait`."""
+    with process_lock(db.get_bind(), "kpi_snapshots", _PG_LOCK_KEY, wait):
+        yield
+
+
+def latest(db: Session) -> Optional[models.KpiSnapshot]:
+    newest = select(func.max(models.KpiSnapshot.id)).scalar_subquery()
+    return db.execute(select(models.KpiSnapshot).where(models.KpiSnapshot.id == newest)).scalar_one_or_none()
+
+
+class SnapshotScheduler:
+    """Daemon thread refreshing snapshots on an interval, or early when `request` is called."""
+
+    def __init__(self, interval_minutes: float = REFRESH_MINUTES):
+        self.interval = interval_minutes * 60
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._trigger = "schedule"
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.interval <= 0 or self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="kpi-snapshots", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def request(self, trigger: str = "import") -> None:
+        self._trigger = trigger
+        self._wake.set()
+
+    def _due(self, db: Session) -> bool:
+        # Another worker may have refreshed recently; skip scheduled ticks that would duplicate it.
+        newest = latest(db)
+        return newest is None or datetime.utcnow() - newest.computed_at >= timedelta(seconds=self.interval / 2)
+
+    def _run(self) -> None:
+        trigger = "schedule"
+        while not self._stop.is_set():
+            db = SessionLocal()
+            try:
+                # A scheduled tick gives way to a worker that is already refreshing; a requested one waits.
+                with refresh_lock(db, 0 if trigger == "schedule" else LOCK_WAIT_SECONDS):
+                    if trigger != "schedule" or self._due(db):
+                        snapshot = refresh(db, trigger)
+                        logger.info("KPI snapshot %d computed in %d ms (%s).", snapshot.id, snapshot.duration_ms, trigger)
+            except TimeoutError:
+                logger.info("KPI snapshot refresh (%s) skipped; another worker holds the lock.", trigger)
+            except Exception as exc:  # noqa: BLE001
+                db.rollback()
+                logger.error("Failed to compute KPI snapshot: %s", exc)
+            finally:
+                db.close()
+            woke = self._wake.wait(self.interval)
+            self._wake.clear()
+            trigger = self._trigger if woke else "schedule"
+            self._trigger = "schedule"
+
+
+scheduler = SnapshotScheduler()
+
+
+def request_refresh(trigger: str = "import") -> None:
+    """Ask the in-process scheduler for an early refresh; a no-op when it is not running."""
+    if scheduler.running:
+        scheduler.request(trigger)
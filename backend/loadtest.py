@@ -0,0 +1,460 @@
+"""
+Reproducible local load test for the FastAPI backend.
+
+Generates a synthetic SQLite dataset, launches uvicorn with N workers against it
+and replays a weighted mix of real frontend traffic:
+
+- AgenciesPage mount (agencies/offices/employees/production, then contacts+logs for one agency)
+- Marketing log creation (POST /logs followed by the agency log refresh)
+- Production import (POST /admin/production/import with a generated workbook)
+
+Throughput and tail latency are printed per scenario and compared against the
+stored baselines; the process exits non-zero when a metric regresses.
+
+Usage:
+    python -m backend.loadtest --workers 4
+    python -m backend.loadtest --workers 4 --update-baseline
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import pandas as pd
+from sqlalchemy import create_engine, insert
+
+from . import models
+from .database import Base
+from .ingest_csv import OFFICE_LABELS
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "loadtest_baseline.json"
+
+LOG_ACTIONS = ["In Person", "Phone", "Email", "Zoom", "Event"]
+IMPORT_MONTH = "2025-11"
+
+# Scenario name -> relative weight in the replayed traffic mix
+TRAFFIC_MIX: Dict[str, float] = {
+    "agencies_page_mount": 0.70,
+    "create_log": 0.27,
+    "production_import": 0.03,
+}
+
+
+# --- DATASET ---
+def generate_dataset(db_path: Path, agencies_per_office: int, logs_per_agency: int, seed: int) -> Dict[str, list]:
+    """Create a fresh SQLite database and return the ids/codes the scenarios need."""
+    rng = random.Random(seed)
+    if db_path.exists():
+        db_path.unlink()
+    engine = create_engine(f"sqlite:///{db_path}", future=True)
+    Base.metadata.create_all(bind=engine)
+
+    offices, employees, agencies, contacts, logs, production = [], [], [], [], [], []
+    emp_id = agency_id = contact_id = log_id = prod_id = 0
+    now = datetime(2025, 12, 1)
+    for office_id, (code, name) in enumerate(sorted(OFFICE_LABELS.items()), start=1):
+        offices.append({"id": office_id, "code": code, "name": name})
+        office_emps = []
+        for n in range(6):
+            emp_id += 1
+            office_emps.append((emp_id, f"{code} Underwriter {n + 1}"))
+            employees.append({"id": emp_id, "name": office_emps[-1][1], "office_id": office_id})
+        for n in range(agencies_per_office):
+            agency_id += 1
+            uw_id, uw_name = rng.choice(office_emps)
+            agency_code = f"{code}{n:05d}"
+            agencies.append({
+                "id": agency_id,
+                "name": f"{name} Agency {n}",
+                "code": agency_code,
+                "office_id": office_id,
+                "web_address": "",
+                "notes": "",
+                "primary_underwriter_id": uw_id,
+                "primary_underwriter": uw_name,
+                "active_flag": "Active",
+            })
+            for c in range(3):
+                contact_id += 1
+                contacts.append({
+                    "id": contact_id,
+                    "name": f"Contact {agency_id}-{c}",
+                    "email": f"contact{contact_id}@example.com",
+                    "agency_id": agency_id,
+                })
+            for _ in range(logs_per_agency):
+                log_id += 1
+                logs.append({
+                    "id": log_id,
+                    "user": rng.choice(office_emps)[1],
+                    "datetime": now - timedelta(minutes=rng.randint(0, 60 * 24 * 720)),
+                    "action": rng.choice(LOG_ACTIONS),
+                    "agency_id": agency_id,
+                    "office": code,
+                    "notes": f"Synthetic call note {log_id}",
+                })
+            for month in range(1, 13):
+                prod_id += 1
+                wp = rng.randint(0, 500_000)
+                production.append({
+                    "id": prod_id,
+                    "office": code,
+                    "agency_code": agency_code,
+                    "agency_name": f"{name} Agency {n}",
+                    "active_flag": "Active",
+                    "month": f"2025-{month:02d}",
+                    "all_ytd_wp": wp,
+                    "all_ytd_nb": wp // 4,
+                    "pytd_wp": rng.randint(0, 500_000),
+                    "pytd_nb": rng.randint(0, 100_000),
+                    "py_total_nb": rng.randint(0, 150_000),
+                })
+
+    with engine.begin() as conn:
+        for model, rows in (
+            (models.Office, offices),
+            (models.Employee, employees),
+            (models.Agency, agencies),
+            (models.Contact, contacts),
+            (models.Log, logs),
+            (models.Production, production),
+        ):
+            if rows:
+                conn.execute(insert(model), rows)
+    engine.dispose()
+
+    return {
+        "agency_ids": [a["id"] for a in agencies],
+        "agencies": [(a["id"], a["code"], a["name"]) for a in agencies],
+        "offices": [o["code"] for o in offices],
+        "employees": [e["name"] for e in employees],
+    }
+
+
+def build_workbook(office: str, dataset: Dict[str, list], rng: random.Random) -> bytes:
+    """Build an .xlsx in the layout the production import expects (banner rows, then a 'Code' header)."""
+    rows = [
+        ["Production Report", None, None, None, None, None, None, None],
+        [f"Office {office}", None, None, None, None, None, None, None],
+        ["Code", "Agency", "Active?", "YTD WP", "YTD NB", "PYTD WP", "PYTD NB", "PY Total NB"],
+    ]
+    for _, code, name in dataset["agencies"]:
+        if not code.startswith(office):
+            continue
+        wp = rng.randint(0, 500_000)
+        rows.append([code, name, "Y", wp, wp // 4, rng.randint(0, 500_000), rng.randint(0, 100_000), rng.randint(0, 150_000)])
+    buf = io.BytesIO()
+    pd.DataFrame(rows).to_excel(buf, header=False, index=False)
+    return buf.getvalue()
+
+
+# --- HTTP ---
+class Client:
+    def __init__(self, base_url: str, timeout: float = 60.0):
+        self.base_url = base_url
+        self.timeout = timeout
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None, headers: Optional[Dict[str, str]] = None) -> int:
+        req = urllib.request.Request(self.base_url + path, data=body, method=method, headers=headers or {})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                resp.read()
+                return resp.status
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            return exc.code
+
+    def get(self, path: str) -> int:
+        return self.request("GET", path)
+
+    def post_json(self, path: str, payload: dict) -> int:
+        return self.request("POST", path, json.dumps(payload).encode(), {"Content-Type": "application/json"})
+
+    def post_file(self, path: str, field: str, filename: str, content: bytes) -> int:
+        boundary = uuid4().hex
+        body = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            "Content-Type: application/vnd.openxmlformats-officedocument.spreadsheetml.sheet\r\n\r\n"
+        ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+        return self.request("POST", path, body, {"Content-Type": f"multipart/form-data; boundary={boundary}"})
+
+
+# --- SCENARIOS ---
+def _all_ok(statuses: List[int]) -> bool:
+    return all(200 <= s < 300 for s in statuses)
+
+
+def scenario_agencies_page_mount(client: Client, dataset: Dict[str, list], rng: random.Random, _workbooks) -> bool:
+    statuses = [
+        client.get("/agencies/"),
+        client.get("/offices"),
+        client.get("/employees"),
+        client.get("/production"),
+    ]
+    agency_id = rng.choice(dataset["agency_ids"])
+    statuses.append(client.get(f"/contacts?agency_id={agency_id}"))
+    statuses.append(client.get(f"/logs?agency_id={agency_id}"))
+    return _all_ok(statuses)
+
+
+def scenario_create_log(client: Client, dataset: Dict[str, list], rng: random.Random, _workbooks) -> bool:
+    agency_id, code, _ = rng.choice(dataset["agencies"])
+    payload = {
+        "user": rng.choice(dataset["employees"]),
+        "datetime": datetime.now().isoformat(timespec="seconds"),
+        "action": rng.choice(LOG_ACTIONS),
+        "agency_id": agency_id,
+        "office": code[:3],
+        "notes": "Load test call",
+    }
+    statuses = [client.post_json("/logs", payload), client.get(f"/logs?agency_id={agency_id}")]
+    return _all_ok(statuses)
+
+
+def scenario_production_import(client: Client, dataset: Dict[str, list], rng: random.Random, workbooks) -> bool:
+    office = rng.choice(dataset["offices"])
+    status = client.post_file(
+        f"/admin/production/import?office={office}&month={IMPORT_MONTH}",
+        "file",
+        f"{office}_{IMPORT_MONTH}.xlsx",
+        workbooks[office],
+    )
+    return _all_ok([status])
+
+
+SCENARIOS = {
+    "agencies_page_mount": scenario_agencies_page_mount,
+    "create_log": scenario_create_log,
+    "production_import": scenario_production_import,
+}
+
+
+# --- RUNNER ---
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_path: Path, workers: int, port: int, log_file) -> subprocess.Popen:
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{db_path}"
+    env["PYTHONPATH"] = str(REPO_ROOT) + os.pathsep + env.get("PYTHONPATH", "")
+    cmd = [
+        sys.executable, "-m", "uvicorn", "backend.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+    return subprocess.Popen(cmd, cwd=REPO_ROOT, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+
+def wait_until_ready(client: Client, proc: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"uvicorn exited early with code {proc.returncode}")
+        try:
+            if client.get("/health") == 200:
+                return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.25)
+    raise SystemExit("Timed out waiting for the server to become ready.")
+
+
+def run_load(
+    client: Client, dataset: Dict[str, list], concurrency: int, duration: float, seed: int, warmup: float = 0.0
+) -> Tuple[Dict[str, list], float]:
+    """Closed-loop load: each thread picks a weighted scenario and runs it back-to-back until time runs out.
+
+    Requests started during the first `warmup` seconds (cold caches, first imports) are not recorded;
+    the returned elapsed time covers the measured window only.
+    """
+    names = list(TRAFFIC_MIX)
+    weights = [TRAFFIC_MIX[n] for n in names]
+    workbooks = {office: build_workbook(office, dataset, random.Random(seed)) for office in dataset["offices"]}
+    samples: Dict[str, list] = {name: [] for name in names}
+    lock = threading.Lock()
+    measure_from = time.monotonic() + warmup
+    stop_at = measure_from + duration
+
+    def worker(idx: int) -> None:
+        rng = random.Random(seed * 1000 + idx)
+        while time.monotonic() < stop_at:
+            name = rng.choices(names, weights)[0]
+            measured = time.monotonic() >= measure_from
+            start = time.perf_counter()
+            try:
+                ok = SCENARIOS[name](client, dataset, rng, workbooks)
+            except (urllib.error.URLError, ConnectionError, OSError):
+                ok = False
+            elapsed = time.perf_counter() - start
+            if measured:
+                with lock:
+                    samples[name].append((elapsed, ok))
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples, max(time.monotonic() - measure_from, 1e-9)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(pct) - 1]
+
+
+def summarize(samples: Dict[str, list], elapsed: float) -> Dict[str, dict]:
+    results: Dict[str, dict] = {}
+    all_latencies: List[float] = []
+    total_errors = 0
+    for name, entries in samples.items():
+        latencies = [lat * 1000 for lat, _ in entries]
+        errors = sum(1 for _, ok in entries if not ok)
+        all_latencies.extend(latencies)
+        total_errors += errors
+        results[name] = {
+            "count": len(entries),
+            "errors": errors,
+            "throughput_rps": round(len(entries) / elapsed, 2),
+            "p50_ms": round(_percentile(latencies, 50), 2),
+            "p95_ms": round(_percentile(latencies, 95), 2),
+            "p99_ms": round(_percentile(latencies, 99), 2),
+        }
+    results["overall"] = {
+        "count": len(all_latencies),
+        "errors": total_errors,
+        "throughput_rps": round(len(all_latencies) / elapsed, 2),
+        "p50_ms": round(_percentile(all_latencies, 50), 2),
+        "p95_ms": round(_percentile(all_latencies, 95), 2),
+        "p99_ms": round(_percentile(all_latencies, 99), 2),
+    }
+    return results
+
+
+def print_report(results: Dict[str, dict]) -> None:
+    header = f"{'scenario':<22}{'count':>8}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(
+            f"{name:<22}{r['count']:>8}{r['errors']:>8}{r['throughput_rps']:>10.2f}"
+            f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+        )
+
+
+def compare_to_baseline(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Return human-readable regressions; throughput may drop and latency may grow by at most `tolerance`."""
+    regressions = []
+    for name, base in baseline.items():
+        current = results.get(name)
+        if not current:
+            continue
+        if current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {current['throughput_rps']} rps < baseline {base['throughput_rps']} rps")
+        for key in ("p95_ms", "p99_ms"):
+            if current[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {current[key]} > baseline {base[key]}")
+        if current["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: {current['errors']} errors > baseline {base.get('errors', 0)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the backend and compare against stored baselines.")
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn worker processes.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent simulated clients.")
+    parser.add_argument("--duration", type=float, default=180.0, help="Seconds of measured load after warm-up.")
+    parser.add_argument("--warmup", type=float, default=15.0, help="Seconds of unrecorded load before measuring.")
+    parser.add_argument("--agencies-per-office", type=int, default=200)
+    parser.add_argument("--logs-per-agency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline JSON file.")
+    parser.add_argument("--profile", default=None, help="Baseline key (defaults to 'workers-<N>').")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression (0.25 = 25%%).")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline.")
+    parser.add_argument("--keep-data", action="store_true", help="Do not delete the generated database.")
+    args = parser.parse_args()
+
+    profile = args.profile or f"workers-{args.workers}"
+    work_dir = Path(tempfile.mkdtemp(prefix="uw_loadtest_"))
+    db_path = work_dir / "loadtest.db"
+
+    print(f"Generating dataset in {db_path} ...")
+    dataset = generate_dataset(db_path, args.agencies_per_office, args.logs_per_agency, args.seed)
+    print(f"Agencies: {len(dataset['agency_ids'])}  Offices: {len(dataset['offices'])}")
+
+    port = _free_port()
+    client = Client(f"http://127.0.0.1:{port}")
+    server_log = (work_dir / "uvicorn.log").open("w")
+    proc = start_server(db_path, args.workers, port, server_log)
+    try:
+        wait_until_ready(client, proc)
+        print(
+            f"Server up with {args.workers} worker(s); warming up {args.warmup:.0f}s, "
+            f"then running {args.duration:.0f}s at concurrency {args.concurrency} ..."
+        )
+        samples, elapsed = run_load(client, dataset, args.concurrency, args.duration, args.seed, args.warmup)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        server_log.close()
+
+    results = summarize(samples, elapsed)
+    print_report(results)
+
+    baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if args.update_baseline:
+        if results["overall"]["errors"]:
+            raise SystemExit("Not recording a baseline from a run with errors; check the server log (--keep-data).")
+        baselines[profile] = results
+        args.baseline.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline '{profile}' written to {args.baseline}")
+    elif profile not in baselines:
+        print(f"No baseline '{profile}' in {args.baseline}; run with --update-baseline to record one.")
+    else:
+        regressions = compare_to_baseline(results, baselines[profile], args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            if args.keep_data:
+                print(f"Data kept in {work_dir}")
+            raise SystemExit(1)
+        print(f"\nNo regressions against baseline '{profile}' (tolerance {args.tolerance:.0%}).")
+
+    if args.keep_data:
+        print(f"Data kept in {work_dir}")
+    else:
+        db_path.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Cross-process locks for work that must run in one worker at a time (schema setup,
+KPI snapshot refreshes).
+
+Postgres uses session-level advisory locks. A file-backed SQLite database gets an
+exclusive lock file next to it (O_EXCL creation works the same on Windows and POSIX).
+The holder touches the file every HEARTBEAT_SECONDS, so one not touched for
+STALE_LOCK_SECONDS was left by a crashed process and is taken over, however long a
+live holder runs. In-memory SQLite is private to one process, so it needs no lock.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import threading
+import time
+
+from sqlalchemy.engine import Engine
+
+HEARTBEAT_SECONDS = 10.0
+STALE_LOCK_SECONDS = 60.0
+POLL_SECONDS = 0.1
+
+
+@contextlib.contextmanager
+def _lock_file(path: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) > STALE_LOCK_SECONDS:
+                    os.remove(path)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Timed out waiting for lock {path}")
+            time.sleep(POLL_SECONDS)
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(HEARTBEAT_SECONDS):
+            with contextlib.suppress(OSError):
+                os.utime(path)
+
+    beat = threading.Thread(target=heartbeat, name=f"lock-heartbeat-{os.path.basename(path)}", daemon=True)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        beat.start()
+        yield
+    finally:
+        stop.set()
+        os.close(fd)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+
+@contextlib.contextmanager
+def _advisory_lock(bind: Engine, key: int, timeout: float):
+    deadline = time.monotonic() + timeout
+    with bind.connect() as conn:
+        while not conn.exec_driver_sql(f"SELECT pg_try_advisory_lock({key})").scalar():
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Timed out waiting for advisory lock {key}")
+            time.sleep(POLL_SECONDS)
+        try:
+            yield
+        finally:
+            conn.exec_driver_sql(f"SELECT pg_advisory_unlock({key})")
+
+
+@contextlib.contextmanager
+def process_lock(bind: Engine, name: str, key: int, timeout: float):
+    """
+    Hold the lock `name` (advisory lock `key` on Postgres) across every process using `bind`'s
+    database. Raises TimeoutError if it is not free within `timeout` seconds (0 = try once).
+    """
+    dialect = bind.dialect.name
+    database = bind.url.database
+    if dialect == "postgresql":
+        with _advisory_lock(bind, key, timeout):
+            yield
+    elif dialect == "sqlite" and database and database != ":memory:":
+        with _lock_file(f"{os.path.abspath(database)}.{name}.lock", timeout):
+            yield
+    else:
+        yield
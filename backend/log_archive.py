@@ -0,0 +1,118 @@
+"""
+Hot/cold split for marketing logs.
+
+Logs older than the archive horizon are moved from `logs` to `logs_archive` in
+primary-key batches, each committed on its own, so an interrupted run simply resumes.
+The hot table stays small; `/logs` reads the archive only when asked to with
+include_archived, or when an explicit date range reaches back past the newest archived
+log (`since` at or before it, or only `until`). A request without dates (e.g. all logs
+of one agency) sees the hot logs only.
+
+Moved rows leave `logs` through a plain DELETE: the search index drops them and the
+sync feed reports them as deleted, while log_daily_rollup keeps counting them.
+
+Archived logs keep their ids, so `logs.id` must never reuse one. Postgres sequences
+never do; on SQLite the table needs AUTOINCREMENT (plain rowids restart at
+max(id) + 1), which `ensure_log_ids` retrofits onto tables created without it.
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import MetaData, delete, func, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateTable
+
+from . import models
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("LOG_ARCHIVE_AFTER_DAYS", "730"))
+
+# Columns copied to the archive (row_version is a hot-table sync detail).
+ARCHIVE_COLUMNS = [c.name for c in models.LogArchive.__table__.columns]
+
+
+def default_cutoff(now: Optional[datetime] = None) -> datetime:
+    return (now or datetime.utcnow()) - timedelta(days=ARCHIVE_AFTER_DAYS)
+
+
+def archive_boundary(db: Session) -> Optional[datetime]:
+    """Datetime of the newest archived log (one index seek); None if nothing is archived."""
+    return db.execute(select(func.max(models.LogArchive.datetime))).scalar()
+
+
+def needs_archive(
+    db: Session, since: Optional[datetime], until: Optional[datetime] = None, include_archived: bool = False
+) -> bool:
+    """Whether a read must include logs_archive: asked to, or an explicit `since` / `until` reaches the archive."""
+    if include_archived:
+        return True
+    if since is None and until is None:
+        return False
+    # A dated range with no lower bound (only `until`) always reaches back into the archive.
+    boundary = archive_boundary(db)
+    return boundary is not None and (since is None or since <= boundary)
+
+
+def ensure_log_ids(bind) -> None:
+    """
+    SQLite: rebuild `logs` with AUTOINCREMENT if it was created without it, and start its
+    sequence past every archived id. Triggers go with the old table; run this before the
+    search / sync schema setup that installs them. Idempotent.
+    """
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            ensure_log_ids(conn)
+        return
+    conn: Connection = bind
+    if conn.dialect.name != "sqlite":
+        return
+    ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'logs'")).scalar()
+    if ddl is not None and "AUTOINCREMENT" not in ddl.upper():
+        table = models.Log.__table__
+        existing = [row[1] for row in conn.exec_driver_sql("PRAGMA table_info(logs)")]
+        columns = ", ".join(f'"{c.name}"' for c in table.columns if c.name in existing)
+        # Copy into scratch metadata (with the tables its foreign keys name) to render the new DDL.
+        scratch = MetaData()
+        for other in table.metadata.sorted_tables:
+            other.to_metadata(scratch)
+        rebuilt = table.to_metadata(scratch, name="logs_rebuild")
+        conn.execute(CreateTable(rebuilt))
+        conn.exec_driver_sql(f"INSERT INTO logs_rebuild ({columns}) SELECT {columns} FROM logs")
+        conn.exec_driver_sql("DROP TABLE logs")
+        conn.exec_driver_sql("ALTER TABLE logs_rebuild RENAME TO logs")
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+    archived = conn.execute(select(func.max(models.LogArchive.id))).scalar()
+    if archived is not None:
+        current = conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = 'logs'")).scalar()
+        if current is None:
+            conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('logs', :seq)"), {"seq": archived})
+        elif current < archived:
+            conn.execute(text("UPDATE sqlite_sequence SET seq = :seq WHERE name = 'logs'"), {"seq": archived})
+
+
+def archive_logs(db: Session, before: datetime, batch_size: int = 5000) -> int:
+    """Move logs with datetime < `before` into logs_archive, oldest first. Returns logs moved."""
+    hot = models.Log.__table__
+    moved = 0
+    while True:
+        ids = db.execute(
+            select(models.Log.id)
+            .where(models.Log.datetime < before)
+            .order_by(models.Log.datetime, models.Log.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return moved
+        db.execute(
+            insert(models.LogArchive).from_select(
+                ARCHIVE_COLUMNS, select(*(hot.c[name] for name in ARCHIVE_COLUMNS)).where(hot.c.id.in_(ids))
+            )
+        )
+        db.execute(delete(models.Log).where(models.Log.id.in_(ids)).execution_options(synchronize_session=False))
+        db.commit()
+        moved += len(ids)
@@ -0,0 +1,151 @@
+"""
+Pre-aggregated daily log counts.
+
+`log_daily_rollup` holds one row per (day, office, user, action, agency_id) with the
+number of logs, so "last 30 days" counters and activity charts read O(days) rows
+instead of scanning logs. crud.create_log / update_log / delete_log and the agency
+deletes adjust it in the same transaction as the log write; `rebuild` re-derives it.
+
+Key columns are NOT NULL (they form the primary key): a log without an office is
+counted under '' and one without an agency under agency_id 0.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import Date, and_, cast, delete, func, insert, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from . import models
+
+ROLLUP_GROUPS = {
+    "day": models.LogDailyRollup.day,
+    "office": models.LogDailyRollup.office,
+    "user": models.LogDailyRollup.user,
+    "action": models.LogDailyRollup.action,
+    "agency": models.LogDailyRollup.agency_id,
+}
+
+_KEY_COLUMNS = ("day", "office", "user", "action", "agency_id")
+
+
+def rollup_key(log: models.Log) -> dict:
+    return {
+        "day": log.datetime.date(),
+        "office": log.office or "",
+        "user": log.user,
+        "action": log.action,
+        "agency_id": log.agency_id or 0,
+    }
+
+
+def _upsert(dialect: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(models.LogDailyRollup.__table__)
+
+
+def bump(db: Session, key: dict, delta: int) -> None:
+    """Add `delta` to one rollup bucket (upsert); buckets that reach zero are dropped. Caller commits."""
+    table = models.LogDailyRollup.__table__
+    stmt = _upsert(db.get_bind().dialect.name).values(**key, count=delta)
+    stmt = stmt.on_conflict_do_update(index_elements=list(_KEY_COLUMNS), set_={"count": table.c.count + delta})
+    db.execute(stmt)
+    if delta < 0:
+        match = and_(*(table.c[col] == key[col] for col in _KEY_COLUMNS))
+        db.execute(delete(table).where(match, table.c.count <= 0))
+
+
+def move(db: Session, old_key: dict, new_key: dict) -> None:
+    if old_key != new_key:
+        bump(db, old_key, -1)
+        bump(db, new_key, 1)
+
+
+def forget_agencies(db: Session, agency_ids: List[int]) -> None:
+    """Drop the buckets of agencies whose logs are being deleted with them. Caller commits."""
+    db.execute(delete(models.LogDailyRollup).where(models.LogDailyRollup.agency_id.in_(agency_ids)))
+
+
+def _day_expr(dialect: str):
+    if dialect == "sqlite":
+        return func.date(models.Log.datetime)
+    return cast(models.Log.datetime, Date)
+
+
+def rebuild(bind) -> int:
+    """Recompute the whole rollup from logs in one INSERT ... SELECT ... GROUP BY. Returns bucket count."""
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            return rebuild(conn)
+    if isinstance(bind, Session):
+        count = rebuild(bind.connection())
+        bind.commit()
+        return count
+    conn: Connection = bind
+    day = _day_expr(conn.dialect.name)
+    grouped = select(
+        day,
+        func.coalesce(models.Log.office, ""),
+        models.Log.user,
+        models.Log.action,
+        func.coalesce(models.Log.agency_id, 0),
+        func.count(),
+    ).group_by(day, func.coalesce(models.Log.office, ""), models.Log.user, models.Log.action, func.coalesce(models.Log.agency_id, 0))
+    table = models.LogDailyRollup.__table__
+    conn.execute(delete(table))
+    conn.execute(insert(table).from_select([*_KEY_COLUMNS, "count"], grouped))
+    return conn.execute(select(func.count()).select_from(table)).scalar()
+
+
+def ensure_log_rollup(bind) -> None:
+    """Populate an empty rollup from existing logs (first start after the table was added)."""
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            ensure_log_rollup(conn)
+        return
+    conn: Connection = bind
+    if conn.execute(select(models.LogDailyRollup.day).limit(1)).first() is not None:
+        return
+    if conn.execute(select(models.Log.id).limit(1)).first() is not None:
+        rebuild(conn)
+
+
+def get_activity(
+    db: Session,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    office: Optional[str] = None,
+    user: Optional[str] = None,
+    action: Optional[str] = None,
+    agency_id: Optional[int] = None,
+    group_by: Optional[str] = None,
+) -> List[dict]:
+    """Log counts over an inclusive day range, optionally grouped by one key column."""
+    rollup = models.LogDailyRollup
+    filters = []
+    if since:
+        filters.append(rollup.day >= since)
+    if until:
+        filters.append(rollup.day <= until)
+    if office:
+        filters.append(rollup.office == office)
+    if user:
+        filters.append(rollup.user == user)
+    if action:
+        filters.append(rollup.action == action)
+    if agency_id:
+        filters.append(rollup.agency_id == agency_id)
+
+    total = func.sum(rollup.count).label("count")
+    if group_by is None:
+        count = db.execute(select(total).where(*filters)).scalar()
+        return [{"key": None, "count": count or 0}]
+    column = ROLLUP_GROUPS[group_by]
+    stmt = select(column, total).where(*filters).group_by(column).order_by(column)
+    return [{"key": key, "count": count} for key, count in db.execute(stmt)]
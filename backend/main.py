@@ -1,25 +1,42 @@
 import logging
-from fastapi import FastAPI, Depends
+import os
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import text
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
 
-from .database import engine, Base, get_db
-from . import models  # noqa: F401
-from .routers import offices, employees, agencies, contacts, logs, tasks, production, admin
+from .database import engine, SessionLocal
+from . import models, health as health_state, production_cube, production_import, kpi_snapshots, autocomplete as autocomplete_index  # noqa: F401
+from .admission import AdmissionMiddleware, busy_response, is_statement_timeout
+from .migrate import setup_schema
+from .routers import (
+    offices, employees, agencies, contacts, logs, tasks, production, admin, search, autocomplete, events, sync,
+    dashboard, health,
+)
 
 logger = logging.getLogger("uvicorn.error")
 
-# Ensure tables exist on startup (alembic should manage schema in prod, but keep for dev)
-try:
-    Base.metadata.create_all(bind=engine)
-    logger.info("Database tables ensured.")
-except Exception as exc:  # noqa: BLE001
-    logger.error("Failed to create tables: %s", exc)
+# Ensure tables exist on startup (alembic should manage schema in prod, but keep for dev).
+# Serialized across workers by a lock; multi-worker deployments can run `python -m backend.migrate`
+# once instead and start the workers with SCHEMA_SETUP=skip.
+# A failure stops the worker: serving on a half-migrated schema only fails later, per request.
+# With SCHEMA_SETUP=skip the schema is only checked; /readyz stays 503 until it is complete.
+if os.getenv("SCHEMA_SETUP", "auto") != "skip":
+    try:
+        setup_schema(engine)
+        logger.info("Database tables ensured.")
+    except Exception as exc:
+        health_state.schema_failed(f"schema setup failed: {exc}")
+        logger.exception("Schema setup failed; not starting.")
+        raise
+else:
+    schema_error = health_state.check_schema(engine)
+    if schema_error:
+        logger.error("SCHEMA_SETUP=skip but the database is behind models.py (%s); not ready.", schema_error)
 
 app = FastAPI(title="Underwriter Workbench API")
 
+# Added before CORS so CORS stays outermost and 503s from admission control carry its headers.
+app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -29,6 +46,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Retry-After"],
 )
 
 app.include_router(offices.router)
@@ -39,18 +57,69 @@ app.include_router(logs.router)
 app.include_router(tasks.router)
 app.include_router(production.router)
 app.include_router(admin.router)
+app.include_router(search.router)
+app.include_router(autocomplete.router)
+app.include_router(events.router)
+app.include_router(sync.router)
+app.include_router(dashboard.router)
+app.include_router(health.router)
 
 
-@app.get("/")
-def root():
-    return {"status": "ok", "message": "Underwriter Workbench API"}
+@app.exception_handler(DBAPIError)
+async def database_error(request, exc: DBAPIError):
+    if is_statement_timeout(exc):
+        return busy_response(5, detail="Query took too long; narrow the filters or retry shortly")
+    raise exc
 
 
-@app.get("/health")
-def health(db: Session = Depends(get_db)):
+@app.on_event("startup")
+def build_autocomplete_index():
+    db = SessionLocal()
     try:
-        db.execute(text("SELECT 1"))
-        return {"status": "ok", "db": "reachable"}
+        autocomplete_index.build(db)
+        logger.info(
+            "Autocomplete index built (%d agencies, %d contacts).",
+            len(autocomplete_index.agency_index),
+            len(autocomplete_index.contact_index),
+        )
     except SQLAlchemyError as exc:
-        logger.error("DB health check failed: %s", exc)
-        return {"status": "error", "db": "unreachable", "detail": str(exc)}
+        logger.error("Failed to build autocomplete index: %s", exc)
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+def build_production_cube():
+    db = SessionLocal()
+    try:
+        cube = production_cube.build(db)
+        logger.info(
+            "Production cube built (%d offices, %d agencies, %d months).",
+            len(cube.offices),
+            len(cube.agencies),
+            len(cube.months),
+        )
+    except SQLAlchemyError as exc:
+        logger.error("Failed to build production cube: %s", exc)
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+def start_kpi_snapshots():
+    kpi_snapshots.scheduler.start()
+
+
+@app.on_event("shutdown")
+def stop_kpi_snapshots():
+    kpi_snapshots.scheduler.stop()
+
+
+@app.on_event("shutdown")
+def stop_import_pool():
+    production_import.shutdown_pool()
+
+
+@app.get("/")
+def root():
+    return {"status": "ok", "message": "Underwriter Workbench API"}
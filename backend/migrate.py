@@ -0,0 +1,115 @@
+"""
+Schema setup: tables, columns and indexes added since a database was created, search /
+sync / cache-version triggers, rollup backfill and denormalized underwriter names.
+Alembic-managed databases get the same result from `alembic upgrade head`.
+
+Every API worker runs this at import unless SCHEMA_SETUP=skip. Concurrent runs are
+serialized by a cross-process lock (locks.py: an advisory lock on Postgres, a lock
+file next to a SQLite database), and every step is idempotent, so workers after the first only
+confirm what is already there. For multi-worker deployments, prefer running it
+once before starting the workers:
+
+Usage:
+    python -m backend.migrate
+    SCHEMA_SETUP=skip python -m uvicorn backend.main:app --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+from typing import List
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateColumn, CreateIndex
+
+from . import models  # noqa: F401
+from .cache_versions import ensure_cache_versions
+from .crud import sync_underwriter_names
+from .database import Base, engine
+from .locks import process_lock
+from .log_archive import ensure_log_ids
+from .log_rollup import ensure_log_rollup
+from .search import ensure_search_schema
+from .sync import ensure_sync_schema
+
+# Waiters only give up on a live holder after this long; a crashed one is detected
+# sooner (locks.STALE_LOCK_SECONDS, or the session ending on Postgres).
+LOCK_TIMEOUT_SECONDS = 600.0
+_PG_LOCK_KEY = 0x5757_0001  # arbitrary, shared by every worker
+
+
+@contextlib.contextmanager
+def schema_lock(bind: Engine):
+    """Hold an exclusive, cross-process lock for the duration of schema setup."""
+    with process_lock(bind, "schema", _PG_LOCK_KEY, LOCK_TIMEOUT_SECONDS):
+        yield
+
+
+def ensure_columns(bind) -> None:
+    """
+    Add columns and indexes that models.py has but an existing database lacks; create_all only
+    creates missing tables. New columns must be nullable or carry a server default.
+    """
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            ensure_columns(conn)
+        return
+    conn: Connection = bind
+    insp = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in insp.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable and column.server_default is None:
+                raise RuntimeError(f"Cannot add NOT NULL column {table.name}.{column.name} without a server default")
+            ddl = CreateColumn(column).compile(dialect=conn.dialect)
+            conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+        for index in table.indexes:
+            # Not checkfirst: reflection skips expression indexes on SQLite.
+            conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def missing_schema(bind: Engine = engine) -> List[str]:
+    """Tables and columns models.py expects that the database lacks (empty when the schema is current)."""
+    insp = inspect(bind)
+    tables = set(insp.get_table_names())
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            missing.append(table.name)
+            continue
+        existing = {c["name"] for c in insp.get_columns(table.name)}
+        missing.extend(f"{table.name}.{c.name}" for c in table.columns if c.name not in existing)
+    return missing
+
+
+def setup_schema(bind: Engine = engine) -> None:
+    with schema_lock(bind):
+        if bind.dialect.name == "sqlite" and bind.url.database not in (None, "", ":memory:"):
+            # WAL lets readers in other workers proceed while one worker writes.
+            with bind.connect() as conn:
+                conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        Base.metadata.create_all(bind=bind)
+        ensure_columns(bind)
+        ensure_log_ids(bind)  # may rebuild logs, so before the trigger setup below
+        ensure_search_schema(bind)
+        ensure_sync_schema(bind)
+        ensure_cache_versions(bind)
+        ensure_log_rollup(bind)
+        with bind.begin() as conn:
+            sync_underwriter_names(conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create or update the database schema, then exit.")
+    parser.parse_args()
+
+    setup_schema(engine)
+    print(f"Schema ready ({engine.url.render_as_string(hide_password=True)})")
+
+
+if __name__ == "__main__":
+    main()
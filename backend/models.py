@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, Text, Index, func
 from sqlalchemy.orm import relationship
 
 from .database import Base
@@ -19,32 +19,38 @@ class Employee(Base):
     __tablename__ = "employees"
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(255), nullable=False)
-    office_id = Column(Integer, ForeignKey("offices.id", ondelete="SET NULL"))
+    name = Column(String(255), nullable=False, index=True)
+    office_id = Column(Integer, ForeignKey("offices.id", ondelete="SET NULL"), index=True)
 
     office_rel = relationship("Office", back_populates="employees")
     agencies = relationship("Agency", back_populates="underwriter_rel")
 
 
+# Log users are matched to employees by trimmed, case-insensitive name (crud.employee_name_key).
+Index("ix_employees_name_key", func.lower(func.trim(Employee.name)))
+
+
 class Agency(Base):
     __tablename__ = "agencies"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
     code = Column(String(50), unique=True, nullable=False, index=True)
-    office_id = Column(Integer, ForeignKey("offices.id", ondelete="SET NULL"))
+    office_id = Column(Integer, ForeignKey("offices.id", ondelete="SET NULL"), index=True)
     web_address = Column(String(255), nullable=True)
     notes = Column(Text, nullable=True)
-    primary_underwriter_id = Column(Integer, ForeignKey("employees.id", ondelete="SET NULL"))
+    primary_underwriter_id = Column(Integer, ForeignKey("employees.id", ondelete="SET NULL"), index=True)
     primary_underwriter = Column(String(255), nullable=True)  # store display name for now
     active_flag = Column(String(50), nullable=True)
     dba = Column(String(255), nullable=True)  # Doing Business As name
     email = Column(String(255), nullable=True)  # Agency email
+    row_version = Column(Integer, nullable=True, index=True)  # Maintained by sync triggers
 
     office_rel = relationship("Office", back_populates="agencies")
     underwriter_rel = relationship("Employee", back_populates="agencies")
-    contacts = relationship("Contact", back_populates="agency", cascade="all, delete-orphan")
-    logs = relationship("Log", back_populates="agency", cascade="all, delete-orphan")
+    # Children are removed by crud.delete_agencies with set-based deletes; never load them just to delete.
+    contacts = relationship("Contact", back_populates="agency", cascade="all, delete-orphan", passive_deletes=True)
+    logs = relationship("Log", back_populates="agency", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Contact(Base):
@@ -55,15 +61,25 @@ class Contact(Base):
     title = Column(String(255), nullable=True)
     email = Column(String(255), nullable=True)
     phone = Column(String(50), nullable=True)
-    agency_id = Column(Integer, ForeignKey("agencies.id", ondelete="CASCADE"), nullable=False)
+    agency_id = Column(Integer, ForeignKey("agencies.id", ondelete="CASCADE"), nullable=False, index=True)
     notes = Column(Text, nullable=True)
     linkedin_url = Column(String(500), nullable=True)
+    row_version = Column(Integer, nullable=True, index=True)  # Maintained by sync triggers
 
     agency = relationship("Agency", back_populates="contacts")
 
 
 class Log(Base):
     __tablename__ = "logs"
+    __table_args__ = (
+        Index("ix_logs_agency_id_datetime", "agency_id", "datetime"),
+        Index("ix_logs_user_datetime", "user", "datetime"),
+        Index("ix_logs_office_datetime", "office", "datetime"),
+        Index("ix_logs_datetime", "datetime"),
+        Index("ix_logs_employee_id_datetime", "employee_id", "datetime", "action", "agency_id"),
+        # Archived ids must never be handed out again (log_archive.ensure_log_ids converts old tables).
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user = Column(String(255), nullable=False)
@@ -74,12 +90,61 @@ class Log(Base):
     notes = Column(Text, nullable=True)
     contact_id = Column(Integer, ForeignKey("contacts.id", ondelete="SET NULL"), nullable=True)
     contact = Column(String(255), nullable=True)  # Frozen snapshot of contact name at log creation
+    employee_id = Column(Integer, ForeignKey("employees.id", ondelete="SET NULL"), nullable=True)  # Resolved from `user`
+    row_version = Column(Integer, nullable=True, index=True)  # Maintained by sync triggers
 
     agency = relationship("Agency", back_populates="logs")
 
 
+class LogArchive(Base):
+    """Cold copy of logs older than the archive horizon (see log_archive.py); same ids and columns, no FKs."""
+
+    __tablename__ = "logs_archive"
+    __table_args__ = (
+        Index("ix_logs_archive_agency_id_datetime", "agency_id", "datetime"),
+        Index("ix_logs_archive_user_datetime", "user", "datetime"),
+        Index("ix_logs_archive_office_datetime", "office", "datetime"),
+        Index("ix_logs_archive_datetime", "datetime"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user = Column(String(255), nullable=False)
+    datetime = Column(DateTime, nullable=False)
+    action = Column(String(255), nullable=False)
+    agency_id = Column(Integer, nullable=True)
+    office = Column(String(50), nullable=True)
+    notes = Column(Text, nullable=True)
+    contact_id = Column(Integer, nullable=True)
+    contact = Column(String(255), nullable=True)
+    employee_id = Column(Integer, nullable=True)
+
+
+class LogDailyRollup(Base):
+    """Log counts per (day, office, user, action, agency); maintained by crud (see log_rollup.py)."""
+
+    __tablename__ = "log_daily_rollup"
+    __table_args__ = (
+        Index("ix_log_daily_rollup_office_day", "office", "day"),
+        Index("ix_log_daily_rollup_user_day", "user", "day"),
+        Index("ix_log_daily_rollup_agency_id_day", "agency_id", "day"),
+    )
+
+    day = Column(Date, primary_key=True)
+    office = Column(String(50), primary_key=True, default="")  # '' when the log has no office
+    user = Column(String(255), primary_key=True)
+    action = Column(String(255), primary_key=True)
+    agency_id = Column(Integer, primary_key=True, default=0, autoincrement=False)  # 0 when the log has no agency
+    count = Column(Integer, nullable=False, default=0)
+
+
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_agency_id_status", "agency_id", "status"),
+        Index("ix_tasks_status_due_date", "status", "due_date"),
+        Index("ix_tasks_owner_status_due_date", "owner", "status", "due_date", "agency_id"),
+        Index("ix_tasks_due_date", "due_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
@@ -88,12 +153,17 @@ class Task(Base):
     owner = Column(String(255), nullable=True)
     notes = Column(Text, nullable=True)
     agency_id = Column(Integer, ForeignKey("agencies.id", ondelete="SET NULL"), nullable=True)
+    row_version = Column(Integer, nullable=True, index=True)  # Maintained by sync triggers
 
     agency = relationship("Agency")
 
 
 class Production(Base):
     __tablename__ = "production"
+    __table_args__ = (
+        Index("ix_production_office_month", "office", "month"),
+        Index("ix_production_month_office", "month", "office"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     office = Column(String(50), nullable=False)
@@ -106,3 +176,69 @@ class Production(Base):
     pytd_wp = Column(Integer, nullable=True)
     pytd_nb = Column(Integer, nullable=True)
     py_total_nb = Column(Integer, nullable=True)
+    row_version = Column(Integer, nullable=True, index=True)  # Maintained by sync triggers
+
+
+class ImportBatch(Base):
+    """Ledger of production imports; identical re-uploads are answered from `summary` (see production_import.py)."""
+
+    __tablename__ = "import_batches"
+    __table_args__ = (
+        Index("ix_import_batches_office_month", "office", "month"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    office = Column(String(50), nullable=False)
+    month = Column(String(7), nullable=False)  # YYYY-MM
+    sha256 = Column(String(64), nullable=False)
+    filename = Column(String(255), nullable=True)
+    status = Column(String(20), nullable=False)  # success | failed
+    rows_in_file = Column(Integer, nullable=False, default=0)
+    rows_imported = Column(Integer, nullable=False, default=0)
+    agencies_created = Column(Integer, nullable=False, default=0)
+    parse_ms = Column(Integer, nullable=True)
+    write_ms = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    summary = Column(Text, nullable=True)  # JSON response returned for this import
+    error = Column(Text, nullable=True)
+
+
+class KpiSnapshot(Base):
+    """Precomputed dashboard KPIs; the newest row is served by GET /dashboard/snapshot (see kpi_snapshots.py)."""
+
+    __tablename__ = "kpi_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    computed_at = Column(DateTime, nullable=False)
+    trigger = Column(String(20), nullable=False)  # schedule | import | cli | request
+    duration_ms = Column(Integer, nullable=True)
+    payload = Column(Text, nullable=False)  # JSON
+
+
+class CacheVersion(Base):
+    """Per-table write counters bumped by triggers; lets every worker validate its in-memory caches (see cache_versions.py)."""
+
+    __tablename__ = "cache_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class SyncState(Base):
+    """Single-row global change counter; bumped by the sync triggers (see sync.py)."""
+
+    __tablename__ = "sync_state"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    # Tombstones up to this version have been pruned; older `since` values must reload.
+    pruned_version = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+class SyncTombstone(Base):
+    __tablename__ = "sync_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String(50), nullable=False)
+    row_id = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=False, index=True)
@@ -0,0 +1,403 @@
+"""
+Columnar in-memory production cube.
+
+The production table is loaded once into dense NumPy arrays indexed
+(agency, month, metric), with the office of every (agency, month) cell kept
+alongside, so office totals, YoY deltas and top movers are vectorized slices
+instead of table scans. The cube is patched after imports / bulk upserts and
+rebuilt when another process has written newer production rows.
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+METRICS = ("all_ytd_wp", "all_ytd_nb", "pytd_wp", "pytd_nb", "py_total_nb")
+# current-year YTD metric -> prior-year YTD metric carried on the same row
+YOY_PAIRS = {"all_ytd_wp": "pytd_wp", "all_ytd_nb": "pytd_nb"}
+
+_COLUMNS = [
+    models.Production.office,
+    models.Production.agency_code,
+    models.Production.agency_name,
+    models.Production.month,
+    *[getattr(models.Production, m) for m in METRICS],
+]
+
+
+def _previous_month(month: str) -> str:
+    year, mon = int(month[:4]), int(month[5:7])
+    return f"{year - 1}-12" if mon == 1 else f"{year}-{mon - 1:02d}"
+
+
+def _source_key(db: Session):
+    """
+    Fingerprint of the production data, two index lookups: the newest import batch (imports are
+    the only path that deletes production rows, and each writes a ledger row) and the newest
+    row_version (every insert or update stamps a higher one).
+    """
+    latest_batch = select(func.max(models.ImportBatch.id)).scalar_subquery()
+    return tuple(db.execute(select(latest_batch, func.max(models.Production.row_version))).one())
+
+
+class ProductionCube:
+    def __init__(self, frame: pd.DataFrame, source_key=None):
+        self.built_at = time.time()
+        self.source_key = source_key
+        agency_codes, agency_idx = np.unique(frame["agency_code"].to_numpy(dtype=str), return_inverse=True)
+        months, month_idx = np.unique(frame["month"].to_numpy(dtype=str), return_inverse=True)
+        offices, office_idx = np.unique(frame["office"].to_numpy(dtype=str), return_inverse=True)
+        self.agencies: List[str] = agency_codes.tolist()
+        self.months: List[str] = months.tolist()
+        self.offices: List[str] = offices.tolist()
+        self._agency_pos = {c: i for i, c in enumerate(self.agencies)}
+        self._month_pos = {m: i for i, m in enumerate(self.months)}
+        self._office_pos = {o: i for i, o in enumerate(self.offices)}
+
+        shape = (len(self.agencies), len(self.months))
+        self.values = np.zeros(shape + (len(METRICS),), dtype=np.float64)
+        self.office_of = np.full(shape, -1, dtype=np.int32)  # -1 = no row for this (agency, month)
+        self.values[agency_idx, month_idx] = frame[list(METRICS)].fillna(0).to_numpy(dtype=np.float64)
+        self.office_of[agency_idx, month_idx] = office_idx
+        names = frame.drop_duplicates("agency_code", keep="last")
+        self.agency_names: Dict[str, str] = dict(zip(names["agency_code"], names["agency_name"]))
+        # Derived arrays / responses; a new cube (rebuild or patch) starts empty, so this is per import batch.
+        self._derived: Dict = {}
+
+    # --- lookups ---
+    def month_index(self, month: Optional[str]) -> int:
+        if not self.months:
+            raise KeyError("Production cube is empty")
+        if month is None:
+            return len(self.months) - 1
+        if month not in self._month_pos:
+            raise KeyError(f"No production data for month {month}")
+        return self._month_pos[month]
+
+    def metric_index(self, metric: str) -> int:
+        if metric not in METRICS:
+            raise KeyError(f"Unknown metric {metric}")
+        return METRICS.index(metric)
+
+    def _office_mask(self, m: int, office: Optional[str]) -> np.ndarray:
+        present = self.office_of[:, m] >= 0
+        if office is None:
+            return present
+        if office not in self._office_pos:
+            return np.zeros_like(present)
+        return self.office_of[:, m] == self._office_pos[office]
+
+    # --- queries ---
+    def office_totals(self, month: Optional[str], metric: str) -> List[dict]:
+        m, k = self.month_index(month), self.metric_index(metric)
+        present = self.office_of[:, m] >= 0
+        totals = np.bincount(self.office_of[present, m], weights=self.values[present, m, k], minlength=len(self.offices))
+        counts = np.bincount(self.office_of[present, m], minlength=len(self.offices))
+        return [
+            {"office": o, "value": float(totals[i]), "agencies": int(counts[i])}
+            for i, o in enumerate(self.offices)
+            if counts[i]
+        ]
+
+    def yoy(self, month: Optional[str], metric: str = "all_ytd_wp", by: str = "office", office: Optional[str] = None) -> List[dict]:
+        """Current YTD vs the prior-year YTD carried on the same rows."""
+        if metric not in YOY_PAIRS:
+            raise KeyError(f"YoY is available for {', '.join(YOY_PAIRS)}")
+        m = self.month_index(month)
+        cur = self.values[:, m, self.metric_index(metric)]
+        prior = self.values[:, m, self.metric_index(YOY_PAIRS[metric])]
+        mask = self._office_mask(m, office)
+        if by == "office":
+            offs = self.office_of[mask, m]
+            cur_tot = np.bincount(offs, weights=cur[mask], minlength=len(self.offices))
+            prior_tot = np.bincount(offs, weights=prior[mask], minlength=len(self.offices))
+            present = np.bincount(offs, minlength=len(self.offices)) > 0
+            keys = [o for i, o in enumerate(self.offices) if present[i]]
+            cur_vals, prior_vals = cur_tot[present], prior_tot[present]
+        else:
+            idx = np.flatnonzero(mask)
+            keys = [self.agencies[i] for i in idx]
+            cur_vals, prior_vals = cur[idx], prior[idx]
+        delta = cur_vals - prior_vals
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct = np.where(prior_vals != 0, delta / prior_vals, np.nan)
+        return [
+            {
+                "key": key,
+                "current": float(c),
+                "prior": float(p),
+                "delta": float(d),
+                "pct": None if np.isnan(r) else float(r),
+            }
+            for key, c, p, d, r in zip(keys, cur_vals, prior_vals, delta, pct)
+        ]
+
+    def top_movers(
+        self,
+        month: Optional[str],
+        metric: str = "all_ytd_wp",
+        basis: str = "mom",
+        office: Optional[str] = None,
+        limit: int = 10,
+        direction: str = "up",
+    ) -> List[dict]:
+        """Agencies with the largest change: vs the previous month ('mom') or vs prior-year YTD ('yoy')."""
+        m, k = self.month_index(month), self.metric_index(metric)
+        mask = self._office_mask(m, office)
+        cur = self.values[:, m, k]
+        if basis == "yoy":
+            if metric not in YOY_PAIRS:
+                raise KeyError(f"YoY is available for {', '.join(YOY_PAIRS)}")
+            prev = self.values[:, m, self.metric_index(YOY_PAIRS[metric])]
+        else:
+            prev_month = self._month_pos.get(_previous_month(self.months[m]))
+            prev = self.values[:, prev_month, k] if prev_month is not None else np.zeros_like(cur)
+        delta = np.where(mask, cur - prev, np.nan)
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            return []
+        scores = delta[candidates] if direction == "up" else -delta[candidates]
+        n = min(limit, len(candidates))
+        top = candidates[np.argpartition(-scores, n - 1)[:n]]
+        top = top[np.argsort(-(delta[top] if direction == "up" else -delta[top]))]
+        return [
+            {
+                "agency_code": self.agencies[i],
+                "agency_name": self.agency_names.get(self.agencies[i], ""),
+                "office": self.offices[self.office_of[i, m]],
+                "current": float(cur[i]),
+                "previous": float(prev[i]),
+                "delta": float(delta[i]),
+            }
+            for i in top
+        ]
+
+    def monthly(self) -> np.ndarray:
+        """
+        Non-cumulative monthly values (agency x month x [wp, nb]) derived from the YTD series:
+        January is the YTD itself, later months subtract the previous month's YTD. NaN where the
+        previous month was never imported for the agency's office or the agency has no row.
+        """
+        if "monthly" not in self._derived:
+            ytd = self.values[:, :, [METRICS.index("all_ytd_wp"), METRICS.index("all_ytd_nb")]]
+            present = self.office_of >= 0
+            prev = np.array([self._month_pos.get(_previous_month(m), -1) for m in self.months], dtype=np.int64)
+            january = np.array([m.endswith("-01") for m in self.months])
+
+            # office x month: was that office's month imported at all?
+            office_month = np.zeros((len(self.offices), len(self.months)), dtype=bool)
+            a_idx, m_idx = np.nonzero(present)
+            office_month[self.office_of[a_idx, m_idx], m_idx] = True
+
+            prev_clipped = np.clip(prev, 0, None)
+            prev_known = (prev >= 0)[None, :] & office_month[np.clip(self.office_of, 0, None), prev_clipped[None, :]]
+            delta = ytd - ytd[:, prev_clipped]  # absent agency in a known month counts as 0 YTD
+            monthly = np.where(january[None, :, None], ytd, np.where(prev_known[:, :, None], delta, np.nan))
+            monthly[~present] = np.nan
+            self._derived["monthly"] = monthly
+        return self._derived["monthly"]
+
+    def trends(self, office: Optional[str] = None, agency_code: Optional[str] = None, window: int = 3) -> List[dict]:
+        """Per-month YTD, YoY growth, derived monthly WP/NB, MoM deltas and rolling averages for a selection."""
+        if (office is not None and office not in self._office_pos) or (
+            agency_code is not None and agency_code not in self._agency_pos
+        ):
+            return []
+        # Only all-agency selections are cached (at most offices x windows entries); per-agency
+        # keys are unbounded and cheap to recompute.
+        cache_key = ("trends", office, window) if agency_code is None else None
+        if cache_key in self._derived:
+            return self._derived[cache_key]
+
+        selected = self.office_of >= 0
+        if office is not None:
+            selected &= self.office_of == self._office_pos[office]
+        if agency_code is not None:
+            row = np.zeros(len(self.agencies), dtype=bool)
+            row[self._agency_pos[agency_code]] = True
+            selected &= row[:, None]
+
+        counts = selected.sum(axis=0)
+        sums = np.einsum("am,amk->mk", selected, self.values)
+        monthly = self.monthly()
+        monthly_sums = np.where(selected[:, :, None], monthly, 0).sum(axis=0)  # NaN if any selected agency is unknown
+
+        frame = pd.DataFrame(
+            {
+                "agencies": counts,
+                **{metric: sums[:, i] for i, metric in enumerate(METRICS)},
+                "monthly_wp": monthly_sums[:, 0],
+                "monthly_nb": monthly_sums[:, 1],
+            },
+            index=pd.PeriodIndex(self.months, freq="M"),
+        )
+        frame = frame[frame["agencies"] > 0]
+        if frame.empty:
+            result = []
+            if cache_key is not None:
+                self._derived[cache_key] = result
+            return result
+
+        full = frame.reindex(pd.period_range(frame.index.min(), frame.index.max(), freq="M"))
+        for col in ("wp", "nb"):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                frame[f"yoy_{col}_pct"] = np.where(
+                    frame[f"pytd_{col}"] != 0,
+                    (frame[f"all_ytd_{col}"] - frame[f"pytd_{col}"]) / frame[f"pytd_{col}"],
+                    np.nan,
+                )
+            frame[f"mom_{col}"] = full[f"monthly_{col}"].diff().reindex(frame.index)
+            frame[f"rolling_{col}"] = (
+                full[f"monthly_{col}"].rolling(window, min_periods=1).mean().reindex(frame.index)
+            )
+
+        frame = frame.astype(object).where(frame.notna(), None)
+        frame.insert(0, "month", frame.index.astype(str))
+        result = frame.drop(columns=["py_total_nb"]).to_dict("records")
+        if cache_key is not None:
+            self._derived[cache_key] = result
+        return result
+
+    def month_totals(self) -> List[dict]:
+        """Every metric summed over all rows of each month."""
+        present = self.office_of >= 0
+        totals = np.where(present[:, :, None], self.values, 0).sum(axis=0)
+        return [
+            {"month": month, "rows": int(present[:, i].sum()), **dict(zip(METRICS, totals[i].tolist()))}
+            for i, month in enumerate(self.months)
+        ]
+
+    def latest_totals(self) -> List[dict]:
+        """
+        Per office, every metric summed over each agency's most recent row (the office it had in
+        that month), plus how many of those agencies have new business this year.
+        """
+        present = self.office_of >= 0
+        has_rows = present.any(axis=1)
+        last = present.shape[1] - 1 - np.argmax(present[:, ::-1], axis=1)
+        agencies = np.nonzero(has_rows)[0]
+        latest = self.values[agencies, last[agencies]]
+        office = self.office_of[agencies, last[agencies]]
+        n = len(self.offices)
+        counts = np.bincount(office, minlength=n)
+        with_nb = np.bincount(office, weights=latest[:, METRICS.index("all_ytd_nb")] > 0, minlength=n)
+        sums = [np.bincount(office, weights=latest[:, k], minlength=n) for k in range(len(METRICS))]
+        return [
+            {
+                "office": o,
+                "agencies": int(counts[i]),
+                "agencies_with_nb": int(with_nb[i]),
+                **{metric: float(sums[k][i]) for k, metric in enumerate(METRICS)},
+            }
+            for i, o in enumerate(self.offices)
+            if counts[i]
+        ]
+
+    def info(self) -> dict:
+        return {
+            "offices": self.offices,
+            "months": self.months,
+            "agencies": len(self.agencies),
+            "metrics": list(METRICS),
+            "cells": int((self.office_of >= 0).sum()),
+            "built_at": self.built_at,
+        }
+
+
+# Held across patch's read-copy-swap so concurrent patches cannot drop each other's cells.
+_lock = threading.RLock()
+_cube: Optional[ProductionCube] = None
+
+
+def _load_frame(db: Session, where=None) -> pd.DataFrame:
+    stmt = select(*_COLUMNS)
+    if where is not None:
+        stmt = stmt.where(where)
+    rows = db.execute(stmt).all()
+    return pd.DataFrame(rows, columns=["office", "agency_code", "agency_name", "month", *METRICS])
+
+
+def build(db: Session) -> ProductionCube:
+    global _cube
+    key = _source_key(db)
+    cube = ProductionCube(_load_frame(db), source_key=key)
+    with _lock:
+        _cube = cube
+    return cube
+
+
+def current() -> Optional[ProductionCube]:
+    """The cube as last built or patched in this process, without checking it against the database."""
+    return _cube
+
+
+def get_cube(db: Session) -> ProductionCube:
+    """Current cube; rebuilt if missing or if production rows changed in another process."""
+    cube = _cube
+    if cube is None or cube.source_key != _source_key(db):
+        cube = build(db)
+    return cube
+
+
+def patch(
+    db: Session,
+    office_months: Sequence[Tuple[str, str]] = (),
+    cells: Sequence[Tuple[str, str]] = (),
+) -> None:
+    """
+    Refresh the cube after a write: each (office, month) is replaced wholesale (import),
+    each (agency_code, month) cell is reloaded (create / bulk upsert). Falls back to a full
+    rebuild when a new agency, month or office appears. Copy-on-write, so readers never see
+    a half-applied patch; patches are serialized so none is lost to a concurrent swap.
+    """
+    global _cube
+    clauses = [and_(models.Production.office == o, models.Production.month == m) for o, m in office_months]
+    clauses += [and_(models.Production.agency_code == c, models.Production.month == m) for c, m in cells]
+    if _cube is None or not clauses:
+        return
+    # Fingerprint first: a write landing after it only makes the next get_cube rebuild.
+    key = _source_key(db)
+    frame = _load_frame(db, or_(*clauses))
+
+    with _lock:
+        cube = _cube
+        if cube is None:
+            return
+        if (
+            set(frame["agency_code"]) - cube._agency_pos.keys()
+            or set(frame["month"]) - cube._month_pos.keys()
+            or set(frame["office"]) - cube._office_pos.keys()
+        ):
+            build(db)
+            return
+
+        patched = copy.copy(cube)
+        patched.values = cube.values.copy()
+        patched.office_of = cube.office_of.copy()
+        patched.agency_names = dict(cube.agency_names)
+        patched._derived = {}
+        for office, month in office_months:
+            m = cube._month_pos.get(month)
+            if m is not None and office in cube._office_pos:
+                cleared = patched.office_of[:, m] == cube._office_pos[office]
+                patched.values[cleared, m] = 0
+                patched.office_of[cleared, m] = -1
+        if len(frame):
+            a = frame["agency_code"].map(cube._agency_pos).to_numpy()
+            m = frame["month"].map(cube._month_pos).to_numpy()
+            patched.values[a, m] = frame[list(METRICS)].fillna(0).to_numpy(dtype=np.float64)
+            patched.office_of[a, m] = frame["office"].map(cube._office_pos).to_numpy()
+            patched.agency_names.update(zip(frame["agency_code"], frame["agency_name"]))
+        patched.built_at = time.time()
+        patched.source_key = key
+        _cube = patched
@@ -0,0 +1,486 @@
+"""
+Production workbook import: parsing and the per office+month write.
+
+`parse_workbook` is a pure function of the file bytes (no database, picklable
+arguments), so batch imports can fan it out over a process pool; `apply_import`
+then writes one office+month in its own transaction and records it in the
+`import_batches` ledger. A re-upload whose SHA-256 matches the latest successful
+batch for that office+month is answered from the ledger without parsing.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import re
+import time
+import zipfile
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from . import autocomplete, events, kpi_snapshots, models, production_cube
+
+EXCEL_SUFFIXES = (".xls", ".xlsx")
+MONTH_PATTERN = re.compile(r"(20\d{2})[-_. ]?(0[1-9]|1[0-2])")
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Shared worker pool for workbook parsing (one process per core by default)."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=int(os.getenv("IMPORT_WORKERS", "0")) or os.cpu_count())
+    return _pool
+
+
+def shutdown_pool() -> None:
+    """Stop the parse workers (app shutdown); the next get_pool starts a new pool."""
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _coalesce_numeric(dataframe: pd.DataFrame, prefixes: List[str], use_last: bool = True) -> pd.Series:
+    cols = []
+    for pref in prefixes:
+        cols.extend([c for c in dataframe.columns if str(c).strip().lower().startswith(pref)])
+    ordered = list(dict.fromkeys(cols))
+    if not ordered:
+        return pd.Series([0] * len(dataframe), index=dataframe.index)
+    if use_last:
+        coalesced = dataframe[ordered].ffill(axis=1).iloc[:, -1]
+    else:
+        coalesced = dataframe[ordered].bfill(axis=1).iloc[:, 0]
+    return pd.to_numeric(coalesced, errors="coerce").fillna(0)
+
+
+def _normalize_active(val) -> str:
+    v = str(val).strip().lower()
+    if v in ["y", "yes", "active", "1", "true"]:
+        return "Active"
+    if v in ["n", "no", "inactive", "0", "false"]:
+        return "Inactive"
+    return str(val).strip() if pd.notna(val) else ""
+
+
+def parse_workbook(contents: bytes, office: str, month: str, sheet_name=0) -> pd.DataFrame:
+    """
+    Parse one production sheet into the import frame (AgencyCode, AgencyName, ActiveFlag,
+    AllYTDWP, AllYTDNB, PYTDWP, PYTDNB, PYTotalNB, Office, Month).
+    Raises ValueError if the sheet has no 'Code' header row.
+    """
+    raw_df = pd.read_excel(io.BytesIO(contents), sheet_name=sheet_name, header=None)
+
+    # Find the header row (contains 'Code' in first column)
+    first_col = raw_df.columns[0]
+    header_rows = raw_df.index[raw_df[first_col] == "Code"].tolist()
+    if not header_rows:
+        raise ValueError("Could not find 'Code' header in Excel file")
+
+    df = raw_df.iloc[header_rows[0]:].copy()
+    df.columns = [str(c).strip() for c in df.iloc[0]]
+    df = df.iloc[1:]
+    df = df[df["Code"].notna() & df["Agency"].notna()]
+    df = df.rename(columns={
+        "Code": "AgencyCode",
+        "Agency": "AgencyName",
+        "Active?": "ActiveFlag",
+        "Active": "ActiveFlag",
+    })
+    if "ActiveFlag" not in df.columns:
+        df["ActiveFlag"] = ""
+
+    df["AllYTDWP"] = _coalesce_numeric(df, ["ytd wp"])
+    df["AllYTDNB"] = _coalesce_numeric(df, ["ytd nb"])
+    df["PYTDWP"] = _coalesce_numeric(df, ["pytd wp"])
+    df["PYTDNB"] = _coalesce_numeric(df, ["pytd nb"])
+    df["PYTotalNB"] = _coalesce_numeric(df, ["py total nb"])
+
+    required_cols = ["AgencyCode", "AgencyName", "ActiveFlag", "AllYTDWP", "AllYTDNB", "PYTDWP", "PYTDNB", "PYTotalNB"]
+    df = df[required_cols].copy()
+    df["Office"] = office
+    df["Month"] = month
+    df["ActiveFlag"] = df["ActiveFlag"].apply(_normalize_active)
+    df["AgencyCode"] = df["AgencyCode"].astype(str).str.strip()
+    df["AgencyName"] = df["AgencyName"].astype(str).str.strip()
+    return df.reset_index(drop=True)
+
+
+def parse_timed(contents: bytes, office: str, month: str, sheet_name=0) -> Tuple[pd.DataFrame, int]:
+    """`parse_workbook` plus its wall time in ms (for the ledger); runs in pool workers."""
+    started = time.perf_counter()
+    df = parse_workbook(contents, office, month, sheet_name)
+    return df, int((time.perf_counter() - started) * 1000)
+
+
+def _normalize_codes(codes: pd.Series) -> pd.Series:
+    return codes.astype(str).str.strip().str.upper()
+
+
+def _normalize_names(names: pd.Series) -> pd.Series:
+    return names.fillna("").astype(str).str.replace(r"\s+", " ", regex=True).str.strip().str.casefold()
+
+
+def plan_agencies(db: Session, office: str, df: pd.DataFrame) -> dict:
+    """
+    Reconcile the import's agency codes against every agency, in all offices, by normalized code
+    (trimmed, upper-cased) with one merge:
+    - new: code unknown anywhere -> created in `office` with the office's default underwriter
+    - conflicts: code belongs to an agency in another office -> left where it is and reported,
+      since many codes legitimately appear in more than one office's workbook
+    - renamed: code matches an agency in `office` or in none, but the name differs (ignoring
+      case/whitespace) -> renamed
+    Nothing is created when `office` is not a known office code.
+    """
+    office_id = db.execute(select(models.Office.id).where(models.Office.code == office)).scalar_one_or_none()
+    agencies = pd.DataFrame(
+        db.execute(
+            select(models.Agency.id, models.Agency.code, models.Agency.name, models.Agency.office_id, models.Office.code)
+            .outerjoin(models.Office, models.Agency.office_id == models.Office.id)
+        ).all(),
+        columns=["id", "code", "name", "office_id", "office_code"],
+    )
+    agencies["key"] = _normalize_codes(agencies["code"])
+    agencies = agencies.drop_duplicates("key")
+
+    incoming = df[["AgencyCode", "AgencyName"]].assign(key=_normalize_codes(df["AgencyCode"]))
+    incoming = incoming[incoming["key"] != ""].drop_duplicates("key")
+    merged = incoming.merge(agencies, on="key", how="left", indicator=True)
+
+    new = merged[merged["_merge"] == "left_only"]
+    matched = merged[merged["_merge"] == "both"]
+    if office_id is None:
+        new = new.iloc[0:0]
+        conflicts = matched.iloc[0:0]
+    else:
+        conflicts = matched[matched["office_id"].notna() & (matched["office_id"] != office_id)]
+    owned = matched.drop(conflicts.index)  # another office's workbook does not rename its agencies either
+    renamed = owned[_normalize_names(owned["AgencyName"]) != _normalize_names(owned["name"])]
+
+    default_uw = None
+    if office_id is not None and len(new):
+        default_uw = db.execute(
+            select(models.Employee.id, models.Employee.name)
+            .where(models.Employee.office_id == office_id)
+            .order_by(models.Employee.id)
+            .limit(1)
+        ).first()
+    return {
+        "office_id": office_id,
+        "default_uw_id": default_uw.id if default_uw else None,
+        "default_uw_name": default_uw.name if default_uw else None,
+        "new": list(zip(new["AgencyCode"], new["AgencyName"])),
+        "conflicts": [
+            {"id": int(r.id), "code": r.code, "name": r.name, "office": r.office_code}
+            for r in conflicts.itertuples(index=False)
+        ],
+        "renamed": [
+            {"id": int(r.id), "code": r.code, "old_name": r.name, "new_name": r.AgencyName}
+            for r in renamed.itertuples(index=False)
+        ],
+        "existing": matched["name"].tolist(),
+    }
+
+
+def content_hash(contents: bytes, sheet=0) -> str:
+    digest = hashlib.sha256(contents)
+    if sheet not in (0, None):
+        digest.update(f"\0sheet:{sheet}".encode())
+    return digest.hexdigest()
+
+
+def find_duplicate(db: Session, office: str, month: str, sha256: str) -> Optional[dict]:
+    """Prior summary if `sha256` is what the latest successful import of office+month loaded."""
+    latest = db.execute(
+        select(models.ImportBatch)
+        .where(
+            models.ImportBatch.office == office,
+            models.ImportBatch.month == month,
+            models.ImportBatch.status == "success",
+        )
+        .order_by(models.ImportBatch.id.desc())
+        .limit(1)
+    ).scalar_one_or_none()
+    if latest is None or latest.sha256 != sha256 or not latest.summary:
+        return None
+    return {**json.loads(latest.summary), "duplicate": True, "batch_id": latest.id}
+
+
+def _record_failure(db: Session, office: str, month: str, ledger: dict, rows_in_file: int, error: str) -> None:
+    db.add(models.ImportBatch(
+        office=office,
+        month=month,
+        status="failed",
+        rows_in_file=rows_in_file,
+        created_at=datetime.utcnow(),
+        error=error[:2000],
+        **ledger,
+    ))
+    db.commit()
+
+
+def apply_import(
+    db: Session,
+    office: str,
+    month: str,
+    df: pd.DataFrame,
+    sha256: str,
+    filename: Optional[str] = None,
+    parse_ms: Optional[int] = None,
+) -> dict:
+    """
+    Replace production for office+month with `df` and auto-create unknown agencies; one transaction,
+    which also writes the import_batches ledger row.
+    """
+    started = time.perf_counter()
+    ledger = {"sha256": sha256, "filename": filename, "parse_ms": parse_ms}
+    try:
+        db.execute(
+            delete(models.Production).where(
+                (models.Production.office == office) & (models.Production.month == month)
+            )
+        )
+        records = [
+            {
+                "office": office,
+                "agency_code": row.AgencyCode,
+                "agency_name": row.AgencyName,
+                "active_flag": row.ActiveFlag,
+                "month": month,
+                "all_ytd_wp": int(row.AllYTDWP),
+                "all_ytd_nb": int(row.AllYTDNB),
+                "pytd_wp": int(row.PYTDWP),
+                "pytd_nb": int(row.PYTDNB),
+                "py_total_nb": int(row.PYTotalNB),
+            }
+            for row in df.itertuples(index=False)
+        ]
+        if records:
+            db.execute(models.Production.__table__.insert(), records)
+
+        # Reconcile agencies across offices: bulk insert new ones, bulk rename changed ones;
+        # agencies owned by another office are only reported
+        plan = plan_agencies(db, office, df)
+        created = []
+        if plan["new"]:
+            created = db.execute(
+                insert(models.Agency).returning(models.Agency),
+                [
+                    {
+                        "name": name,
+                        "code": code,
+                        "office_id": plan["office_id"],
+                        "primary_underwriter_id": plan["default_uw_id"],
+                        "primary_underwriter": plan["default_uw_name"],
+                        "web_address": "",
+                        "notes": "",
+                    }
+                    for code, name in plan["new"]
+                ],
+            ).scalars().all()
+        if plan["renamed"]:
+            db.execute(update(models.Agency), [{"id": r["id"], "name": r["new_name"]} for r in plan["renamed"]])
+
+        summary = {
+            "success": True,
+            "production_rows_imported": len(records),
+            "new_agencies_created": len(created),
+            "agencies_updated": len(plan["existing"]),
+            "agencies_renamed": len(plan["renamed"]),
+            "office_conflicts": len(plan["conflicts"]),
+            "office": office,
+            "month": month,
+            "new_agency_names": [name for _, name in plan["new"]][:10],  # First 10
+            "conflicting_agencies": plan["conflicts"],
+        }
+        batch = models.ImportBatch(
+            office=office,
+            month=month,
+            status="success",
+            rows_in_file=len(df),
+            rows_imported=len(records),
+            agencies_created=len(created),
+            write_ms=int((time.perf_counter() - started) * 1000),
+            created_at=datetime.utcnow(),
+            **ledger,
+        )
+        db.add(batch)
+        db.flush()
+        summary["batch_id"] = batch.id
+        batch.summary = json.dumps(summary)
+        db.commit()
+    except Exception as exc:
+        db.rollback()
+        _record_failure(db, office, month, ledger, len(df), str(exc))
+        raise
+
+    for agency in created:
+        autocomplete.index_agency(agency)
+    changed_ids = {r["id"] for r in plan["renamed"]}
+    if changed_ids:
+        for agency in db.execute(select(models.Agency).where(models.Agency.id.in_(changed_ids))).scalars():
+            autocomplete.index_agency(agency)
+    production_cube.patch(db, office_months=[(office, month)])
+    events.notify()
+    kpi_snapshots.request_refresh("import")
+
+    return summary
+
+
+# Import frame column -> production column, for the metrics compared in a dry run
+DIFF_METRICS = {
+    "AllYTDWP": "all_ytd_wp",
+    "AllYTDNB": "all_ytd_nb",
+    "PYTDWP": "pytd_wp",
+    "PYTDNB": "pytd_nb",
+    "PYTotalNB": "py_total_nb",
+}
+
+
+def _diff_records(frame: pd.DataFrame, columns: List[str]) -> List[dict]:
+    return frame[columns].astype(object).where(frame[columns].notna(), None).to_dict("records")
+
+
+def diff_import(db: Session, office: str, month: str, df: pd.DataFrame) -> dict:
+    """
+    What `apply_import` would change, without writing: one outer merge of the parsed frame
+    against the stored office+month rows on normalized agency code.
+    """
+    metrics = list(DIFF_METRICS.values())
+    stored = pd.DataFrame(
+        db.execute(
+            select(
+                models.Production.agency_code,
+                models.Production.agency_name,
+                models.Production.active_flag,
+                *(getattr(models.Production, m) for m in metrics),
+            ).where(models.Production.office == office, models.Production.month == month)
+        ).all(),
+        columns=["agency_code", "agency_name", "active_flag", *metrics],
+    )
+    incoming = df.rename(columns={"AgencyCode": "agency_code", "AgencyName": "agency_name", "ActiveFlag": "active_flag", **DIFF_METRICS})
+    incoming = incoming[["agency_code", "agency_name", "active_flag", *metrics]]
+
+    stored["key"] = stored["agency_code"].astype(str).str.strip().str.upper()
+    incoming = incoming.assign(key=incoming["agency_code"].str.strip().str.upper()).drop_duplicates("key", keep="last")
+    merged = stored.drop_duplicates("key", keep="last").merge(
+        incoming, on="key", how="outer", suffixes=("_old", "_new"), indicator=True
+    )
+
+    added = merged[merged["_merge"] == "right_only"]
+    removed = merged[merged["_merge"] == "left_only"]
+    both = merged[merged["_merge"] == "both"]
+
+    old = both[[f"{m}_old" for m in metrics]].fillna(0).to_numpy(dtype="float64")
+    new = both[[f"{m}_new" for m in metrics]].fillna(0).to_numpy(dtype="float64")
+    deltas = new - old
+    changed_mask = (deltas != 0).any(axis=1) | (
+        both["agency_name_old"].fillna("").to_numpy() != both["agency_name_new"].fillna("").to_numpy()
+    ) | (both["active_flag_old"].fillna("").to_numpy() != both["active_flag_new"].fillna("").to_numpy())
+    changed = both[changed_mask]
+    changed_deltas = pd.DataFrame(deltas[changed_mask], columns=[f"{m}_delta" for m in metrics], index=changed.index)
+    changed = pd.concat([changed, changed_deltas], axis=1)
+
+    plan = plan_agencies(db, office, df)
+    return {
+        "dry_run": True,
+        "office": office,
+        "month": month,
+        "rows_in_file": len(df),
+        "rows_stored": len(stored),
+        "added": len(added),
+        "removed": len(removed),
+        "changed": len(changed),
+        "unchanged": len(both) - len(changed),
+        "new_agencies_to_create": len(plan["new"]),
+        "agencies_to_rename": len(plan["renamed"]),
+        "office_conflicts": len(plan["conflicts"]),
+        "added_rows": _diff_records(
+            added.rename(columns={f"{c}_new": c for c in ["agency_code", "agency_name", "active_flag", *metrics]}),
+            ["agency_code", "agency_name", "active_flag", *metrics],
+        ),
+        "removed_rows": _diff_records(
+            removed.rename(columns={f"{c}_old": c for c in ["agency_code", "agency_name", "active_flag", *metrics]}),
+            ["agency_code", "agency_name", "active_flag", *metrics],
+        ),
+        "changed_rows": _diff_records(
+            changed.rename(columns={"agency_code_new": "agency_code"}),
+            [
+                "agency_code", "agency_name_old", "agency_name_new", "active_flag_old", "active_flag_new",
+                *(f"{m}_old" for m in metrics), *(f"{m}_new" for m in metrics), *(f"{m}_delta" for m in metrics),
+            ],
+        ),
+        "new_agencies": [{"code": code, "name": name} for code, name in plan["new"]],
+        "renamed_agencies": plan["renamed"],
+        "conflicting_agencies": plan["conflicts"],
+    }
+
+
+# --- Batch uploads ---
+def infer_month(name: str) -> Optional[str]:
+    m = MONTH_PATTERN.search(name)
+    return f"{m.group(1)}-{m.group(2)}" if m else None
+
+
+def infer_office(name: str, office_codes: List[str]) -> Optional[str]:
+    """Office whose code appears as a separate token in a file or sheet name ('LAF_2025-06.xlsx' -> 'LAF')."""
+    tokens = {t.upper() for t in re.split(r"[^A-Za-z0-9]+", os.path.splitext(os.path.basename(name))[0]) if t}
+    matches = [code for code in office_codes if code.upper() in tokens]
+    return matches[0] if len(matches) == 1 else None
+
+
+def collect_sources(filename: str, contents: bytes) -> List[Tuple[str, bytes, object]]:
+    """
+    Split an upload into (label, workbook bytes, sheet) sources: every workbook in a zip
+    (first sheet each), or every sheet of a single workbook.
+    """
+    if filename.lower().endswith(".zip"):
+        sources = []
+        with zipfile.ZipFile(io.BytesIO(contents)) as zf:
+            for info in zf.infolist():
+                base = os.path.basename(info.filename)
+                if info.is_dir() or base.startswith(("~$", ".")) or not base.lower().endswith(EXCEL_SUFFIXES):
+                    continue
+                sources.append((base, zf.read(info), 0))
+        return sources
+    with pd.ExcelFile(io.BytesIO(contents)) as book:
+        return [(sheet, contents, sheet) for sheet in book.sheet_names]
+
+
+def plan_sources(
+    sources: List[Tuple[str, bytes, object]],
+    office_codes: List[str],
+    month: Optional[str] = None,
+    mapping: Optional[Dict[str, str]] = None,
+) -> Tuple[List[dict], List[str]]:
+    """
+    Resolve office+month for each source (explicit mapping first, then name inference, then the
+    request-level month). Returns (jobs, errors); an office+month may appear only once.
+    """
+    mapping = mapping or {}
+    jobs, errors, seen = [], [], {}
+    for label, data, sheet in sources:
+        office = mapping.get(label) or infer_office(label, office_codes)
+        job_month = infer_month(label) or month
+        if not office:
+            errors.append(f"{label}: could not determine office (map it explicitly)")
+            continue
+        if not job_month:
+            errors.append(f"{label}: could not determine month (pass month=YYYY-MM)")
+            continue
+        key = (office, job_month)
+        if key in seen:
+            errors.append(f"{label}: {office} {job_month} also provided by {seen[key]}")
+            continue
+        seen[key] = label
+        jobs.append({"label": label, "data": data, "sheet": sheet, "office": office, "month": job_month})
+    return jobs, errors
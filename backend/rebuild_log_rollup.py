@@ -0,0 +1,36 @@
+"""
+Rebuild the log_daily_rollup table from marketing logs.
+
+crud keeps the rollup current on every log write; run this after bulk loads or raw SQL
+edits to logs, or if the counts are ever suspected to have drifted. The rebuild is one
+DELETE + INSERT ... SELECT ... GROUP BY in a single transaction.
+
+Usage:
+    python -m backend.rebuild_log_rollup
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from . import models  # noqa: F401
+from .database import Base, engine
+from .log_rollup import rebuild
+
+
+def ensure_schema():
+    """Create the rollup table for databases not managed by alembic."""
+    Base.metadata.create_all(bind=engine, tables=[models.LogDailyRollup.__table__])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute daily log counts from the logs table.")
+    parser.parse_args()
+
+    ensure_schema()
+    buckets = rebuild(engine)
+    print(f"Rollup buckets written: {buckets}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Recompute the dashboard KPI snapshot served by GET /dashboard/snapshot.
+
+The API refreshes it in-process every KPI_SNAPSHOT_MINUTES and after production
+imports; run this from cron when that scheduler is disabled (KPI_SNAPSHOT_MINUTES=0),
+or after loading data outside the API.
+
+Usage:
+    python -m backend.refresh_kpi_snapshot
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from . import models
+from .database import Base, SessionLocal, engine
+from .kpi_snapshots import refresh, refresh_lock
+
+
+def ensure_schema():
+    """Create the snapshot table for databases not managed by alembic."""
+    Base.metadata.create_all(bind=engine, tables=[models.KpiSnapshot.__table__])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute the dashboard KPI snapshot.")
+    parser.parse_args()
+
+    ensure_schema()
+    session = SessionLocal()
+    try:
+        with refresh_lock(session):
+            snapshot = refresh(session, trigger="cli")
+        print(f"KPI snapshot {snapshot.id} computed in {snapshot.duration_ms} ms")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, status
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import select, delete
+from sqlalchemy import select
 from typing import List, Optional
 from pydantic import BaseModel
+import asyncio
+import json
 import os
-import pandas as pd
-import io
-from datetime import datetime
 
 from ..database import get_db
-from .. import models, schemas, crud
+from .. import models, schemas, crud, events, health, production_import
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -32,6 +32,13 @@ def authenticate_admin(request: AdminAuthRequest):
     )
 
 
+# --- DIAGNOSTICS ---
+@router.get("/health/details")
+def health_details(db: Session = Depends(get_db)):
+    """Pool counters, DB latency, WAL size, last import, admission queues and schema state for operators."""
+    return health.details(db)
+
+
 # --- EMPLOYEE MANAGEMENT ---
 @router.delete("/employees/{employee_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_employee(employee_id: int, db: Session = Depends(get_db)):
@@ -44,6 +51,7 @@ def delete_employee(employee_id: int, db: Session = Depends(get_db)):
     
     db.delete(employee)
     db.commit()
+    events.notify()
     return None
 
 
@@ -53,6 +61,7 @@ async def import_production(
     office: str,
     month: str,  # Format: YYYY-MM
     file: UploadFile = File(...),
+    dry_run: bool = False,
     db: Session = Depends(get_db)
 ):
     """
@@ -61,191 +70,155 @@ async def import_production(
     - Maps columns to production fields
     - Creates new agencies if they don't exist
     - Updates ActiveFlag for existing agencies
+    - Agencies whose code belongs to another office are left there and listed as conflicting_agencies
     - Returns summary of import results
+    - Re-uploading the file last imported for this office+month returns that import's summary (duplicate=true)
+    - With dry_run=true, returns the added/removed/changed rows and agencies to create; writes nothing
     """
-    if not file.filename.endswith(('.xls', '.xlsx')):
+    if not file.filename.endswith(production_import.EXCEL_SUFFIXES):
         raise HTTPException(
             status_code=400,
             detail="File must be Excel format (.xls or .xlsx)"
         )
     
+    contents = await file.read()
+    # Hashing a large workbook and the ledger lookup block; keep both off the event loop.
+    sha256 = await run_in_threadpool(production_import.content_hash, contents)
+    if not dry_run:
+        prior = await run_in_threadpool(production_import.find_duplicate, db, office, month, sha256)
+        if prior:
+            return prior
     try:
-        # Read Excel file
-        contents = await file.read()
-        raw_df = pd.read_excel(io.BytesIO(contents), sheet_name=0, header=None)
-        
-        # Find the header row (contains 'Code' in first column)
-        first_col = raw_df.columns[0]
-        header_rows = raw_df.index[raw_df[first_col] == 'Code'].tolist()
-        
-        if not header_rows:
-            raise HTTPException(
-                status_code=400,
-                detail="Could not find 'Code' header in Excel file"
-            )
-        
-        header_idx = header_rows[0]
-        
-        # Set header and get data rows
-        df = raw_df.iloc[header_idx:].copy()
-        df.columns = df.iloc[0]
-        df = df.iloc[1:]
-        
-        # Normalize column names
-        df.columns = [str(c).strip() for c in df.columns]
-        
-        # Filter out empty rows
-        df = df[df['Code'].notna() & df['Agency'].notna()]
-        
-        # Rename columns to match our schema
-        df = df.rename(columns={
-            'Code': 'AgencyCode',
-            'Agency': 'AgencyName',
-            'Active?': 'ActiveFlag',
-            'Active': 'ActiveFlag',
-        })
-        
-        # Helper function to coalesce numeric columns
-        def coalesce_numeric(dataframe, prefixes, use_last=True):
-            cols = []
-            for pref in prefixes:
-                cols.extend([c for c in dataframe.columns if str(c).strip().lower().startswith(pref)])
-            seen = set()
-            ordered = []
-            for c in cols:
-                if c not in seen:
-                    ordered.append(c)
-                    seen.add(c)
-            if not ordered:
-                return pd.Series([0] * len(dataframe), index=dataframe.index)
-            if use_last:
-                coalesced = dataframe[ordered].ffill(axis=1).iloc[:, -1]
-            else:
-                coalesced = dataframe[ordered].bfill(axis=1).iloc[:, 0]
-            return pd.to_numeric(coalesced, errors='coerce').fillna(0)
-        
-        # Map columns to production fields
-        df['AllYTDWP'] = coalesce_numeric(df, ['ytd wp'], use_last=True)
-        df['AllYTDNB'] = coalesce_numeric(df, ['ytd nb'], use_last=True)
-        df['PYTDWP'] = coalesce_numeric(df, ['pytd wp'], use_last=True)
-        df['PYTDNB'] = coalesce_numeric(df, ['pytd nb'], use_last=True)
-        df['PYTotalNB'] = coalesce_numeric(df, ['py total nb'], use_last=True)
-        
-        # Keep only required columns
-        required_cols = ['AgencyCode', 'AgencyName', 'ActiveFlag', 'AllYTDWP', 'AllYTDNB', 'PYTDWP', 'PYTDNB', 'PYTotalNB']
-        df = df[required_cols].copy()
-        
-        # Add office and month
-        df['Office'] = office
-        df['Month'] = month
-        
-        # Normalize ActiveFlag
-        def normalize_active(val):
-            v = str(val).strip().lower()
-            if v in ["y", "yes", "active", "1", "true"]:
-                return "Active"
-            if v in ["n", "no", "inactive", "0", "false"]:
-                return "Inactive"
-            return str(val).strip() if pd.notna(val) else ""
-        
-        df['ActiveFlag'] = df['ActiveFlag'].apply(normalize_active)
-        df['AgencyCode'] = df['AgencyCode'].astype(str).str.strip()
-        df['AgencyName'] = df['AgencyName'].astype(str).str.strip()
-        
-        # Delete existing production records for this office+month
-        delete_stmt = delete(models.Production).where(
-            (models.Production.office == office) & (models.Production.month == month)
+        df, parse_ms = await run_in_threadpool(production_import.parse_timed, contents, office, month)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not read Excel file: {str(e)}")
+
+    if dry_run:
+        return await run_in_threadpool(production_import.diff_import, db, office, month, df)
+    try:
+        return await run_in_threadpool(
+            production_import.apply_import, db, office, month, df, sha256, file.filename, parse_ms
         )
-        db.execute(delete_stmt)
-        
-        # Insert new production records
-        production_rows = []
-        for _, row in df.iterrows():
-            prod = models.Production(
-                office=row['Office'],
-                agency_code=row['AgencyCode'],
-                agency_name=row['AgencyName'],
-                active_flag=row['ActiveFlag'],
-                month=row['Month'],
-                all_ytd_wp=int(row['AllYTDWP']),
-                all_ytd_nb=int(row['AllYTDNB']),
-                pytd_wp=int(row['PYTDWP']),
-                pytd_nb=int(row['PYTDNB']),
-                py_total_nb=int(row['PYTotalNB'])
-            )
-            db.add(prod)
-            production_rows.append(row)
-        
-        db.commit()
-        
-        # Auto-create new agencies from this import
-        # Get existing agencies for this office
-        existing_agencies_stmt = select(models.Agency).where(models.Agency.office_id.in_(
-            select(models.Office.id).where(models.Office.code == office)
-        ))
-        existing_agencies = db.execute(existing_agencies_stmt).scalars().all()
-        existing_codes = {ag.code.strip().upper() for ag in existing_agencies}
-        
-        # Find new agencies to add
-        df_deduplicated = df.drop_duplicates(subset=['AgencyCode'])
-        new_agencies = []
-        updated_agencies = []
-        
-        for _, row in df_deduplicated.iterrows():
-            code_normalized = row['AgencyCode'].strip().upper()
-            
-            if code_normalized and code_normalized not in existing_codes:
-                # Get office ID
-                office_stmt = select(models.Office).where(models.Office.code == office)
-                office_obj = db.execute(office_stmt).scalar_one_or_none()
-                
-                if office_obj:
-                    # Get default underwriter for this office
-                    default_uw_stmt = select(models.Employee).where(
-                        models.Employee.office_id == office_obj.id
-                    ).limit(1)
-                    default_uw = db.execute(default_uw_stmt).scalar_one_or_none()
-                    
-                    # Create new agency
-                    new_agency = models.Agency(
-                        name=row['AgencyName'],
-                        code=row['AgencyCode'],
-                        office_id=office_obj.id,
-                        primary_underwriter_id=default_uw.id if default_uw else None,
-                        web_address="",
-                        notes=""
-                    )
-                    db.add(new_agency)
-                    new_agencies.append(row['AgencyName'])
-            else:
-                # Update ActiveFlag for existing agency
-                for agency in existing_agencies:
-                    if agency.code.strip().upper() == code_normalized:
-                        # Note: ActiveFlag is not in Agency model, would need to add if needed
-                        updated_agencies.append(agency.name)
-                        break
-        
-        db.commit()
-        
-        return {
-            "success": True,
-            "production_rows_imported": len(production_rows),
-            "new_agencies_created": len(new_agencies),
-            "agencies_updated": len(updated_agencies),
-            "office": office,
-            "month": month,
-            "new_agency_names": new_agencies[:10],  # First 10
-        }
-        
     except Exception as e:
-        db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Error importing production: {str(e)}"
         )
 
 
+@router.post("/production/import/batch")
+async def import_production_batch(
+    file: UploadFile = File(...),
+    month: Optional[str] = Form(None),  # Fallback when a file/sheet name carries no YYYY-MM
+    mapping: Optional[str] = Form(None),  # JSON {"file or sheet name": "OFFICE"} overriding inference
+    dry_run: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Import many offices/months at once from a zip of workbooks or a multi-sheet workbook.
+    - Office and month come from `mapping` or are inferred from each file/sheet name
+    - Every workbook is parsed in a process pool, and all must parse before anything is written
+    - Each office+month is then written in its own transaction (or only diffed, with dry_run=true)
+    """
+    if not file.filename.lower().endswith(production_import.EXCEL_SUFFIXES + (".zip",)):
+        raise HTTPException(status_code=400, detail="File must be a .zip of workbooks or an Excel workbook")
+    try:
+        office_map = json.loads(mapping) if mapping else {}
+    except ValueError:
+        office_map = None
+    if not isinstance(office_map, dict) or not all(isinstance(v, str) for v in office_map.values()):
+        raise HTTPException(status_code=400, detail="mapping must be a JSON object of name -> office code")
+
+    contents = await file.read()
+    try:
+        sources = await run_in_threadpool(production_import.collect_sources, file.filename, contents)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not read upload: {str(e)}")
+    office_codes = await run_in_threadpool(lambda: db.execute(select(models.Office.code)).scalars().all())
+    jobs, errors = production_import.plan_sources(sources, office_codes, month=month, mapping=office_map)
+    if not jobs and not errors:
+        errors.append("No workbooks found in upload")
+
+    def find_duplicates() -> List[dict]:
+        found = []
+        for job in jobs:
+            job["sha256"] = production_import.content_hash(job["data"], job["sheet"])
+            prior = None if dry_run else production_import.find_duplicate(db, job["office"], job["month"], job["sha256"])
+            if prior:
+                found.append({"source": job["label"], **prior})
+        return found
+
+    duplicates = await run_in_threadpool(find_duplicates)
+    if duplicates:
+        done = {d["source"] for d in duplicates}
+        jobs = [job for job in jobs if job["label"] not in done]
+
+    loop = asyncio.get_running_loop()
+    pool = production_import.get_pool()
+    parsed = await asyncio.gather(
+        *(
+            loop.run_in_executor(pool, production_import.parse_timed, job["data"], job["office"], job["month"], job["sheet"])
+            for job in jobs
+        ),
+        return_exceptions=True,
+    )
+    for job, result in zip(jobs, parsed):
+        if isinstance(result, Exception):
+            errors.append(f"{job['label']}: {result}")
+    if errors:
+        raise HTTPException(status_code=400, detail={"errors": errors})
+
+    if dry_run:
+        diffs = []
+        for job, (df, _) in zip(jobs, parsed):
+            diff = await run_in_threadpool(production_import.diff_import, db, job["office"], job["month"], df)
+            diffs.append({"source": job["label"], **diff})
+        return {"dry_run": True, "files": len(diffs), "imports": diffs}
+
+    imports = duplicates
+    for job, (df, parse_ms) in zip(jobs, parsed):
+        try:
+            summary = await run_in_threadpool(
+                production_import.apply_import, db, job["office"], job["month"], df, job["sha256"], job["label"], parse_ms
+            )
+        except Exception as e:
+            summary = {"success": False, "office": job["office"], "month": job["month"], "error": str(e)}
+        imports.append({"source": job["label"], **summary})
+
+    return {
+        "success": all(i["success"] for i in imports),
+        "files": len(imports),
+        "production_rows_imported": sum(i.get("production_rows_imported", 0) for i in imports),
+        "new_agencies_created": sum(i.get("new_agencies_created", 0) for i in imports),
+        "agencies_renamed": sum(i.get("agencies_renamed", 0) for i in imports),
+        "office_conflicts": sum(i.get("office_conflicts", 0) for i in imports),
+        "imports": imports,
+    }
+
+
+@router.get("/production/imports", response_model=List[schemas.ImportBatch])
+def list_import_batches(
+    office: Optional[str] = None,
+    month: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Import ledger, newest first."""
+    stmt = select(models.ImportBatch).order_by(models.ImportBatch.id.desc()).limit(limit)
+    if office:
+        stmt = stmt.where(models.ImportBatch.office == office)
+    if month:
+        stmt = stmt.where(models.ImportBatch.month == month)
+    return db.execute(stmt).scalars().all()
+
+
 # --- AGENCY DELETION ---
+class AgencyBulkDeleteRequest(BaseModel):
+    ids: List[int]
+
+
 @router.delete("/agencies/{agency_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_agency_cascade(agency_id: int, db: Session = Depends(get_db)):
     """
@@ -254,28 +227,16 @@ def delete_agency_cascade(agency_id: int, db: Session = Depends(get_db)):
     - Logs
     - Tasks
     """
-    # Check if agency exists
-    stmt = select(models.Agency).where(models.Agency.id == agency_id)
-    agency = db.execute(stmt).scalar_one_or_none()
-    
-    if not agency:
+    if not crud.delete_agency(db, agency_id):
         raise HTTPException(status_code=404, detail="Agency not found")
-    
-    # Delete related contacts
-    delete_contacts_stmt = delete(models.Contact).where(models.Contact.agency_id == agency_id)
-    db.execute(delete_contacts_stmt)
-    
-    # Delete related logs (by agency_id if it exists in logs)
-    delete_logs_stmt = delete(models.Log).where(models.Log.agency_id == agency_id)
-    db.execute(delete_logs_stmt)
-    
-    # Delete related tasks
-    delete_tasks_stmt = delete(models.Task).where(models.Task.agency_id == agency_id)
-    db.execute(delete_tasks_stmt)
-    
-    # Delete the agency
-    db.delete(agency)
-    db.commit()
-    
     return None
 
+
+@router.post("/agencies/delete")
+def delete_agencies_bulk(request: AgencyBulkDeleteRequest, db: Session = Depends(get_db)):
+    """
+    Delete many agencies and their contacts, logs and tasks in one transaction,
+    using chunked set-based deletes. Unknown ids are reported, not treated as errors.
+    """
+    return crud.delete_agencies(db, request.ids)
+
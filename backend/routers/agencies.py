@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from ..database import get_db
-from .. import models, schemas
+from .. import models, schemas, crud, cache_versions
 
 router = APIRouter(
     prefix="/agencies",
@@ -12,7 +12,9 @@ router = APIRouter(
 
 @router.get("/", response_model=List[schemas.Agency])
 def get_agencies(db: Session = Depends(get_db)):
-    return db.query(models.Agency).all()
+    return cache_versions.agencies.get(
+        db, None, lambda: [schemas.Agency.model_validate(a).model_dump() for a in crud.get_agencies(db)]
+    )
 
 @router.get("/{agency_id}", response_model=schemas.Agency)
 def get_agency(agency_id: int, db: Session = Depends(get_db)):
@@ -23,31 +25,25 @@ def get_agency(agency_id: int, db: Session = Depends(get_db)):
 
 @router.post("/", response_model=schemas.Agency)
 def create_agency(agency: schemas.AgencyCreate, db: Session = Depends(get_db)):
-    new_agency = models.Agency(**agency.model_dump())
-    db.add(new_agency)
-    db.commit()
-    db.refresh(new_agency)
-    return new_agency
+    return crud.create_agency(db, agency)
+
+@router.post("/reassign", response_model=schemas.AgencyReassignResult)
+def reassign_agencies(payload: schemas.AgencyReassign, db: Session = Depends(get_db)):
+    for emp_id in (payload.from_employee_id, payload.to_employee_id):
+        if not db.get(models.Employee, emp_id):
+            raise HTTPException(status_code=404, detail="Employee not found")
+    moved = crud.reassign_agencies(db, payload.from_employee_id, payload.to_employee_id, office=payload.office)
+    return {"moved": len(moved), "agency_ids": moved}
 
 @router.put("/{agency_id}", response_model=schemas.Agency)
 def update_agency(agency_id: int, updated: schemas.AgencyUpdate, db: Session = Depends(get_db)):
-    agency = db.query(models.Agency).filter(models.Agency.id == agency_id).first()
+    agency = crud.update_agency(db, agency_id, updated)
     if not agency:
         raise HTTPException(status_code=404, detail="Agency not found")
-
-    for key, value in updated.model_dump(exclude_unset=True).items():
-        setattr(agency, key, value)
-
-    db.commit()
-    db.refresh(agency)
     return agency
 
 @router.delete("/{agency_id}")
 def delete_agency(agency_id: int, db: Session = Depends(get_db)):
-    agency = db.query(models.Agency).filter(models.Agency.id == agency_id).first()
-    if not agency:
+    if not crud.delete_agency(db, agency_id):
         raise HTTPException(status_code=404, detail="Agency not found")
-
-    db.delete(agency)
-    db.commit()
     return {"detail": "Agency deleted"}
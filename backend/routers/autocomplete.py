@@ -0,0 +1,21 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from .. import autocomplete, schemas
+from ..database import get_db
+
+router = APIRouter(prefix="/autocomplete", tags=["autocomplete"])
+
+
+@router.get("", response_model=List[schemas.AutocompleteHit])
+def read_autocomplete(
+    kind: str = Query(..., pattern="^(agency|contact)$"),
+    prefix: str = Query(""),
+    limit: int = Query(10, ge=1, le=50),
+    agency_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """Typeahead from the in-process prefix index; `agency_id` narrows contacts to one agency."""
+    return autocomplete.complete(db, kind, prefix, limit=limit, agency_id=agency_id)
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+
+from .. import kpi_snapshots
+from ..database import get_db
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+
+@router.get("/snapshot")
+def read_kpi_snapshot(db: Session = Depends(get_db)):
+    """
+    Newest precomputed KPI snapshot: `{id, computed_at, trigger, kpis: {calls, production, tasks}}`.
+    Computed on the spot only if none has been stored yet.
+    """
+    snapshot = kpi_snapshots.latest(db) or kpi_snapshots.refresh(db, trigger="request")
+    # The payload is stored as JSON; splice it in rather than decoding and re-encoding it.
+    content = (
+        f'{{"id":{snapshot.id},"computed_at":"{snapshot.computed_at.isoformat()}",'
+        f'"trigger":"{snapshot.trigger}","duration_ms":{snapshot.duration_ms or 0},"kpis":{snapshot.payload}}}'
+    )
+    return Response(content=content, media_type="application/json")
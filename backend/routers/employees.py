@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, status, Query, HTTPException
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 
-from .. import schemas, crud
+from .. import schemas, crud, cache_versions, coalesce
+from ..admission import get_report_db
 from ..database import get_db
 
 router = APIRouter(prefix="/employees", tags=["employees"])
@@ -10,7 +12,9 @@ router = APIRouter(prefix="/employees", tags=["employees"])
 
 @router.get("", response_model=List[schemas.Employee])
 def read_employees(office: Optional[str] = Query(None), db: Session = Depends(get_db)):
-    return crud.get_employees(db, office=office)
+    return cache_versions.employees.get(
+        db, office, lambda: [schemas.Employee.model_validate(e).model_dump() for e in crud.get_employees(db, office=office)]
+    )
 
 
 @router.post("", response_model=schemas.Employee, status_code=status.HTTP_201_CREATED)
@@ -24,3 +28,20 @@ def update_employee(employee_id: int, payload: schemas.EmployeeUpdate, db: Sessi
     if not updated:
         raise HTTPException(status_code=404, detail="Employee not found")
     return updated
+
+
+@router.get("/{employee_id}/metrics", response_model=schemas.EmployeeMetrics)
+def read_employee_metrics(
+    employee_id: int,
+    period: str = Query("month", pattern="^(day|week|month)$"),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    db: Session = Depends(get_report_db),
+):
+    metrics = coalesce.coalesced(
+        db, "employees.metrics", {"employee_id": employee_id, "period": period, "since": since, "until": until},
+        lambda: crud.get_employee_metrics(db, employee_id, period=period, since=since, until=until),
+    )
+    if not metrics:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    return metrics
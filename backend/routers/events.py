@@ -0,0 +1,28 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import StreamingResponse
+
+from .. import events
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+@router.get("")
+async def change_feed(
+    table: Optional[List[str]] = Query(None),
+    since: Optional[str] = Query(None),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Server-sent change events from every worker: `{table, id, op, version, agency_id?}`, with `op`
+    `upsert`, `delete`, or `bulk` (`id` null: refetch the table). Event ids are sync versions;
+    reconnecting clients resume via Last-Event-ID (or ?since=) on any worker. An `event: reset`
+    frame (deletes that old are pruned, or an unknown id) means reload once.
+    """
+    resume_from = last_event_id if last_event_id is not None else since
+    return StreamingResponse(
+        events.stream(resume_from, events.table_filter(table)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
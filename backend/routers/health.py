@@ -0,0 +1,34 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from .. import health
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/livez")
+async def livez():
+    """The process is up and its event loop is answering; never touches the database."""
+    return {"status": "ok"}
+
+
+async def _probe_response(fields) -> JSONResponse:
+    # Fresh cached results are served on the event loop; only a stale one costs a threadpool hop.
+    result = health.cached_probe() or await run_in_threadpool(health.readiness)
+    return JSONResponse(
+        status_code=200 if result["status"] == "ok" else 503,
+        content={k: result[k] for k in fields},
+    )
+
+
+@router.get("/readyz")
+async def readyz():
+    """Database reachability (and a complete schema) from a probe cached for READY_CACHE_SECONDS."""
+    return await _probe_response(("status", "db", "latency_ms", "checked_at", "error"))
+
+
+@router.get("/health")
+async def health_check():
+    return await _probe_response(("status", "db", "error"))
+
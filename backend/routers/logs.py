@@ -1,16 +1,98 @@
 from fastapi import APIRouter, Depends, Query, status, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import date, datetime
+import csv
+import io
+import itertools
 
-from .. import schemas, crud
-from ..database import get_db
+from .. import schemas, crud, coalesce, log_rollup
+from ..admission import EXPORT_STATEMENT_TIMEOUT_SECONDS, get_report_db, statement_timeout
+from ..database import get_db, SessionLocal
 
 router = APIRouter(prefix="/logs", tags=["logs"])
 
 
 @router.get("", response_model=List[schemas.Log])
-def read_logs(agency_id: Optional[int] = Query(None), db: Session = Depends(get_db)):
-    return crud.get_logs(db, agency_id=agency_id)
+def read_logs(
+    agency_id: Optional[int] = Query(None),
+    office: Optional[str] = Query(None),
+    user: Optional[str] = Query(None),
+    action: Optional[str] = Query(None),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    include_archived: bool = Query(False, description="Also read archived logs; without it they are read only when `since` / `until` reaches the archive"),
+    db: Session = Depends(get_report_db),
+):
+    return crud.get_logs(
+        db, agency_id=agency_id, office=office, user=user, action=action, since=since, until=until,
+        include_archived=include_archived,
+    )
+
+
+@router.get("/activity", response_model=List[schemas.ActivityCount])
+def read_log_activity(
+    since: Optional[date] = Query(None, description="First day, inclusive"),
+    until: Optional[date] = Query(None, description="Last day, inclusive"),
+    office: Optional[str] = Query(None),
+    user: Optional[str] = Query(None),
+    action: Optional[str] = Query(None),
+    agency_id: Optional[int] = Query(None),
+    group_by: Optional[str] = Query(None, pattern="^(day|office|user|action|agency)$"),
+    db: Session = Depends(get_report_db),
+):
+    """Log counts from the daily rollup; cost grows with days in range, not with logs."""
+    params = dict(since=since, until=until, office=office, user=user, action=action, agency_id=agency_id, group_by=group_by)
+    return coalesce.coalesced(db, "logs.activity", params, lambda: log_rollup.get_activity(db, **params))
+
+
+@router.get("/export.csv")
+def export_logs_csv(
+    agency_id: Optional[int] = Query(None),
+    office: Optional[str] = Query(None),
+    user: Optional[str] = Query(None),
+    action: Optional[str] = Query(None),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    include_archived: bool = Query(False),
+):
+    """
+    Stream logs matching the /logs filters as CSV. Rows come from a server-side cursor and are
+    flushed in chunks, so memory stays flat regardless of export size. The first chunk is built
+    before the response starts, so a query over its time budget still gets a 503.
+    """
+    filters = dict(
+        agency_id=agency_id, office=office, user=user, action=action, since=since, until=until,
+        include_archived=include_archived,
+    )
+
+    def generate():
+        # The request-scoped session may be closed before streaming finishes; own one for the generator.
+        db = SessionLocal()
+        try:
+            with statement_timeout(db, EXPORT_STATEMENT_TIMEOUT_SECONDS):
+                buf = io.StringIO()
+                writer = csv.writer(buf)
+                writer.writerow(crud.LOG_EXPORT_COLUMNS)
+                for i, row in enumerate(crud.iter_log_export_rows(db, **filters), start=1):
+                    writer.writerow(row)
+                    if i % 1000 == 0:
+                        yield buf.getvalue()
+                        buf.seek(0)
+                        buf.truncate(0)
+                yield buf.getvalue()
+        finally:
+            db.close()
+
+    chunks = generate()
+    first = next(chunks)
+    filename = f"marketing_logs_{agency_id or office or 'all'}.csv"
+    return StreamingResponse(
+        itertools.chain([first], chunks),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.post("", response_model=schemas.Log, status_code=status.HTTP_201_CREATED)
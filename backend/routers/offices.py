@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 
-from .. import schemas, crud
+from .. import schemas, crud, cache_versions
 from ..database import get_db
 
 router = APIRouter(prefix="/offices", tags=["offices"])
@@ -10,7 +10,9 @@ router = APIRouter(prefix="/offices", tags=["offices"])
 
 @router.get("", response_model=List[schemas.Office])
 def read_offices(db: Session = Depends(get_db)):
-    return crud.get_offices(db)
+    return cache_versions.offices.get(
+        db, None, lambda: [schemas.Office.model_validate(o).model_dump() for o in crud.get_offices(db)]
+    )
 
 
 @router.post("", response_model=schemas.Office, status_code=status.HTTP_201_CREATED)
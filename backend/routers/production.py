@@ -1,9 +1,10 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
-from .. import crud, schemas
+from .. import coalesce, crud, production_cube, schemas
+from ..admission import get_report_db
 from ..database import get_db
 
 router = APIRouter(prefix="/production", tags=["production"])
@@ -27,3 +28,92 @@ def create_production(payload: schemas.ProductionCreate, db: Session = Depends(g
 def bulk_upsert_production(rows: List[schemas.ProductionCreate], db: Session = Depends(get_db)):
     written = crud.bulk_upsert_production(db, rows)
     return {"rows_written": written}
+
+
+@router.get("/leaderboard", response_model=List[schemas.LeaderboardEntry])
+def production_leaderboard(
+    office: Optional[str] = Query(None),
+    month: Optional[str] = Query(None, description="YYYY-MM; defaults to the latest imported month"),
+    metric: str = Query("all_ytd_wp", pattern="^(" + "|".join(crud.LEADERBOARD_METRICS) + ")$"),
+    limit: int = Query(25, ge=1, le=500),
+    db: Session = Depends(get_report_db),
+):
+    return coalesce.coalesced(
+        db, "production.leaderboard", {"office": office, "month": month, "metric": metric, "limit": limit},
+        lambda: crud.get_production_leaderboard(db, office=office, month=month, metric=metric, limit=limit),
+    )
+
+
+# Columnar cube: answered from in-memory NumPy arrays (see backend/production_cube.py)
+METRIC_PATTERN = "^(" + "|".join(production_cube.METRICS) + ")$"
+
+
+def _cube_call(fn, *args, **kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=exc.args[0])
+
+
+@router.get("/cube", response_model=schemas.CubeInfo)
+def cube_info(db: Session = Depends(get_report_db)):
+    return production_cube.get_cube(db).info()
+
+
+@router.get("/cube/office-totals", response_model=List[schemas.CubeOfficeTotal])
+def cube_office_totals(
+    month: Optional[str] = Query(None, description="YYYY-MM; defaults to the latest month"),
+    metric: str = Query("all_ytd_wp", pattern=METRIC_PATTERN),
+    db: Session = Depends(get_report_db),
+):
+    return coalesce.coalesced(
+        db, "production.cube.office_totals", {"month": month, "metric": metric},
+        lambda: _cube_call(production_cube.get_cube(db).office_totals, month, metric),
+    )
+
+
+@router.get("/cube/yoy", response_model=List[schemas.CubeYoY])
+def cube_yoy(
+    month: Optional[str] = Query(None),
+    metric: str = Query("all_ytd_wp", pattern="^(all_ytd_wp|all_ytd_nb)$"),
+    by: str = Query("office", pattern="^(office|agency)$"),
+    office: Optional[str] = Query(None),
+    db: Session = Depends(get_report_db),
+):
+    return coalesce.coalesced(
+        db, "production.cube.yoy", {"month": month, "metric": metric, "by": by, "office": office},
+        lambda: _cube_call(production_cube.get_cube(db).yoy, month, metric, by=by, office=office),
+    )
+
+
+@router.get("/cube/top-movers", response_model=List[schemas.CubeMover])
+def cube_top_movers(
+    month: Optional[str] = Query(None),
+    metric: str = Query("all_ytd_wp", pattern=METRIC_PATTERN),
+    basis: str = Query("mom", pattern="^(mom|yoy)$"),
+    direction: str = Query("up", pattern="^(up|down)$"),
+    office: Optional[str] = Query(None),
+    limit: int = Query(10, ge=1, le=200),
+    db: Session = Depends(get_report_db),
+):
+    params = {"month": month, "metric": metric, "basis": basis, "direction": direction, "office": office, "limit": limit}
+    return coalesce.coalesced(
+        db, "production.cube.top_movers", params,
+        lambda: _cube_call(
+            production_cube.get_cube(db).top_movers,
+            month, metric, basis=basis, office=office, limit=limit, direction=direction,
+        ),
+    )
+
+
+@router.get("/trends", response_model=List[schemas.ProductionTrend])
+def production_trends(
+    office: Optional[str] = Query(None),
+    agency_code: Optional[str] = Query(None),
+    window: int = Query(3, ge=1, le=12, description="Rolling-average window in months"),
+    db: Session = Depends(get_report_db),
+):
+    return coalesce.coalesced(
+        db, "production.trends", {"office": office, "agency_code": agency_code, "window": window},
+        lambda: production_cube.get_cube(db).trends(office=office, agency_code=agency_code, window=window),
+    )
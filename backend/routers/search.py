@@ -0,0 +1,24 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from .. import schemas
+from ..database import get_db
+from ..search import SEARCH_KINDS, search
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get("", response_model=List[schemas.SearchHit])
+def global_search(
+    q: str = Query(..., min_length=1),
+    kind: Optional[List[str]] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    """Ranked hits across agencies, contacts, log notes and tasks; `kind` narrows the entity types."""
+    unknown = set(kind or []) - set(SEARCH_KINDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown kind(s): {', '.join(sorted(unknown))}")
+    return search(db, q, kinds=kind, limit=limit)
@@ -0,0 +1,30 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..sync import SYNC_TABLES, get_changes
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+@router.get("")
+def read_changes(
+    since: int = Query(0, ge=0),
+    table: Optional[List[str]] = Query(None),
+    limit: int = Query(5000, ge=1, le=50000),
+    full: bool = Query(False),
+    db: Session = Depends(get_db),
+):
+    """
+    Delta sync: `{version, has_more, reset, full, changes: {table: [rows]}, deleted: {table: [ids]}}`.
+    Keep `version` and pass it back as `since` (with `full=true` while `has_more` pages a full load);
+    `since=0` loads everything, and `reset` means the client's copy must be replaced.
+    """
+    unknown = set(table or []) - set(SYNC_TABLES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown table(s): {', '.join(sorted(unknown))}")
+    # Rows are already JSON-safe; skip the response-model/encoder pass on large payloads.
+    return JSONResponse(content=get_changes(db, since=since, tables=table, limit=limit, full=full))
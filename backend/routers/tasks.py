@@ -1,16 +1,53 @@
-from fastapi import APIRouter, Depends, status, HTTPException, Query
+from fastapi import APIRouter, Depends, status, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 
-from .. import schemas, crud
+from .. import schemas, crud, coalesce
+from ..admission import get_report_db
 from ..database import get_db
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
 
 @router.get("", response_model=List[schemas.Task])
-def read_tasks(agency_id: Optional[int] = Query(None), db: Session = Depends(get_db)):
-    return crud.get_tasks(db, agency_id=agency_id)
+def read_tasks(
+    response: Response,
+    agency_id: Optional[int] = Query(None),
+    owner: Optional[str] = Query(None),
+    status_filter: Optional[List[str]] = Query(None, alias="status"),
+    due_before: Optional[datetime] = Query(None),
+    due_after: Optional[datetime] = Query(None),
+    overdue: bool = Query(False),
+    sort: str = Query("id"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """Task queue. When `limit` is set and more rows may follow, the next page cursor is in X-Next-Cursor."""
+    try:
+        tasks = crud.get_tasks(
+            db,
+            agency_id=agency_id,
+            owner=owner,
+            status=status_filter,
+            due_before=due_before,
+            due_after=due_after,
+            overdue=overdue,
+            sort=sort,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if limit and len(tasks) == limit:
+        response.headers["X-Next-Cursor"] = crud.encode_task_cursor(tasks[-1], sort)
+    return tasks
+
+
+@router.get("/summary", response_model=List[schemas.TaskSummary])
+def read_task_summary(office: Optional[str] = Query(None), db: Session = Depends(get_report_db)):
+    return coalesce.coalesced(db, "tasks.summary", {"office": office}, lambda: crud.get_task_summary(db, office=office))
 
 
 @router.post("", response_model=schemas.Task, status_code=status.HTTP_201_CREATED)
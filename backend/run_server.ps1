@@ -1,7 +1,8 @@
 $ErrorActionPreference = "Stop"
 
 Param(
-    [int]$Port = 8000
+    [int]$Port = 8000,
+    [int]$Workers = 1
 )
 
 $repoRoot = Split-Path -Parent $PSScriptRoot
@@ -18,9 +19,15 @@ Write-Host "Logging to $outLog and $errLog"
 
 Push-Location $repoRoot
 try {
+    if ($Workers -gt 1) {
+        # Set up the schema once, then keep the workers from racing on it at import
+        python -m backend.migrate
+        $env:SCHEMA_SETUP = "skip"
+    }
+
     while ($true) {
         # Run without --reload so watchfiles does not terminate the worker with CTRL_C events
-        python -m uvicorn backend.main:app --host 0.0.0.0 --port $Port --proxy-headers 1>> $outLog 2>> $errLog
+        python -m uvicorn backend.main:app --host 0.0.0.0 --port $Port --proxy-headers --workers $Workers 1>> $outLog 2>> $errLog
         $code = $LASTEXITCODE
 
         if ($code -eq 0 -or $code -eq 3221225786) {
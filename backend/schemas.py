@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Optional, List, Dict, Union
 from datetime import datetime, date
 from pydantic import BaseModel, EmailStr, ConfigDict
 
@@ -71,6 +71,17 @@ class Agency(AgencyBase, OrmModel):
     id: int
 
 
+class AgencyReassign(BaseModel):
+    from_employee_id: int
+    to_employee_id: int
+    office: Optional[str] = None  # office code; all offices when omitted
+
+
+class AgencyReassignResult(BaseModel):
+    moved: int
+    agency_ids: List[int]
+
+
 # --------- CONTACT ---------
 class ContactBase(BaseModel):
     name: str
@@ -112,6 +123,7 @@ class LogBase(BaseModel):
     notes: Optional[str] = None
     contact_id: Optional[int] = None
     contact: Optional[str] = None
+    employee_id: Optional[int] = None
 
 
 class LogCreate(LogBase):
@@ -131,6 +143,7 @@ class LogUpdate(BaseModel):
     notes: Optional[str] = None
     contact_id: Optional[int] = None
     contact: Optional[str] = None
+    employee_id: Optional[int] = None
 
 
 # --------- EMPLOYEE ---------
@@ -139,6 +152,21 @@ class EmployeeUpdate(BaseModel):
     office_id: Optional[int] = None
 
 
+class PeriodCount(BaseModel):
+    period: str
+    count: int
+
+
+class EmployeeMetrics(BaseModel):
+    employee_id: int
+    name: str
+    total_calls: int
+    calls_by_action: Dict[str, int]
+    calls_by_period: List[PeriodCount]
+    agencies_touched: int
+    last_activity: Optional[datetime] = None
+
+
 # --------- TASK ---------
 class TaskBase(BaseModel):
     title: str
@@ -166,6 +194,14 @@ class Task(TaskBase, OrmModel):
     id: int
 
 
+class TaskSummary(BaseModel):
+    owner: Optional[str] = None
+    office: Optional[str] = None
+    open: int
+    overdue: int
+    completed: int
+
+
 # --------- PRODUCTION ---------
 class ProductionBase(BaseModel):
     office: str
@@ -186,3 +222,107 @@ class ProductionCreate(ProductionBase):
 
 class Production(ProductionBase, OrmModel):
     id: int
+
+
+class ImportBatch(OrmModel):
+    id: int
+    office: str
+    month: str
+    sha256: str
+    filename: Optional[str] = None
+    status: str
+    rows_in_file: int
+    rows_imported: int
+    agencies_created: int
+    parse_ms: Optional[int] = None
+    write_ms: Optional[int] = None
+    created_at: datetime
+    error: Optional[str] = None
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    office: str
+    month: str
+    agency_code: str
+    agency_name: str
+    value: float  # the ranked metric
+    all_ytd_wp: Optional[int] = None
+    all_ytd_nb: Optional[int] = None
+    pytd_wp: Optional[int] = None
+    pytd_nb: Optional[int] = None
+
+
+class CubeInfo(BaseModel):
+    offices: List[str]
+    months: List[str]
+    agencies: int
+    metrics: List[str]
+    cells: int
+    built_at: float
+
+
+class CubeOfficeTotal(BaseModel):
+    office: str
+    value: float
+    agencies: int
+
+
+class CubeYoY(BaseModel):
+    key: str  # office code or agency code, depending on `by`
+    current: float
+    prior: float
+    delta: float
+    pct: Optional[float] = None
+
+
+class ProductionTrend(BaseModel):
+    month: str
+    agencies: int
+    all_ytd_wp: float
+    all_ytd_nb: float
+    pytd_wp: float
+    pytd_nb: float
+    yoy_wp_pct: Optional[float] = None
+    yoy_nb_pct: Optional[float] = None
+    monthly_wp: Optional[float] = None  # derived from the YTD series
+    monthly_nb: Optional[float] = None
+    mom_wp: Optional[float] = None
+    mom_nb: Optional[float] = None
+    rolling_wp: Optional[float] = None
+    rolling_nb: Optional[float] = None
+
+
+class CubeMover(BaseModel):
+    agency_code: str
+    agency_name: str
+    office: str
+    current: float
+    previous: float
+    delta: float
+
+
+# --------- LOG ACTIVITY ---------
+class ActivityCount(BaseModel):
+    key: Optional[Union[date, str, int]] = None  # value of the group_by column; None for a plain total
+    count: int
+
+
+# --------- SEARCH ---------
+class SearchHit(BaseModel):
+    kind: str  # agency | contact | log | task
+    id: int
+    title: str
+    snippet: str
+    rank: float
+    agency_id: Optional[int] = None
+
+
+# --------- AUTOCOMPLETE ---------
+class AutocompleteHit(BaseModel):
+    kind: str  # agency | contact
+    id: int
+    label: str
+    code: Optional[str] = None
+    dba: Optional[str] = None
+    agency_id: Optional[int] = None
@@ -0,0 +1,161 @@
+"""
+Full-text search over agencies, contacts, logs and tasks.
+
+SQLite: one external-content FTS5 table per entity, kept in sync by triggers so every
+write path (ORM, bulk statements, admin cascades) is covered.
+Postgres: a generated tsvector column per table with a GIN index.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+# kind -> indexed source table/columns and the display fields returned with each hit
+SEARCH_TABLES: Dict[str, dict] = {
+    "agency": {
+        "table": "agencies",
+        "columns": ("name", "dba", "code", "notes"),
+        "title": "t.name || ' (' || t.code || ')'",
+        "agency_id": "t.id",
+    },
+    "contact": {
+        "table": "contacts",
+        "columns": ("name", "email", "notes"),
+        "title": "t.name",
+        "agency_id": "t.agency_id",
+    },
+    "log": {
+        "table": "logs",
+        "columns": ("notes",),
+        "title": "t.\"user\" || ' - ' || t.action",
+        "agency_id": "t.agency_id",
+    },
+    "task": {
+        "table": "tasks",
+        "columns": ("title", "notes"),
+        "title": "t.title",
+        "agency_id": "t.agency_id",
+    },
+}
+
+SEARCH_KINDS = tuple(SEARCH_TABLES)
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _sqlite_ddl(table: str, columns: Sequence[str]) -> List[str]:
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new_vals = ", ".join(f"new.{c}" for c in columns)
+    old_vals = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{cols}, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals}); END",
+    ]
+
+
+def _postgres_ddl(table: str, columns: Sequence[str]) -> List[str]:
+    doc = " || ' ' || ".join(f"coalesce({c}, '')" for c in columns)
+    return [
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_tsv tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('simple', {doc})) STORED",
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search_tsv ON {table} USING GIN (search_tsv)",
+    ]
+
+
+def ensure_search_schema(bind) -> None:
+    """Create search tables/triggers (or tsvector columns) if missing; backfills newly created FTS tables."""
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            ensure_search_schema(conn)
+        return
+    conn: Connection = bind
+    dialect = conn.dialect.name
+    for spec in SEARCH_TABLES.values():
+        table, columns = spec["table"], spec["columns"]
+        if dialect == "sqlite":
+            fts = f"{table}_fts"
+            existed = conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (fts,)
+            ).first()
+            for stmt in _sqlite_ddl(table, columns):
+                conn.exec_driver_sql(stmt)
+            if not existed:
+                conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        elif dialect == "postgresql":
+            for stmt in _postgres_ddl(table, columns):
+                conn.exec_driver_sql(stmt)
+
+
+def rebuild_search_index(db: Session) -> None:
+    """Re-derive every FTS index from its content table (SQLite only; Postgres columns are generated)."""
+    if db.get_bind().dialect.name != "sqlite":
+        return
+    for spec in SEARCH_TABLES.values():
+        fts = f"{spec['table']}_fts"
+        db.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+    db.commit()
+
+
+def _terms(q: str) -> List[str]:
+    return _TOKEN.findall(q or "")
+
+
+def search(db: Session, q: str, kinds: Optional[Sequence[str]] = None, limit: int = 20) -> List[dict]:
+    """
+    Ranked hits across entity types. Every term must match; the last term also matches as a prefix
+    so results appear while the user is still typing.
+    """
+    terms = _terms(q)
+    if not terms:
+        return []
+    is_sqlite = db.get_bind().dialect.name == "sqlite"
+    if is_sqlite:
+        match = " ".join(f'"{t}"' for t in terms[:-1]) + f' "{terms[-1]}"*'
+    else:
+        match = " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+
+    hits: List[dict] = []
+    for kind in kinds or SEARCH_KINDS:
+        spec = SEARCH_TABLES[kind]
+        table = spec["table"]
+        if is_sqlite:
+            sql = (
+                f"SELECT t.id, f.rank, snippet({table}_fts, -1, '[', ']', '...', 12), "
+                f"{spec['title']}, {spec['agency_id']} "
+                f"FROM {table}_fts f JOIN {table} t ON t.id = f.rowid "
+                f"WHERE {table}_fts MATCH :match ORDER BY f.rank LIMIT :limit"
+            )
+        else:
+            doc = " || ' ' || ".join(f"coalesce(t.{c}, '')" for c in spec["columns"])
+            sql = (
+                f"SELECT t.id, -ts_rank(t.search_tsv, query) AS rank, "
+                f"ts_headline('simple', {doc}, query, 'StartSel=[, StopSel=], MaxWords=12, MinWords=4'), "
+                f"{spec['title']}, {spec['agency_id']} "
+                f"FROM {table} t, to_tsquery('simple', :match) query "
+                f"WHERE t.search_tsv @@ query ORDER BY rank LIMIT :limit"
+            )
+        for row_id, rank, snippet, title, agency_id in db.execute(text(sql), {"match": match, "limit": limit}):
+            hits.append({
+                "kind": kind,
+                "id": row_id,
+                "title": title or "",
+                "snippet": snippet or "",
+                "rank": float(rank),
+                "agency_id": agency_id,
+            })
+    # bm25 / negated ts_rank: lower is better
+    hits.sort(key=lambda h: h["rank"])
+    return hits[:limit]
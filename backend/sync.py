@@ -0,0 +1,224 @@
+"""
+Row-version delta sync.
+
+Every insert/update on a synced table stamps `row_version` from the single-row
+`sync_state` counter, and every delete writes a `sync_tombstones` row. Both are done
+by database triggers, so bulk statements and admin cascades are covered as well as
+ORM writes. The counter row is write-locked until commit, so versions become visible
+in order and `GET /sync?since=` never skips a change.
+
+Tombstones are pruned to the newest SYNC_TOMBSTONES_KEEP by `prune_tombstones` (run
+after log archival, which deletes in bulk). A client whose `since` predates the pruned
+range gets a full load flagged `reset`, since deletes it missed are gone.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func, inspect, select, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+
+# table name -> (model, response schema)
+SYNC_TABLES = {
+    "agencies": (models.Agency, schemas.Agency),
+    "contacts": (models.Contact, schemas.Contact),
+    "logs": (models.Log, schemas.Log),
+    "tasks": (models.Task, schemas.Task),
+    "production": (models.Production, schemas.Production),
+}
+
+TOMBSTONES_KEEP = int(os.getenv("SYNC_TOMBSTONES_KEEP", "200000"))
+
+
+def _sqlite_ddl(table: str) -> List[str]:
+    bump = "UPDATE sync_state SET version = version + 1 WHERE id = 1;"
+    current = "(SELECT version FROM sync_state WHERE id = 1)"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_sync_ai AFTER INSERT ON {table} BEGIN "
+        f"{bump} UPDATE {table} SET row_version = {current} WHERE id = new.id; END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_sync_au AFTER UPDATE ON {table} "
+        f"WHEN new.row_version IS old.row_version BEGIN "
+        f"{bump} UPDATE {table} SET row_version = {current} WHERE id = new.id; END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_sync_ad AFTER DELETE ON {table} BEGIN "
+        f"{bump} INSERT INTO sync_tombstones (table_name, row_id, version) "
+        f"VALUES ('{table}', old.id, {current}); END",
+    ]
+
+
+_POSTGRES_FUNCTIONS = [
+    """
+    CREATE OR REPLACE FUNCTION sync_stamp_row() RETURNS trigger AS $$
+    BEGIN
+        UPDATE sync_state SET version = version + 1 WHERE id = 1 RETURNING version INTO NEW.row_version;
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION sync_tombstone_row() RETURNS trigger AS $$
+    DECLARE v integer;
+    BEGIN
+        UPDATE sync_state SET version = version + 1 WHERE id = 1 RETURNING version INTO v;
+        INSERT INTO sync_tombstones (table_name, row_id, version) VALUES (TG_TABLE_NAME, OLD.id, v);
+        RETURN OLD;
+    END $$ LANGUAGE plpgsql
+    """,
+]
+
+
+def _postgres_ddl(table: str) -> List[str]:
+    return [
+        f"DROP TRIGGER IF EXISTS {table}_sync_stamp ON {table}",
+        f"CREATE TRIGGER {table}_sync_stamp BEFORE INSERT OR UPDATE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION sync_stamp_row()",
+        f"DROP TRIGGER IF EXISTS {table}_sync_tombstone ON {table}",
+        f"CREATE TRIGGER {table}_sync_tombstone AFTER DELETE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION sync_tombstone_row()",
+    ]
+
+
+def _ensure_columns(conn: Connection) -> None:
+    """Add the sync columns to tables created before versioning (create_all never alters tables)."""
+    insp = inspect(conn)
+    if "pruned_version" not in {c["name"] for c in insp.get_columns("sync_state")}:
+        conn.exec_driver_sql("ALTER TABLE sync_state ADD COLUMN pruned_version INTEGER NOT NULL DEFAULT 0")
+    for table in SYNC_TABLES:
+        if "row_version" not in {c["name"] for c in insp.get_columns(table)}:
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN row_version INTEGER")
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS ix_{table}_row_version ON {table} (row_version)")
+
+
+def ensure_sync_schema(bind) -> None:
+    """
+    Add missing row_version columns, seed the counter row, install the version/tombstone triggers
+    and stamp rows that predate versioning with distinct versions (base + id), so paging by
+    row_version never splits a tie. Idempotent.
+    """
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            ensure_sync_schema(conn)
+        return
+    conn: Connection = bind
+    _ensure_columns(conn)
+    if conn.execute(text("SELECT 1 FROM sync_state WHERE id = 1")).first() is None:
+        conn.execute(text("INSERT INTO sync_state (id, version) VALUES (1, 0)"))
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        for stmt in _POSTGRES_FUNCTIONS:
+            conn.exec_driver_sql(stmt)
+    for table in SYNC_TABLES:
+        if dialect == "sqlite":
+            stmts = _sqlite_ddl(table)
+        elif dialect == "postgresql":
+            stmts = _postgres_ddl(table)
+        else:
+            stmts = []
+        for stmt in stmts:
+            conn.exec_driver_sql(stmt)
+        max_id = conn.execute(text(f"SELECT MAX(id) FROM {table} WHERE row_version IS NULL")).scalar()
+        if max_id:
+            base = conn.execute(text("SELECT version FROM sync_state WHERE id = 1")).scalar()
+            conn.execute(text("UPDATE sync_state SET version = :v WHERE id = 1"), {"v": base + max_id})
+            # Setting row_version explicitly skips the update trigger (WHEN new.row_version IS old.row_version)
+            conn.execute(text(f"UPDATE {table} SET row_version = :base + id WHERE row_version IS NULL"), {"base": base})
+
+
+def current_version(db: Session) -> int:
+    version = db.execute(select(models.SyncState.version).where(models.SyncState.id == 1)).scalar()
+    return version or 0
+
+
+def pruned_version(db: Session) -> int:
+    version = db.execute(select(models.SyncState.pruned_version).where(models.SyncState.id == 1)).scalar()
+    return version or 0
+
+
+def prune_tombstones(db: Session, keep: int = TOMBSTONES_KEEP) -> int:
+    """Delete all but the newest `keep` tombstones and record the pruned version. Returns rows deleted."""
+    newest = db.execute(select(func.max(models.SyncTombstone.id))).scalar()
+    if newest is None or newest <= keep:
+        return 0
+    # Tombstone ids and versions grow together (both assigned under the counter row lock).
+    horizon = db.execute(
+        select(models.SyncTombstone.version)
+        .where(models.SyncTombstone.id <= newest - keep)
+        .order_by(models.SyncTombstone.id.desc())
+        .limit(1)
+    ).scalar()
+    if horizon is None:
+        return 0
+    deleted = db.execute(delete(models.SyncTombstone).where(models.SyncTombstone.version <= horizon)).rowcount
+    db.execute(
+        update(models.SyncState)
+        .where(models.SyncState.id == 1, models.SyncState.pruned_version < horizon)
+        .values(pruned_version=horizon)
+    )
+    db.commit()
+    return deleted
+
+
+def get_changes(
+    db: Session,
+    since: int = 0,
+    tables: Optional[List[str]] = None,
+    limit: int = 5000,
+    full: bool = False,
+) -> dict:
+    """
+    Rows changed and ids deleted after `since`, across tables, in one payload (`since=0` is a full load).
+    At most `limit` rows per table; when `has_more` is set, call again with `since=version`.
+    Rows repeated across pages are harmless upserts on the client. When `since` predates the
+    pruned tombstones the result is a full load with `reset` set: the client must drop its copy.
+    The next pages of a full load are requested with `full` (echoed in the response), so their
+    small `since` values are not reset again.
+    """
+    reset = not full and 0 < since < pruned_version(db)
+    if reset:
+        since = 0
+    full = full or since == 0
+    # Read the counter first: anything committed later is picked up by the next call.
+    version = current_version(db)
+    next_version = version
+    has_more = False
+    changes: Dict[str, List[dict]] = {}
+    deleted: Dict[str, List[int]] = {}
+
+    for table in tables or list(SYNC_TABLES):
+        model, schema = SYNC_TABLES[table]
+        stmt = (
+            select(model)
+            .where(model.row_version > since, model.row_version <= version)
+            .order_by(model.row_version)
+            .limit(limit + 1)
+        )
+        rows = db.execute(stmt).scalars().all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            has_more = True
+            next_version = min(next_version, rows[-1].row_version)
+        changes[table] = [
+            {**schema.model_validate(r).model_dump(mode="json"), "row_version": r.row_version} for r in rows
+        ]
+
+    if since > 0:
+        tomb_stmt = (
+            select(models.SyncTombstone.table_name, models.SyncTombstone.row_id)
+            .where(models.SyncTombstone.version > since, models.SyncTombstone.version <= next_version)
+            .order_by(models.SyncTombstone.version)
+        )
+        for table_name, row_id in db.execute(tomb_stmt):
+            if not tables or table_name in tables:
+                deleted.setdefault(table_name, []).append(row_id)
+
+    return {
+        "version": next_version,
+        "has_more": has_more,
+        "reset": reset,
+        "full": full,
+        "changes": changes,
+        "deleted": deleted,
+    }